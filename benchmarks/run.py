@@ -0,0 +1,390 @@
+"""
+请求/响应流水线基准测试
+
+用法（在项目根目录执行）：
+    python -m benchmarks.run                              # 运行全部基准，输出到 benchmarks/results/<时间>.json
+    python -m benchmarks.run -k jsonpath -k compare       # 只运行名称包含关键字的基准
+    python -m benchmarks.run --compare benchmarks/results/baseline.json --fail-threshold 0.2
+
+每个基准重复 --repeat 轮，每轮执行若干次（自动校准到约 --min-time 秒），
+以各轮单次耗时的中位数作为比较依据。端到端基准使用本地模拟服务，执行期间关闭日志输出，
+日志开销由 logging 基准单独衡量。
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import yaml
+
+from common.base_api import TestExecutor
+from common.config import config
+from common.csv_decorator import _read_csv_file
+from common.log import TestLogger
+from common.mock_server import MockServer, route_from_case
+from common.request_encapsulation import ApiResponse
+from common.validation import compile_validations
+from common.variable_store import VariableStore
+from utils import json_utils
+from utils.csv_utils import DataReplaceUtils
+from utils.json_stream import parse_paths
+from utils.template_utils import Template, render_string
+from utils.yaml_utils import YamlUtils, case_catalog
+
+RESULTS_DIR = os.path.join(config.BASE_DIR, 'benchmarks', 'results')
+
+
+class Benchmark:
+    """单个基准：setup 返回被测函数（无参调用），teardown 可选"""
+
+    def __init__(self, name: str, setup: Callable[[], Callable[[], Any]], group: str,
+                 teardown: Callable[[], None] = None):
+        self.name = name
+        self.setup = setup
+        self.group = group
+        self.teardown = teardown
+
+
+def measure(func: Callable[[], Any], repeat: int = 5, min_time: float = 0.2) -> Dict[str, Any]:
+    """
+    测量单次调用耗时（微秒）
+    :param func: 被测函数
+    :param repeat: 轮数
+    :param min_time: 每轮最短执行时间（秒），据此校准每轮执行次数
+    """
+    func()
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time / 5 or number >= 1_000_000:
+            break
+        number *= 2
+    number = max(int(number * (min_time / max(elapsed, 1e-9))), 1)
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - started) / number * 1_000_000)
+    median = statistics.median(timings)
+    return {
+        'median_us': round(median, 3),
+        'min_us': round(min(timings), 3),
+        'stdev_us': round(statistics.stdev(timings), 3) if len(timings) > 1 else 0.0,
+        'ops_per_sec': round(1_000_000 / median, 1) if median else 0.0,
+        'iterations': number,
+        'repeat': repeat
+    }
+
+
+# ---------------------------------------------------------------- 用例加载
+
+def _yaml_cold():
+    def run():
+        case_catalog.clear()
+        YamlUtils().get_yaml_case('trading_instruction.yml', '提交上市交易指令')
+    return run
+
+
+def _yaml_warm():
+    YamlUtils().get_yaml_case('trading_instruction.yml', '提交上市交易指令')
+    return lambda: YamlUtils().get_yaml_case('trading_instruction.yml', '提交上市交易指令')
+
+
+# ---------------------------------------------------------------- 变量替换
+
+def _substitution(count: int, compiled: bool = True):
+    """compiled: 用例目录中的用例使用缓存的编译模板，否则通过 render() 按数据内容查找缓存的模板"""
+    def setup():
+        case = {
+            'request': {
+                'path': '/api/test?' + '&'.join(f"p{i}=${{v{i}}}" for i in range(min(count, 10))),
+                'headers': {'Authorization': '${token_type} ${access_token}'},
+                'data': [{'field': f"${{v{i}}}", 'fixed': i} for i in range(count)]
+            }
+        }
+        variables = {f"v{i}": f"value{i}" for i in range(count)}
+        variables.update(token_type='Bearer', access_token='token')
+        if compiled:
+            template = Template(case)
+            return lambda: template.render(variables)
+        return lambda: DataReplaceUtils.replace_variables(case, variables)
+    return setup
+
+
+def _substitution_string():
+    variables = {'token_type': 'Bearer', 'access_token': 'token'}
+    return lambda: render_string('${token_type} ${access_token}', variables)
+
+
+# ---------------------------------------------------------------- JSONPath
+
+def _large_payload(items: int = 1000) -> Dict[str, Any]:
+    return {
+        'code': 0,
+        'data': {
+            'total': items,
+            'content': [
+                {'id': i, 'bondCode': f"{i:06d}", 'detail': {'price': i * 1.5, 'tags': ['a', 'b', 'c']}}
+                for i in range(items)
+            ]
+        }
+    }
+
+
+def _jsonpath(path: str, validation: bool = False):
+    def setup():
+        response = ApiResponse()
+        payload = _large_payload()
+        if validation:
+            return lambda: response._extract_json_path(payload, path)
+        return lambda: response._extract_value_by_path(payload, path)
+    return setup
+
+
+def _response_parse(paths: Optional[List[str]]):
+    """响应体解析：paths 为空时完整解析，否则流式解析指定路径"""
+    def setup():
+        raw = json.dumps(_large_payload(20000), ensure_ascii=False).encode('utf-8')
+        chunks = [raw[i:i + 65536] for i in range(0, len(raw), 65536)]
+        if paths is None:
+            return lambda: json_utils.loads(raw)
+        return lambda: parse_paths(chunks, paths)
+    return setup
+
+
+# ---------------------------------------------------------------- 比较器
+
+def _compare(actual: Any, expected: Any, comparator: str):
+    def setup():
+        rule = compile_validations([['$', comparator, expected]]).rules[0][0]
+        return lambda: rule.compare(actual)
+    return setup
+
+
+# ---------------------------------------------------------------- CSV 解析
+
+def _csv_parse(typed: bool, rows: int = 5000):
+    def setup():
+        columns = ['name', 'code', 'price', 'yield', 'volume', 'flag', 'market', 'date', 'remark', 'rating']
+        types = ['str', 'str', 'float', 'float', 'int', 'bool', 'str', 'str', 'str', 'str']
+        header = [f"{column}:{kind}" for column, kind in zip(columns, types)] if typed else columns
+        path = os.path.join(tempfile.mkdtemp(prefix='bench-csv-'), 'bonds.csv')
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write(','.join(header) + '\n')
+            for i in range(rows):
+                f.write(f"bond{i},{i:06d},{100 + i % 7 * 0.25},{2.5 + i % 11 * 0.01},{i * 10},"
+                        f"{'true' if i % 2 else 'false'},IB,2026-03-{i % 28 + 1:02d},备注{i},AAA\n")
+        return lambda: _read_csv_file(path)
+    return setup
+
+
+# ---------------------------------------------------------------- 日志
+
+def _logging(queue_mode: bool):
+    state = {}
+
+    def setup():
+        state['dir'] = tempfile.mkdtemp(prefix='bench-log-')
+        state['logger'] = test_logger = TestLogger(log_dir=state['dir'], console_output=False,
+                                                   queue_mode=queue_mode)
+        result = {'status_code': 200, 'response_time': 0.01, 'response_data': _large_payload(50)}
+        name = f"bench-log-{'queue' if queue_mode else 'sync'}"
+
+        def run():
+            test_logger.log_request_details(name, {'url': 'http://127.0.0.1/api', 'method': 'POST',
+                                                   'headers': {}, 'params': {}, 'data': {'k': 'v'}})
+            test_logger.log_response_details(name, result)
+        return run
+
+    def teardown():
+        test_logger = state.pop('logger')
+        test_logger.stop()
+        for logger in list(test_logger.loggers.values()):
+            for handler in logger.handlers:
+                handler.close()
+    return setup, teardown
+
+
+# ---------------------------------------------------------------- 端到端
+
+def _end_to_end():
+    state = {}
+
+    def setup():
+        case = {
+            'case_name': 'bench',
+            'request': {
+                'method': 'POST',
+                'path': '/api/trade/order/searchBondByContent',
+                'headers': {'Content-Type': 'application/json;charset=UTF-8',
+                            'Authorization': '${token_type} ${access_token}'},
+                'data': {'keyword': '${keyword}', 'type': 'ib'}
+            },
+            'extract': {'code': '$[0].code', 'id': '$[0].id'},
+            'validate': [['$.status_code', '==', '200']]
+        }
+        state['server'] = server = MockServer(port=0, routes=[route_from_case(case)]).start()
+        case['request']['url'] = server.url
+        case_file = os.path.join(tempfile.mkdtemp(prefix='bench-case-'), 'bench.yml')
+        with open(case_file, 'w', encoding='utf-8') as f:
+            yaml.safe_dump({'test_cases': [case]}, f, allow_unicode=True)
+
+        store = VariableStore()
+        variables = {'token_type': 'Bearer', 'access_token': 'token', 'keyword': 'bond'}
+        logging.disable(logging.CRITICAL)
+
+        def run():
+            executor = TestExecutor(store)
+            executor.case(case_file, 'bench', variables)
+            executor.request_api.close()
+        return run
+
+    def teardown():
+        logging.disable(logging.NOTSET)
+        state.pop('server').stop()
+    return setup, teardown
+
+
+def build_benchmarks() -> List[Benchmark]:
+    """全部基准"""
+    benchmarks = [
+        Benchmark('yaml_load_cold', _yaml_cold, 'yaml'),
+        Benchmark('yaml_load_warm', _yaml_warm, 'yaml'),
+        Benchmark('substitution_string', _substitution_string, 'substitution'),
+    ]
+    for count in (10, 100, 1000):
+        benchmarks.append(Benchmark(f"substitution_{count}_vars", _substitution(count), 'substitution'))
+    benchmarks.append(Benchmark('substitution_render_100_vars', _substitution(100, compiled=False), 'substitution'))
+    for name, path, validation in (
+            ('jsonpath_index', '.data.content[999].detail.price', False),
+            ('jsonpath_key_on_list', '.data.content.bondCode', False),
+            ('jsonpath_wildcard', '.data.content[*].id', False),
+            ('jsonpath_validate_first_match', 'data.content.detail.price', True)):
+        benchmarks.append(Benchmark(name, _jsonpath(path, validation), 'jsonpath'))
+    for name, paths in (
+            ('response_parse_full', None),
+            ('response_stream_first_item', ['data.content[0].bondCode', 'data.total']),
+            ('response_stream_last_item', ['data.content[19999].bondCode'])):
+        benchmarks.append(Benchmark(name, _response_parse(paths), 'response_parse'))
+    for name, actual, expected, comparator in (
+            ('compare_eq_numeric', '200', '200', '=='),
+            ('compare_eq_string', 'abc', 'abc', '=='),
+            ('compare_gt', '3.5', '1', '>'),
+            ('compare_in', '接收交易成功。限额信息', '接收交易成功', 'in'),
+            ('compare_regex', 'order-20260318-0001', r'^order-\d{8}-\d{4}$', 'regex'),
+            ('compare_length', [1, 2, 3], 3, 'length'),
+            ('compare_type', 'abc', 'str', 'type'),
+            ('compare_exists', 'abc', None, 'exists')):
+        benchmarks.append(Benchmark(name, _compare(actual, expected, comparator), 'compare'))
+    benchmarks.append(Benchmark('csv_parse_auto_5000_rows', _csv_parse(False), 'csv'))
+    benchmarks.append(Benchmark('csv_parse_typed_5000_rows', _csv_parse(True), 'csv'))
+    for queue_mode in (False, True):
+        setup, teardown = _logging(queue_mode)
+        benchmarks.append(Benchmark(f"logging_{'queue' if queue_mode else 'sync'}", setup, 'logging', teardown))
+    setup, teardown = _end_to_end()
+    benchmarks.append(Benchmark('executor_case_mock_server', setup, 'end_to_end', teardown))
+    return benchmarks
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=config.BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(benchmarks: Sequence[Benchmark], repeat: int, min_time: float) -> Dict[str, Any]:
+    """运行基准并返回结果"""
+    results = {}
+    for benchmark in benchmarks:
+        func = benchmark.setup()
+        try:
+            stats = measure(func, repeat, min_time)
+        finally:
+            if benchmark.teardown:
+                benchmark.teardown()
+        stats['group'] = benchmark.group
+        results[benchmark.name] = stats
+        print(f"{benchmark.name:<34}{stats['median_us']:>14.3f} us{stats['ops_per_sec']:>16.1f} ops/s")
+    return {
+        'meta': {
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': repeat,
+            'min_time': min_time
+        },
+        'results': results
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    与基线对比中位数耗时
+    :param threshold: 变慢超过该比例视为退化（0.1 表示 10%）
+    :return: 退化的基准名称
+    """
+    regressions = []
+    print(f"\n对比基线: {baseline['meta'].get('commit')} ({baseline['meta'].get('time')})")
+    for name, stats in current['results'].items():
+        base = baseline['results'].get(name)
+        if not base or not base.get('median_us'):
+            print(f"{name:<34}{'(新增)':>14}")
+            continue
+        change = stats['median_us'] / base['median_us'] - 1
+        flag = ''
+        if change > threshold:
+            flag = '  <-- 退化'
+            regressions.append(name)
+        print(f"{name:<34}{base['median_us']:>12.3f} -> {stats['median_us']:<12.3f}{change * 100:>+8.1f}%{flag}")
+    return regressions
+
+
+def main(argv: Sequence[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="请求/响应流水线基准测试")
+    parser.add_argument('-k', dest='keywords', action='append', default=[], help="只运行名称或分组包含关键字的基准")
+    parser.add_argument('--repeat', type=int, default=5, help="每个基准的轮数")
+    parser.add_argument('--min-time', type=float, default=0.2, help="每轮最短执行时间（秒）")
+    parser.add_argument('--output', default=None, help="结果 JSON 文件，默认 benchmarks/results/<时间>.json")
+    parser.add_argument('--compare', default=None, help="作为基线的结果 JSON 文件")
+    parser.add_argument('--fail-threshold', type=float, default=None,
+                        help="与基线相比变慢超过该比例时返回非零退出码，如 0.2")
+    args = parser.parse_args(argv)
+
+    benchmarks = [b for b in build_benchmarks()
+                  if not args.keywords or any(k in b.name or k == b.group for k in args.keywords)]
+    current = run_benchmarks(benchmarks, args.repeat, args.min_time)
+
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(current, f, indent=2, ensure_ascii=False)
+    print(f"\n结果已写入: {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        threshold = args.fail_threshold if args.fail_threshold is not None else 0.1
+        regressions = compare(current, baseline, threshold)
+        if regressions and args.fail_threshold is not None:
+            print(f"性能退化: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
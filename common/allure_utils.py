@@ -1,42 +1,180 @@
 import allure
+import hashlib
 import json
-from typing import Dict, Any, Callable
+import os
+import tempfile
+import threading
+from typing import Dict, Any, Callable, Optional
 from functools import wraps
 
+from common.config import config
+
+
+class AttachmentPolicy:
+    """
+    附件策略（config.yml 的 allure 节点）
+
+    - attach_body: always 每个用例都附加请求/响应详情；on_failure 仅在失败或用例设置 attach_body: true 时附加
+    - max_inline_bytes: 序列化结果超过该字节数时写入临时文件（内存占用有界），再由 allure 以文件方式复制到结果目录
+    - dedup: 同一用例内内容相同（sha1 相同）的附件只保存一次，后续附件记录引用；不跨用例去重，
+      allure 的附件只属于附加它的用例，其他用例无法引用
+    - dedup_min_bytes: 小于该字节数的附件不去重，总是完整附加
+    """
+
+    def __init__(self, attach_body: str = 'on_failure', max_inline_bytes: int = 65536,
+                 dedup: bool = False, dedup_min_bytes: int = 1024):
+        self.attach_body = attach_body
+        self.max_inline_bytes = max_inline_bytes
+        self.dedup = dedup
+        self.dedup_min_bytes = dedup_min_bytes
+
+    @classmethod
+    def from_config(cls) -> 'AttachmentPolicy':
+        allure_config = config.get('allure', default={}) or {}
+        return cls(
+            attach_body=allure_config.get('attach_body', 'on_failure'),
+            max_inline_bytes=allure_config.get('max_inline_bytes', 65536),
+            dedup=allure_config.get('dedup', False),
+            dedup_min_bytes=allure_config.get('dedup_min_bytes', 1024)
+        )
+
+    def should_attach_body(self, case_data: Optional[Dict[str, Any]], failed: bool) -> bool:
+        """
+        是否附加完整的请求/响应详情
+        :param case_data: 用例数据，attach_body: true 表示该用例总是附加
+        :param failed: 用例是否失败
+        """
+        if failed or self.attach_body == 'always':
+            return True
+        return bool(case_data and case_data.get('attach_body'))
+
+
+class _SpoolWriter:
+    """序列化输出缓冲：边写边计算 sha1，超过阈值后转存到临时文件"""
+
+    def __init__(self, max_inline_bytes: int):
+        self.max_inline_bytes = max_inline_bytes
+        self.digest = hashlib.sha1()
+        self.size = 0
+        self._chunks = []
+        self._file = None
+
+    def write(self, text: str):
+        chunk = text.encode('utf-8')
+        self.digest.update(chunk)
+        self.size += len(chunk)
+        if self._file is None:
+            self._chunks.append(chunk)
+            if self.size > self.max_inline_bytes:
+                self._file = tempfile.NamedTemporaryFile(prefix='allure-attach-', suffix='.json', delete=False)
+                self._file.writelines(self._chunks)
+                self._chunks = []
+        else:
+            self._file.write(chunk)
+
+    @property
+    def spooled(self) -> bool:
+        return self._file is not None
+
+    def getvalue(self) -> bytes:
+        return b''.join(self._chunks)
+
+    def close(self) -> Optional[str]:
+        """关闭临时文件，返回文件路径（未转存时返回None）"""
+        if self._file is None:
+            return None
+        self._file.close()
+        return self._file.name
+
 
 class AllureReport:
     """Allure报告增强工具类"""
 
+    policy = AttachmentPolicy.from_config()
+    # 当前用例中 sha1 -> 首次附加时的附件名
+    _attached: Dict[str, str] = {}
+    _attached_test: Optional[str] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def _first_attachment(cls, digest: str, name: str) -> Optional[str]:
+        """登记当前用例的附件，内容此前已在本用例中附加过时返回首次附加的附件名"""
+        current_test = os.environ.get('PYTEST_CURRENT_TEST', '').rsplit(' ', 1)[0]
+        with cls._lock:
+            if current_test != cls._attached_test:
+                cls._attached = {}
+                cls._attached_test = current_test
+            first_name = cls._attached.get(digest)
+            if first_name is None:
+                cls._attached[digest] = name
+            return first_name
+
+    @classmethod
+    def attach_json(cls, data: Any, name: str):
+        """
+        以 JSON 附件形式附加数据：边序列化边计算 sha1，大内容写入临时文件后以文件方式附加，
+        开启 dedup 时同一用例内重复的较大内容只附加一条引用
+        """
+        policy = cls.policy
+        writer = _SpoolWriter(policy.max_inline_bytes)
+        try:
+            json.dump(data, writer, indent=2, ensure_ascii=False, default=str)
+            source = writer.close()
+            if policy.dedup and writer.size >= policy.dedup_min_bytes:
+                digest = writer.digest.hexdigest()
+                first_name = cls._first_attachment(digest, name)
+                if first_name is not None:
+                    allure.attach(
+                        body=f"与本用例附件「{first_name}」内容相同 (sha1: {digest}, {writer.size} 字节)",
+                        name=name,
+                        attachment_type=allure.attachment_type.TEXT
+                    )
+                    return
+            if source is not None:
+                allure.attach.file(source, name=name, attachment_type=allure.attachment_type.JSON)
+            else:
+                allure.attach(body=writer.getvalue(), name=name, attachment_type=allure.attachment_type.JSON)
+        finally:
+            # allure 已将文件复制到结果目录，临时文件随即删除
+            source = writer.close()
+            if source is not None and os.path.exists(source):
+                os.remove(source)
+
     @staticmethod
-    def attach_request_response(request_details: Dict, response_result: Dict):
-        """附加请求响应信息到Allure报告"""
-        # 请求信息
-        request_info = {
+    def attach_summary(request_details: Dict, response_result: Dict):
+        """附加一行请求摘要（不含请求/响应体）"""
+        allure.attach(
+            body=f"{request_details.get('method')} {request_details.get('url')} -> "
+                 f"{response_result.get('status_code')} ({response_result.get('response_time', 0):.3f}s)",
+            name="请求摘要",
+            attachment_type=allure.attachment_type.TEXT
+        )
+
+    @classmethod
+    def attach_request(cls, request_details: Dict):
+        """附加请求详情"""
+        cls.attach_json({
             "URL": request_details.get('url'),
             "Method": request_details.get('method'),
             "Headers": request_details.get('headers', {}),
             "Params": request_details.get('params', {}),
             "Data": request_details.get('data', {})
-        }
-
-        allure.attach(
-            body=json.dumps(request_info, indent=2, ensure_ascii=False),
-            name="请求详情",
-            attachment_type=allure.attachment_type.JSON
-        )
+        }, "请求详情")
 
-        # 响应信息
-        response_info = {
+    @classmethod
+    def attach_response(cls, response_result: Dict):
+        """附加响应详情"""
+        cls.attach_json({
             "Status Code": response_result.get('status_code'),
             "Response Time": f"{response_result.get('response_time', 0):.3f}s",
             "Response Data": response_result.get('response_data', {})
-        }
+        }, "响应详情")
 
-        allure.attach(
-            body=json.dumps(response_info, indent=2, ensure_ascii=False),
-            name="响应详情",
-            attachment_type=allure.attachment_type.JSON
-        )
+    @classmethod
+    def attach_request_response(cls, request_details: Dict, response_result: Dict):
+        """附加请求响应信息到Allure报告"""
+        cls.attach_request(request_details)
+        cls.attach_response(response_result)
 
     @staticmethod
     def attach_variables(extracted_vars: Dict[str, Any], title: str = "提取的变量"):
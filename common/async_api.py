@@ -0,0 +1,264 @@
+import asyncio
+import atexit
+import threading
+import time
+from typing import Dict, Any, Iterable, List, Optional, Sequence
+
+import allure
+
+from common.base_api import TestExecutor
+from common.cassette import cassette
+from common.config import config
+from common.log import test_logger
+from common.metrics import metrics
+from common.profiler import profiler
+from common.request_encapsulation import ApiRequest, ApiResponse
+from common.variable_store import VariableStore, variable_store
+
+# httpx 为可选依赖，仅异步引擎需要
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+class AsyncApiRequest(ApiRequest):
+    """异步接口请求封装 - 请求参数构建与 ApiRequest 一致，发送基于 httpx"""
+
+    def __init__(self, engine: 'AsyncEngine'):
+        self.engine = engine
+        self.logger = test_logger
+        # verify_ssl -> 客户端，客户端各自维护 cookies，底层连接池由引擎共享
+        self._clients: Dict[bool, Any] = {}
+
+    def _client(self, verify: bool):
+        client = self._clients.get(verify)
+        if client is None:
+            client = httpx.AsyncClient(transport=self.engine.transport(verify))
+            self._clients[verify] = client
+        return client
+
+    async def send_request(self, request_config: Dict[str, Any], variables: Dict[str, Any] = None,
+                           test_case_name: str = "unknown"):
+        """
+        异步发送HTTP请求
+
+        :param request_config: 请求配置
+        :param variables: 变量字典
+        :param test_case_name: 用例名称
+        :return: httpx.Response
+        """
+        request_kwargs = None
+        try:
+            request_kwargs = self.prepare_request(request_config, variables, test_case_name)
+            if cassette.replaying:
+                # 回放得到的是 requests 响应，ApiResponse 可以直接处理
+                return cassette.replay(request_kwargs)
+            client = self._client(request_kwargs['verify'])
+            if request_kwargs['cookies']:
+                client.cookies.update(request_kwargs['cookies'])
+
+            started = time.perf_counter()
+            response = await client.request(
+                method=request_kwargs['method'],
+                url=request_kwargs['url'],
+                headers=request_kwargs['headers'],
+                params=request_kwargs['params'] or None,
+                data=request_kwargs['data'],
+                json=request_kwargs['json'],
+                files=request_kwargs['files'] or None,
+                auth=request_kwargs['auth'],
+                timeout=request_kwargs['timeout'],
+                follow_redirects=request_kwargs['allow_redirects']
+            )
+            # httpx 的 elapsed 包含读取响应体的时间，异步引擎只记录总耗时
+            metrics.record(request_kwargs['method'], request_config.get('path', ''),
+                           total=time.perf_counter() - started)
+            if cassette.recording:
+                cassette.record(request_kwargs, response)
+            return response
+
+        except Exception as e:
+            if request_kwargs is not None:
+                metrics.record_error(request_kwargs['method'], request_config.get('path', ''))
+            self.logger.log_error(test_case_name, f"请求发送失败: {str(e)}", e)
+            raise
+
+    def close(self):
+        """释放客户端（共享连接池由引擎关闭）"""
+        self._clients.clear()
+
+
+class AsyncApiResponse(ApiResponse):
+    """异步响应处理器 - httpx 响应在返回前已读取完毕，处理逻辑与 ApiResponse 一致"""
+
+    async def process_response(self, response, case_data: Dict[str, Any],
+                               test_case_name: str = "unknown") -> Dict[str, Any]:
+        return ApiResponse.process_response(self, response, case_data, test_case_name)
+
+
+class AsyncTestExecutor(TestExecutor):
+    """异步测试执行器 - 用例格式和返回结果与 TestExecutor 一致"""
+
+    def __init__(self, store: VariableStore = None, engine: 'AsyncEngine' = None):
+        """
+        :param store: 变量存储，默认使用会话级的全局变量存储（extract.yml）
+        :param engine: 异步引擎，默认使用全局引擎
+        """
+        self.engine = engine or async_engine
+        self.request_api = AsyncApiRequest(self.engine)
+        self.response_api = AsyncApiResponse()
+        self.variable_store = store or variable_store
+        self.logger = test_logger.get_logger()
+
+    async def case(self, path: str, case_name: str, data: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        异步执行测试用例
+        :param path: 路径
+        :param case_name: 用例名
+        :param data: yaml文件中需要替换的变量
+        :return: 执行结果
+        """
+        # 事件循环中多个用例交替执行，只计时不输出剖析文件
+        with allure.step(f"执行用例: {case_name}"), profiler.case(case_name, dump=False):
+            case_data = request_config = response = result = None
+            try:
+                case_data, request_config, all_variables = self._prepare_case(path, case_name, data)
+
+                # 发送请求
+                with profiler.phase('send_request'):
+                    response = await self.request_api.send_request(
+                        request_config,
+                        all_variables,
+                        case_name
+                    )
+
+                # 处理响应
+                with profiler.phase('process_response'):
+                    result = await self.response_api.process_response(response, case_data, case_name)
+
+                return self._finish_case(case_data, request_config, result)
+            except Exception as e:
+                if result is None and request_config is not None:
+                    self._attach_failure_details(request_config, response is not None)
+                self._handle_case_error(e)
+                raise
+
+
+class AsyncEngine:
+    """
+    异步执行引擎
+
+    在后台线程中运行一个常驻事件循环，按 verify_ssl 持有共享的 httpx 传输层（连接池），
+    同步代码通过 run_case / run_cases 提交用例，互不依赖的用例可以在同一进程内并发执行。
+    """
+
+    def __init__(self, pool_maxsize: int = 10, max_retries: int = 3, concurrency: int = 10):
+        """
+        :param pool_maxsize: 每个传输层保持的最大 keep-alive 连接数
+        :param max_retries: 连接失败重试次数
+        :param concurrency: run_cases 默认并发数
+        """
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.concurrency = concurrency
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._transports: Dict[bool, Any] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls) -> 'AsyncEngine':
+        """根据 config.yml 的 http 节点创建"""
+        http_config = config.get('http', default={}) or {}
+        return cls(
+            pool_maxsize=http_config.get('pool_maxsize', 10),
+            max_retries=http_config.get('max_retries', config.MAX_RETRIES),
+            concurrency=http_config.get('concurrency', 10)
+        )
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if httpx is None:
+            raise ImportError("异步引擎需要安装 httpx: pip install httpx")
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name='async-engine', daemon=True)
+                thread.start()
+                self._loop, self._thread = loop, thread
+        return self._loop
+
+    def transport(self, verify: bool):
+        """获取共享传输层（只能在引擎事件循环中调用）"""
+        transport = self._transports.get(verify)
+        if transport is None:
+            transport = httpx.AsyncHTTPTransport(
+                verify=verify,
+                retries=self.max_retries,
+                limits=httpx.Limits(max_keepalive_connections=self.pool_maxsize)
+            )
+            self._transports[verify] = transport
+        return transport
+
+    def run(self, coro):
+        """在引擎事件循环中执行协程并等待结果"""
+        loop = self._ensure_loop()
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("不能在异步引擎的事件循环中同步等待用例，请直接 await AsyncTestExecutor().case()")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def run_case(self, path: str, case_name: str, data: Dict[str, Any] = None,
+                 store: VariableStore = None) -> Dict[str, Any]:
+        """执行单个用例（同步等待）"""
+        return self.run(AsyncTestExecutor(store, self).case(path, case_name, data))
+
+    def run_cases(self, cases: Iterable[Sequence], concurrency: int = None,
+                  store: VariableStore = None) -> List[Dict[str, Any]]:
+        """
+        并发执行多个互不依赖的用例
+        :param cases: 用例列表，每项为 (路径, 用例名) 或 (路径, 用例名, 变量)
+        :param concurrency: 最大并发数，默认取 config.yml 的 http.concurrency
+        :param store: 变量存储
+        :return: 与 cases 顺序一致的执行结果，全部执行完后抛出第一个失败用例的异常
+        """
+        cases = [tuple(case) for case in cases]
+        limit = concurrency or self.concurrency
+
+        async def run_all():
+            semaphore = asyncio.Semaphore(limit)
+
+            async def run_one(case):
+                async with semaphore:
+                    return await AsyncTestExecutor(store, self).case(*case)
+
+            return await asyncio.gather(*(run_one(case) for case in cases), return_exceptions=True)
+
+        results = self.run(run_all())
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return results
+
+    def close(self):
+        """关闭共享连接池并停止事件循环"""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+
+        async def close_transports():
+            for transport in self._transports.values():
+                await transport.aclose()
+            self._transports.clear()
+
+        asyncio.run_coroutine_threadsafe(close_transports(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join()
+        loop.close()
+        self._thread = None
+
+
+# 全局异步引擎实例
+async_engine = AsyncEngine.from_config()
+atexit.register(async_engine.close)
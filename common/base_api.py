@@ -1,13 +1,13 @@
 # 内部库
-import json
 import traceback
 
+from common.config import config
 from common.log import test_logger
-from common.os_path import get_object_path
 from common.request_encapsulation import ApiRequest, ApiResponse
-from utils.yaml_utils import YamlUtils
-from utils.csv_utils import DataReplaceUtils
+from utils.yaml_utils import YamlUtils, case_catalog
 from common.allure_utils import AllureReport
+from common.variable_store import VariableStore, variable_store
+from common.profiler import profiler
 
 # 外部库
 from typing import Dict, Any, List
@@ -16,9 +16,13 @@ import allure
 class TestExecutor:
     """测试执行器 - 协调请求和响应处理"""
 
-    def __init__(self):
+    def __init__(self, store: VariableStore = None):
+        """
+        :param store: 变量存储，默认使用会话级的全局变量存储（extract.yml）
+        """
         self.request_api = ApiRequest()
         self.response_api = ApiResponse()
+        self.variable_store = store or variable_store
         self.logger = test_logger.get_logger()
         # 初始化时清空extract文件，确保每次执行都是干净的
         # clean_extract()
@@ -31,82 +35,125 @@ class TestExecutor:
         :param data: yaml文件中需要替换的变量
         :return: 执行结果
         """
-        with allure.step(f"执行用例: {case_name}"):
-            try:
-                yaml_data = YamlUtils().get_yaml_case(path, case_name)
-                all_variables = self._merge_variables(data)
+        if config.ENGINE == 'async':
+            # 异步引擎：在共享事件循环中执行，结果格式与同步引擎一致
+            from common.async_api import async_engine
+            return async_engine.run_case(path, case_name, data, store=self.variable_store)
 
-                # 变量替换
-                if all_variables:
-                    case_data = DataReplaceUtils().replace_variables(yaml_data, all_variables)
-                else:
-                    case_data = yaml_data
-
-                # 获取请求配置
-                request_config = case_data.get('request', {})
+        with allure.step(f"执行用例: {case_name}"), profiler.case(case_name):
+            case_data = request_config = response = result = None
+            try:
+                case_data, request_config, all_variables = self._prepare_case(path, case_name, data)
 
                 # 发送请求
-                response = self.request_api.send_request(
-                    request_config,
-                    all_variables,
-                    case_name
-                )
-                # 记录请求详情
-                allure.attach(
-                    body=json.dumps(request_config, indent=2, ensure_ascii=False),
-                    name="请求配置",
-                    attachment_type=allure.attachment_type.JSON
-                )
+                with profiler.phase('send_request'):
+                    response = self.request_api.send_request(
+                        request_config,
+                        all_variables,
+                        case_name
+                    )
+
                 # 处理响应
-                result = self.response_api.process_response(response, case_data, case_name)
-
-                # 将数据附加到Allure报告
-                AllureReport.attach_request_response(
-                    {
-                        'url': request_config.get('url', '') + request_config.get('path', ''),
-                        'method': request_config.get('method'),
-                        'headers': request_config.get('headers', {}),
-                        'params': request_config.get('params', {}),
-                        'data': request_config.get('data', {})
-                    },
-                    result
-                )
-
-                # 变量和验证结果
-                AllureReport.attach_variables(result.get('extracted_variables', {}))
-                AllureReport.attach_validation_results(result.get('validation_results', []))
-
-                # 保存提取的变量到extract.yml文件
-                self._save_extracted_variables(result.get('extracted_variables', {}))
-
-                # 执行teardown
-                self._execute_teardown(case_data.get('teardown', []))
-
-                if not all(vr.get('pass', False) for vr in result.get('validation_results', [])):
-                    failures = [
-                        f"{vr.get('field')}: {vr.get('message') or '验证失败'}"
-                        for vr in result['validation_results']
-                        if not vr.get('pass', False)
-                    ]
-                    raise AssertionError(f"验证失败:\n" + "\n".join(failures))
-                return result
+                with profiler.phase('process_response'):
+                    result = self.response_api.process_response(response, case_data, case_name)
+
+                return self._finish_case(case_data, request_config, result)
             except Exception as e:
-                allure.attach(
-                    body=str(e),
-                    name="执行异常",
-                    attachment_type=allure.attachment_type.TEXT
-                )
-                allure.attach(
-                    body=traceback.format_exc(),
-                    name="异常堆栈",
-                    attachment_type=allure.attachment_type.TEXT
-                )
-                self.logger.error(f"用例执行失败: {str(e)}")
-                raise {
-                    'success': False,
-                    'error': str(e)
-                }
+                # _finish_case 已按策略附加过详情，此前的失败在这里补充附加
+                if result is None and request_config is not None:
+                    self._attach_failure_details(request_config, response is not None)
+                self._handle_case_error(e)
+                raise
 
+    def _prepare_case(self, path: str, case_name: str, data: Dict[str, Any] = None):
+        """
+        读取用例并完成变量替换
+        :return: (用例数据, 请求配置, 合并后的变量)
+        """
+        with profiler.phase('load_case'):
+            yaml_data = YamlUtils().get_yaml_case(path, case_name)
+        with profiler.phase('merge_variables'):
+            all_variables = self._merge_variables(data)
+
+        # 变量替换（模板按用例文件版本缓存，渲染结果是用例数据的独立副本）
+        with profiler.phase('replace_variables'):
+            template = case_catalog.get_template(path, case_name) if yaml_data is not None else None
+            case_data = template.render(all_variables) if template is not None else yaml_data
+
+        # 获取请求配置
+        request_config = case_data.get('request', {})
+        return case_data, request_config, all_variables
+
+    @staticmethod
+    def _request_details(request_config: Dict[str, Any]) -> Dict[str, Any]:
+        """报告中展示的请求详情"""
+        return {
+            'url': request_config.get('url', '') + request_config.get('path', ''),
+            'method': request_config.get('method'),
+            'headers': request_config.get('headers', {}),
+            'params': request_config.get('params', {}),
+            'data': request_config.get('data', {})
+        }
+
+    def _finish_case(self, case_data: Dict[str, Any], request_config: Dict[str, Any],
+                     result: Dict[str, Any]) -> Dict[str, Any]:
+        """附加报告、保存变量、执行teardown并检查验证结果"""
+        passed = all(vr.get('pass', False) for vr in result.get('validation_results', []))
+
+        # 将数据附加到Allure报告：完整的请求/响应详情按附件策略附加（默认仅失败时）
+        with profiler.phase('allure_attach'):
+            request_details = self._request_details(request_config)
+            if AllureReport.policy.should_attach_body(case_data, failed=not passed):
+                AllureReport.attach_request_response(request_details, result)
+            else:
+                AllureReport.attach_summary(request_details, result)
+
+            # 变量和验证结果
+            AllureReport.attach_variables(result.get('extracted_variables', {}))
+            AllureReport.attach_validation_results(result.get('validation_results', []))
+
+        # 保存提取的变量到extract.yml文件
+        with profiler.phase('save_variables'):
+            self._save_extracted_variables(result.get('extracted_variables', {}))
+
+        # 执行teardown
+        with profiler.phase('teardown'):
+            self._execute_teardown(case_data.get('teardown', []))
+
+        if not passed:
+            failures = [
+                f"{vr.get('field')}: {vr.get('message') or '验证失败'}"
+                for vr in result['validation_results']
+                if not vr.get('pass', False)
+            ]
+            raise AssertionError(f"验证失败:\n" + "\n".join(failures))
+        return result
+
+    def _attach_failure_details(self, request_config: Dict[str, Any], response_received: bool):
+        """
+        附加失败用例的请求/响应详情（在 _finish_case 之前失败时调用）
+        :param request_config: 请求配置
+        :param response_received: 是否已收到响应，收到时附加 last_result 中的响应详情
+        """
+        AllureReport.attach_request(self._request_details(request_config))
+        last_result = self.response_api.last_result
+        if response_received and last_result is not None:
+            AllureReport.attach_response(last_result)
+            AllureReport.attach_validation_results(last_result.get('validation_results', []))
+
+    def _handle_case_error(self, e: Exception):
+        """记录用例执行异常"""
+        allure.attach(
+            body=str(e),
+            name="执行异常",
+            attachment_type=allure.attachment_type.TEXT
+        )
+        allure.attach(
+            body=traceback.format_exc(),
+            name="异常堆栈",
+            attachment_type=allure.attachment_type.TEXT
+        )
+        self.logger.error(f"用例执行失败: {str(e)}")
 
     def _merge_variables(self, external_variables: Dict[str, Any] = None) -> Dict[str, Any]:
         """
@@ -124,14 +171,9 @@ class TestExecutor:
         response_variables = self.response_api.get_all_variables()
         merged_variables.update(response_variables)
 
-        # 第二优先级: extract.yml文件中的变量 (历史提取的变量)
-        try:
-            # 读取extract.yml中的所有变量
-            extract_variables = self._read_all_extract_variables()
-            # extract.yml中的变量会覆盖response_variables中的同名变量
-            merged_variables.update(extract_variables)
-        except Exception as e:
-            self.logger.warning(f"读取extract.yml文件失败: {e}")
+        # 第二优先级: 变量存储中的变量 (历史提取的变量，启动时从extract.yml加载)
+        # 存储中的变量会覆盖response_variables中的同名变量
+        merged_variables.update(self._read_all_extract_variables())
 
         # 第三优先级: 外部传入的变量 (最低优先级)
         if external_variables:
@@ -144,26 +186,16 @@ class TestExecutor:
 
     def _read_all_extract_variables(self) -> Dict[str, Any]:
         """
-        读取extract.yml文件中的所有变量
+        读取变量存储中的所有变量
 
         Returns:
             变量字典
         """
-        try:
-            # 由于yaml_loader中的read_extract只能读取单个节点，需要改进
-            with open(get_object_path() + 'extract.yml', 'r', encoding='utf-8') as f:
-                import yaml
-                data = yaml.safe_load(f)
-                return data if data else {}
-        except FileNotFoundError:
-            return {}
-        except Exception as e:
-            self.logger.warning(f"读取extract.yml失败: {e}")
-            return {}
+        return self.variable_store.snapshot()
 
     def _save_extracted_variables(self, extracted_variables: Dict[str, Any]):
         """
-        保存提取的变量到extract.yml文件
+        保存提取的变量到变量存储，由存储负责写回extract.yml
 
         Args:
             extracted_variables: 提取的变量字典
@@ -171,19 +203,8 @@ class TestExecutor:
         if not extracted_variables:
             return
 
-        try:
-            # 读取现有的变量
-            existing_variables = self._read_all_extract_variables()
-            # 合并变量（新变量会覆盖旧变量）
-            existing_variables.update(extracted_variables)
-            # 写回文件
-            with open(get_object_path() + 'extract.yml', 'w', encoding='utf-8') as f:
-                import yaml
-                yaml.dump(existing_variables, f, allow_unicode=True, default_flow_style=False)
-
-            self.logger.info(f"成功保存变量到extract.yml: {list(extracted_variables.keys())}")
-        except Exception as e:
-            self.logger.error(f"保存变量到extract.yml失败: {e}")
+        self.variable_store.update(extracted_variables)
+        self.logger.info(f"成功保存变量: {list(extracted_variables.keys())}")
 
     def _execute_teardown(self, teardown_config: list):
         """执行teardown操作"""
@@ -200,8 +221,8 @@ class TestExecutor:
                 elif action_type == 'clear_variables':
                     self._clear_specific_variables(params.get('variables', []))
                 elif action_type == 'clean_extract_file':
-                    # 清空extract.yml文件
-                    YamlUtils().clean_extract()
+                    # 清空变量存储及extract.yml文件
+                    self.variable_store.clear()
                     self.logger.info("已清空extract.yml文件")
 
             except Exception as e:
@@ -239,8 +260,8 @@ class TestExecutor:
     def close(self):
         """关闭资源"""
         self.request_api.close()
-        # 关闭时清空extract文件
-        YamlUtils().clean_extract()
+        # 关闭时清空变量存储及extract文件
+        self.variable_store.clear()
 
 
 # if __name__ == '__main__':
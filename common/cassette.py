@@ -0,0 +1,349 @@
+import atexit
+import base64
+import hashlib
+import json
+import os
+import threading
+from datetime import timedelta
+from typing import Dict, Any, Iterable, List, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from requests.cookies import cookiejar_from_dict
+from requests.models import PreparedRequest, Response
+from requests.structures import CaseInsensitiveDict
+
+from common.config import config
+from common.log import test_logger
+from common.parallel import FileLock, run_dir, worker_files, worker_id, worker_path
+
+# 省略默认端口，使 http://host:80/a 与 http://host/a 得到相同的键
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# 录制时脱敏的字段（查询参数、请求体、响应头、JSON 响应体中的键，不区分大小写），可在 config.yml 的 cassette.redact 中配置
+DEFAULT_REDACT = ('access_token', 'refresh_token', 'id_token', 'token', 'password', 'passwd', 'secret',
+                  'client_secret', 'api_key', 'apikey', 'authorization', 'cookie', 'set-cookie', 'credential')
+REDACTED = '***'
+# 短于该长度的响应值不作为密钥在后续请求中替换，避免误替换普通取值
+_MIN_SECRET_LENGTH = 6
+
+
+class CassetteError(Exception):
+    """回放模式下找不到请求对应的录制记录"""
+
+
+def normalize_url(url: str, params: Dict[str, Any] = None, redact: Iterable[str] = ()) -> str:
+    """
+    规范化URL：合并 params、协议与主机小写、省略默认端口、查询参数排序、去掉锚点
+    :param redact: 需要脱敏的查询参数名（小写），其值替换为 ***
+    """
+    if params:
+        prepared = PreparedRequest()
+        prepared.prepare_url(url, params)
+        url = prepared.url
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    redact = frozenset(redact)
+    query = urlencode(sorted(
+        (name, REDACTED if name.lower() in redact else value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+    ))
+    return urlunsplit((scheme, host, parts.path or '/', query, ''))
+
+
+def mask_secrets(data: Any, secrets: Iterable[str]) -> Any:
+    """将字符串（字典、列表中递归）中出现的密钥值替换为 ***"""
+    if isinstance(data, str):
+        for secret in secrets:
+            if secret in data:
+                data = data.replace(secret, REDACTED)
+        return data
+    if isinstance(data, dict):
+        return {key: mask_secrets(value, secrets) for key, value in data.items()}
+    if isinstance(data, list):
+        return [mask_secrets(item, secrets) for item in data]
+    return data
+
+
+def body_hash(json_body: Any = None, data: Any = None, redact: Iterable[str] = ()) -> str:
+    """
+    请求体摘要：JSON 按键排序后序列化，字节/字符串直接计算，表单按键排序
+    :param redact: 需要脱敏的字段名（小写），JSON/表单中这些字段的值按 *** 计算摘要
+    """
+    if json_body is None and isinstance(data, (str, bytes)):
+        # JSON 字符串请求体按 JSON 处理，与 json= 发送的请求体得到相同的脱敏结果
+        try:
+            json_body = json.loads(data)
+        except ValueError:
+            pass
+        else:
+            if not isinstance(json_body, (dict, list)):
+                json_body = None
+    if json_body is not None:
+        raw = json.dumps(redact_value(json_body, redact), sort_keys=True, separators=(',', ':'),
+                         ensure_ascii=False, default=str)
+    elif isinstance(data, bytes):
+        return hashlib.sha1(data).hexdigest()
+    elif isinstance(data, dict):
+        raw = urlencode(sorted((str(k), str(v)) for k, v in redact_value(data, redact).items()))
+    elif data:
+        raw = str(data)
+    else:
+        raw = ''
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def redact_value(data: Any, redact: Iterable[str], found: set = None) -> Any:
+    """
+    将字典（递归）中需要脱敏的键的值替换为 ***
+    :param found: 传入时收集被替换的字符串值
+    """
+    if isinstance(data, dict):
+        redacted = {}
+        for key, value in data.items():
+            if str(key).lower() in redact:
+                if found is not None and isinstance(value, str):
+                    found.add(value)
+                redacted[key] = REDACTED
+            else:
+                redacted[key] = redact_value(value, redact, found)
+        return redacted
+    if isinstance(data, list):
+        return [redact_value(item, redact, found) for item in data]
+    return data
+
+
+def request_key(request_kwargs: Dict[str, Any], redact: Iterable[str] = (), secrets: Iterable[str] = ()) -> str:
+    """
+    请求键：规范化的 方法 + URL + 请求体摘要
+    :param request_kwargs: ApiRequest.prepare_request 返回的请求参数
+    :param redact: 需要脱敏的查询参数、请求体字段名（小写），录制与回放使用相同的脱敏规则，键保持一致
+    :param secrets: 录制时已脱敏的响应值（如登录返回的 token），URL 和请求体中出现时替换为 ***，
+        与回放时从脱敏响应中提取到的 *** 一致
+    """
+    url, params = request_kwargs['url'], request_kwargs.get('params')
+    json_body, data = request_kwargs.get('json'), request_kwargs.get('data')
+    if secrets:
+        url, params, json_body = mask_secrets(url, secrets), mask_secrets(params, secrets), mask_secrets(json_body, secrets)
+        if isinstance(data, bytes):
+            try:
+                data = data.decode('utf-8')
+            except UnicodeDecodeError:
+                pass
+        data = mask_secrets(data, secrets)
+    url = normalize_url(url, params, redact)
+    digest = body_hash(json_body, data, redact)
+    return f"{request_kwargs['method'].upper()} {url} {digest}"
+
+
+class Cassette:
+    """
+    HTTP 录制与回放
+
+    - record: 每次请求后将请求键和响应写入 JSONL 文件（每行一条紧凑 JSON），每个进程首次录制时清空文件重新录制；
+      xdist 工作进程写入各自的 cassette.<worker>.jsonl，会话结束时由主进程合并为录制文件。
+      token、密码等字段（查询参数、请求体、响应头、JSON 响应体）及 cookies 的值脱敏后保存；
+      被脱敏的响应值出现在之后请求的 URL 或请求体中时，请求键中同样替换为 ***，
+      回放时从脱敏响应中提取的变量为 ***，依赖登录 token 等变量的后续请求仍能匹配到录制记录。
+      xdist 执行时这些值通过本次执行的临时目录在工作进程之间共享（run_once 共享的 token 同样适用）
+    - replay: 首次使用时把 JSONL 文件读入 请求键 -> 响应列表 的内存索引，直接构造 requests 响应，不访问网络。
+      同一请求键录制了多次时按录制顺序依次返回，用完后重复返回最后一条
+    """
+
+    MODES = ('off', 'record', 'replay')
+
+    def __init__(self, path: str = None, redact: Iterable[str] = DEFAULT_REDACT):
+        """
+        :param path: 录制文件路径，默认项目根目录下的 cassette.jsonl
+        :param redact: 录制时脱敏的字段名
+        """
+        self.path = path or os.path.join(config.BASE_DIR, 'cassette.jsonl')
+        self.redact = frozenset(name.lower() for name in redact)
+        self.logger = test_logger.get_logger()
+        self._index: Optional[Dict[str, List[Dict[str, Any]]]] = None
+        self._cursor: Dict[str, int] = {}
+        self._file = None
+        # 录制时已脱敏的响应值
+        self._secrets: set = set()
+        self._secrets_size = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls) -> 'Cassette':
+        """根据 config.yml 的 cassette 节点创建"""
+        path = config.get('cassette', 'path', default='cassette.jsonl') or 'cassette.jsonl'
+        redact = config.get('cassette', 'redact', default=None) or DEFAULT_REDACT
+        return cls(path if os.path.isabs(path) else os.path.join(config.BASE_DIR, path), redact)
+
+    @property
+    def mode(self) -> str:
+        mode = config.CASSETTE
+        return mode if mode in self.MODES else 'off'
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == 'record'
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == 'replay'
+
+    def record(self, request_kwargs: Dict[str, Any], response: Any):
+        """
+        写入一条录制记录（本进程首次录制时清空录制文件）
+        :param request_kwargs: 请求参数
+        :param response: requests/httpx 响应
+        """
+        content = response.content or b''
+        found = set()
+        cookies = dict(response.cookies)
+        found.update(value for value in cookies.values() if isinstance(value, str))
+        secrets = self._known_secrets()
+        entry = {
+            'key': request_key(request_kwargs, self.redact, secrets),
+            'method': request_kwargs['method'],
+            'url': normalize_url(mask_secrets(str(response.url), secrets), redact=self.redact),
+            'status_code': response.status_code,
+            'headers': redact_value(dict(response.headers), self.redact, found),
+            'cookies': {name: REDACTED for name in cookies},
+            'encoding': response.encoding,
+            'elapsed': response.elapsed.total_seconds()
+        }
+        try:
+            entry['text'] = mask_secrets(self._redact_text(content.decode('utf-8'), found), secrets)
+        except UnicodeDecodeError:
+            entry['body_b64'] = base64.b64encode(content).decode('ascii')
+        self._add_secrets(found)
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n'
+        with self._lock:
+            if self._file is None:
+                self._file = open(worker_path(self.path), 'w', encoding='utf-8')
+            self._file.write(line)
+            self._file.flush()
+
+    def _redact_text(self, text: str, found: set = None) -> str:
+        """JSON 响应体中的敏感字段脱敏，非 JSON 原样返回"""
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return text
+        if not isinstance(data, (dict, list)):
+            return text
+        return json.dumps(redact_value(data, self.redact, found), ensure_ascii=False, separators=(',', ':'))
+
+    @property
+    def _secrets_path(self) -> str:
+        """xdist 工作进程之间共享已脱敏响应值的文件（本次执行的临时目录，会话结束时删除）"""
+        return os.path.join(run_dir(), 'cassette_secrets.txt')
+
+    def _add_secrets(self, found: set):
+        """登记新的已脱敏响应值，xdist 执行时同时写入共享文件"""
+        found = {value for value in found if len(value) >= _MIN_SECRET_LENGTH and value != REDACTED}
+        with self._lock:
+            found -= self._secrets
+            if not found:
+                return
+            self._secrets.update(found)
+        if worker_id():
+            os.makedirs(run_dir(), mode=0o700, exist_ok=True)
+            with FileLock(f"{self._secrets_path}.lock"), open(self._secrets_path, 'a', encoding='utf-8') as f:
+                f.writelines(json.dumps(value, ensure_ascii=False) + '\n' for value in sorted(found))
+
+    def _known_secrets(self) -> List[str]:
+        """已脱敏的响应值（xdist 执行时合并其他工作进程登记的值），长的在前，避免先替换其中的一部分"""
+        if worker_id() and os.path.exists(self._secrets_path) \
+                and os.path.getsize(self._secrets_path) != self._secrets_size:
+            with FileLock(f"{self._secrets_path}.lock"), open(self._secrets_path, encoding='utf-8') as f:
+                values = {json.loads(line) for line in f if line.strip()}
+                size = f.tell()
+            with self._lock:
+                self._secrets.update(values)
+                self._secrets_size = size
+        with self._lock:
+            return sorted(self._secrets, key=len, reverse=True)
+
+    def start_session(self):
+        """录制会话开始（主进程调用）：清空录制文件，删除上次执行遗留的工作进程录制文件"""
+        if not self.recording:
+            return
+        for path in worker_files(self.path):
+            os.remove(path)
+        with open(self.path, 'w', encoding='utf-8'):
+            pass
+
+    def finish_session(self):
+        """录制会话结束（主进程调用）：将各工作进程的录制文件按工作进程编号合并到录制文件"""
+        self.close()
+        files = worker_files(self.path) if self.recording else []
+        if not files:
+            return
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as target:
+            for path in files:
+                with open(path, encoding='utf-8') as source:
+                    for line in source:
+                        target.write(line)
+        os.replace(temp_path, self.path)
+        for path in files:
+            os.remove(path)
+        self.logger.info(f"已合并 {len(files)} 个工作进程的录制文件: {self.path}")
+
+    def _load(self) -> Dict[str, List[Dict[str, Any]]]:
+        """读取录制文件并建立索引"""
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    index: Dict[str, List[Dict[str, Any]]] = {}
+                    if os.path.exists(self.path):
+                        with open(self.path, encoding='utf-8') as f:
+                            for line in f:
+                                if line.strip():
+                                    entry = json.loads(line)
+                                    index.setdefault(entry['key'], []).append(entry)
+                    self._index = index
+                    self.logger.info(f"已加载录制记录: {sum(len(v) for v in index.values())} 条, 文件: {self.path}")
+        return self._index
+
+    def replay(self, request_kwargs: Dict[str, Any]) -> Response:
+        """
+        返回请求对应的录制响应
+        :raises CassetteError: 没有对应的录制记录
+        """
+        key = request_key(request_kwargs, self.redact)
+        entries = self._load().get(key)
+        if not entries:
+            raise CassetteError(f"没有录制记录: {key}")
+        with self._lock:
+            position = self._cursor.get(key, 0)
+            self._cursor[key] = position + 1
+        return self.build_response(entries[min(position, len(entries) - 1)])
+
+    @staticmethod
+    def build_response(entry: Dict[str, Any]) -> Response:
+        """由录制记录构造 requests 响应"""
+        response = Response()
+        response.status_code = entry['status_code']
+        response.headers = CaseInsensitiveDict(entry.get('headers') or {})
+        response.url = entry.get('url')
+        response.encoding = entry.get('encoding')
+        response.elapsed = timedelta(seconds=entry.get('elapsed', 0))
+        response.cookies = cookiejar_from_dict(entry.get('cookies') or {})
+        if 'body_b64' in entry:
+            response._content = base64.b64decode(entry['body_b64'])
+        else:
+            response._content = (entry.get('text') or '').encode('utf-8')
+        return response
+
+    def close(self):
+        """关闭录制文件"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+# 全局录制回放实例
+cassette = Cassette.from_config()
+atexit.register(cassette.close)
@@ -1,26 +1,33 @@
 import os
-from typing import Dict, Any
+import threading
+from types import MappingProxyType
+from typing import Dict, Any, Mapping
+
+import yaml
+
+
+def _freeze(value: Any) -> Any:
+    """递归转换为只读结构（dict -> MappingProxyType, list -> tuple）"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
 
 
 class Config:
     """配置管理类"""
 
-    def __init__(self):
+    def __init__(self, config_file: str = None):
         # 基础路径配置
         self.BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         self.DATA_DIR = os.path.join(self.BASE_DIR, 'data')
         self.CASE_DATA_DIR = os.path.join(self.BASE_DIR, 'case_data')
         self.TESTS_DIR = os.path.join(self.BASE_DIR, 'tests')
+        self.CONFIG_FILE = config_file or os.path.join(self.BASE_DIR, 'config.yml')
 
-        # 环境配置
-        self.ENV = os.getenv('TEST_ENV', 'dev')
-
-        # 不同环境的URL配置
-        self.URLS = {
-            'dev': 'http://dev.example.com',
-            'test': 'http://test.example.com',
-            'prod': 'http://api.example.com'
-        }
+        # 默认环境（未设置 --env / TEST_ENV 时使用）
+        self.DEFAULT_ENV = 'dev'
 
         # 请求配置
         self.TIMEOUT = 30
@@ -29,10 +36,98 @@ class Config:
         # 全局变量存储
         self.global_variables: Dict[str, Any] = {}
 
+        # config.yml 只读快照（首次访问时加载）及各环境的基础地址表
+        self._data = None
+        self._base_urls: Dict[str, Mapping[str, str]] = {}
+        self._lock = threading.Lock()
+
     @property
-    def BASE_URL(self) -> str:
-        """获取基础URL"""
-        return self.URLS.get(self.ENV, self.URLS['dev'])
+    def ENV(self) -> str:
+        """当前测试环境，由 --env 选项写入 TEST_ENV"""
+        return os.getenv('TEST_ENV', self.DEFAULT_ENV)
+
+    @property
+    def ENGINE(self) -> str:
+        """请求执行引擎: sync/async，由 --engine 选项写入 TEST_ENGINE，默认取 config.yml 的 http.engine"""
+        return os.getenv('TEST_ENGINE') or self.get('http', 'engine', default='sync') or 'sync'
+
+    @property
+    def PROFILE(self) -> str:
+        """框架开销分析模式: off/phases/cprofile/pyinstrument，由 --profile 选项写入 TEST_PROFILE，默认取 config.yml 的 profile.mode"""
+        return os.getenv('TEST_PROFILE') or self.get('profile', 'mode', default='off') or 'off'
+
+    @property
+    def CASSETTE(self) -> str:
+        """HTTP 录制回放模式: off/record/replay，由 --cassette 选项写入 TEST_CASSETTE，默认取 config.yml 的 cassette.mode"""
+        return os.getenv('TEST_CASSETTE') or self.get('cassette', 'mode', default='off') or 'off'
+
+    @property
+    def CSV_SHARD(self) -> str:
+        """CSV 流式数据源的分片: 分片序号/分片总数（序号从0开始，如 0/4），由 --csv-shard 选项写入 TEST_CSV_SHARD，默认取 config.yml 的 csv.shard"""
+        return os.getenv('TEST_CSV_SHARD') or self.get('csv', 'shard', default='0/1') or '0/1'
+
+    @property
+    def data(self) -> Mapping[str, Any]:
+        """config.yml 的只读内容，整个进程只解析一次"""
+        if self._data is None:
+            with self._lock:
+                if self._data is None:
+                    with open(self.CONFIG_FILE, encoding='utf-8') as f:
+                        self._data = _freeze(yaml.load(stream=f, Loader=yaml.FullLoader) or {})
+        return self._data
+
+    def get(self, one_node: str, two_node: str = None, default: Any = None) -> Any:
+        """
+        读取配置节点
+        :param one_node: 第一节点名
+        :param two_node: 第二节点名
+        :param default: 节点不存在时的默认值
+        :return:
+        """
+        value = self.data.get(one_node, default)
+        if two_node is None:
+            return value
+        if not isinstance(value, Mapping):
+            return default
+        return value.get(two_node, default)
+
+    def base_urls(self, env: str = None) -> Mapping[str, str]:
+        """
+        获取指定环境的基础地址表：config.yml 中 base 节点，
+        叠加 env.<环境> 节点中的同名覆盖，结果按环境缓存
+        :param env: 环境名，默认当前环境
+        :return: 只读的 地址键 -> 地址 映射
+        """
+        env = env or self.ENV
+        urls = self._base_urls.get(env)
+        if urls is None:
+            merged = dict(self.get('base', default={}) or {})
+            merged.update(self.get('env', env, default={}) or {})
+            urls = MappingProxyType(merged)
+            self._base_urls[env] = urls
+        return urls
+
+    def get_base_url(self, url_key: str = None) -> str:
+        """
+        根据用例中的 url 键（如 ed_url、ht_url）获取当前环境的基础地址
+        :param url_key: 地址键，为空时使用地址表中的 base_url
+        :return:
+        :raises KeyError: 当前环境未配置该地址
+        """
+        url_key = url_key or 'base_url'
+        try:
+            return self.base_urls()[url_key]
+        except KeyError:
+            if url_key == 'base_url':
+                raise KeyError(f"用例未指定 url，且 config.yml 的 base/env.{self.ENV} 中未配置 base_url "
+                               f"(环境: {self.ENV})") from None
+            raise KeyError(f"config.yml 中未配置地址: {url_key} (环境: {self.ENV})") from None
+
+    def reload(self):
+        """丢弃已加载的配置，下次访问时重新读取 config.yml"""
+        with self._lock:
+            self._data = None
+            self._base_urls = {}
 
     def set_global_variable(self, key: str, value: Any) -> None:
         """设置全局变量"""
@@ -44,4 +139,4 @@ class Config:
 
 
 # 创建全局配置实例
-config = Config()
\ No newline at end of file
+config = Config()
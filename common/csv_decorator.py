@@ -1,7 +1,20 @@
 import os
 import csv as csv_module
+import hashlib
 import inspect
+import json
+import pickle
+import re
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
 import pytest
+import yaml
+
+from common.config import config
+
+# CSV 解析结果: (用例数据列表, 第一列名称)
+CsvData = Tuple[List[Dict[str, Any]], Optional[str]]
 
 
 def csv(csv_file_path: str, **kwargs):
@@ -17,8 +30,8 @@ def csv(csv_file_path: str, **kwargs):
     """
 
     def decorator(test_func):
-        # 获取 CSV 数据
-        test_cases, first_column_name = _read_csv_file(csv_file_path)
+        # 获取 CSV 数据（相对路径按被装饰函数所在文件的目录查找）
+        test_cases, first_column_name = csv_cache.load(_resolve_path(csv_file_path, test_func))
 
         if not test_cases:
             test_cases = [{}]
@@ -58,85 +71,390 @@ def csv(csv_file_path: str, **kwargs):
     return decorator
 
 
-def _read_csv_file(file_path: str):
-    """读取 CSV 文件，返回数据列表和第一列的名称"""
+def _resolve_path(file_path: str, test_func: Callable = None) -> str:
+    """
+    查找 CSV 文件：原路径存在时直接使用，否则依次尝试被装饰函数所在目录、其下的 data/test_data 目录和项目 csv 目录
+    通过 __code__.co_filename 取得函数所在文件，不遍历调用栈
+    """
+    if os.path.exists(file_path):
+        return os.path.abspath(file_path)
 
-    # 处理文件路径
-    if not os.path.exists(file_path):
-        # 尝试从调用者目录查找
-        stack = inspect.stack()
-        for frame in stack:
-            if 'decorator' in frame.function or frame.function == 'csv':
-                caller_file = frame.filename
-                caller_dir = os.path.dirname(caller_file)
-
-                possible_paths = [
-                    os.path.join(caller_dir, file_path),
-                    os.path.join(caller_dir, 'data', file_path),
-                    os.path.join(caller_dir, 'test_data', file_path),
-                    file_path
-                ]
-
-                for path in possible_paths:
-                    if os.path.exists(path):
-                        file_path = path
-                        break
-                break
+    candidates = []
+    code = getattr(inspect.unwrap(test_func), '__code__', None) if test_func else None
+    if code is not None:
+        caller_dir = os.path.dirname(os.path.abspath(code.co_filename))
+        candidates += [
+            os.path.join(caller_dir, file_path),
+            os.path.join(caller_dir, 'data', file_path),
+            os.path.join(caller_dir, 'test_data', file_path),
+        ]
+    candidates.append(os.path.join(config.BASE_DIR, 'csv', file_path))
+
+    for path in candidates:
+        if os.path.exists(path):
+            return os.path.abspath(path)
+    raise FileNotFoundError(f"CSV 文件不存在: {file_path}")
+
+
+class CsvCache:
+    """
+    CSV 解析结果缓存
+
+    以 文件绝对路径 为键，文件的修改时间、大小及 schema 文件的修改时间作为版本，文件未变化时直接返回上次的解析结果。
+    配置 cache_dir 后解析结果同时以 pickle 写入该目录，后续 pytest 进程（包括 xdist 工作进程）收集用例时直接读取。
+    返回的每行数据都是副本，用例修改 data 不会影响其他用例。
+    """
+
+    # 磁盘缓存格式版本，解析规则变化时递增使旧缓存失效
+    VERSION = 2
+
+    def __init__(self, cache_dir: str = None):
+        """
+        :param cache_dir: 磁盘缓存目录，为空时只在内存中缓存
+        """
+        self.cache_dir = cache_dir
+        self._cache: Dict[str, Tuple[Tuple[int, int, int], CsvData]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls) -> 'CsvCache':
+        """根据 config.yml 的 csv 节点创建"""
+        cache_dir = config.get('csv', 'cache_dir')
+        if cache_dir and not os.path.isabs(cache_dir):
+            cache_dir = os.path.join(config.BASE_DIR, cache_dir)
+        return cls(cache_dir or None)
+
+    def load(self, file_path: str) -> CsvData:
+        """
+        读取 CSV 文件（优先使用缓存）
+        :param file_path: CSV 文件路径
+        :return: (用例数据列表, 第一列名称)
+        """
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        schema_path = CsvSchema.schema_path(path)
+        schema_mtime = os.stat(schema_path).st_mtime_ns if os.path.exists(schema_path) else 0
+        version = (stat.st_mtime_ns, stat.st_size, schema_mtime)
+
+        with self._lock:
+            cached = self._cache.get(path)
+        if cached is None or cached[0] != version:
+            data = self._load_disk(path, version)
+            if data is None:
+                data = _read_csv_file(path)
+                self._save_disk(path, version, data)
+            cached = (version, data)
+            with self._lock:
+                self._cache[path] = cached
+
+        cases, first_column_name = cached[1]
+        return [dict(case) for case in cases], first_column_name
+
+    def _disk_path(self, path: str) -> str:
+        name = hashlib.sha1(path.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{name}.pickle")
+
+    def _load_disk(self, path: str, version: Tuple[int, int, int]) -> Optional[CsvData]:
+        """读取磁盘缓存，不存在、版本不符或已损坏时返回None"""
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._disk_path(path), 'rb') as f:
+                entry = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+            return None
+        if entry.get('format') != self.VERSION or entry.get('path') != path or entry.get('version') != version:
+            return None
+        return entry['data']
+
+    def _save_disk(self, path: str, version: Tuple[int, int, int], data: CsvData):
+        """写入磁盘缓存（先写临时文件再替换，多进程同时收集时不会读到半个文件）"""
+        if not self.cache_dir:
+            return
+        disk_path = self._disk_path(path)
+        temp_path = f"{disk_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(temp_path, 'wb') as f:
+                pickle.dump({'format': self.VERSION, 'path': path, 'version': version, 'data': data},
+                            f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, disk_path)
+        except OSError:
+            # 缓存写入失败不影响用例收集
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def clear(self):
+        """清空内存缓存"""
+        with self._lock:
+            self._cache.clear()
+
+
+# 自动推断时识别的常量（不区分大小写）
+_AUTO_CONSTANTS = {'true': True, 'false': False, 'null': None, 'none': None}
+_MISSING = object()
+
+# 与 int()/float() 接受的格式一致，先匹配再转换，不依赖异常判断
+_INT_PATTERN = re.compile(r'\s*[+-]?\d+(?:_\d+)*\s*')
+_FLOAT_PATTERN = re.compile(r'\s*[+-]?(?=\.?\d)(?:\d+(?:_\d+)*)?\.(?:\d+(?:_\d+)*)?(?:[eE][+-]?\d+(?:_\d+)*)?\s*')
+
+_BOOL_VALUES = {'true': True, '1': True, 'yes': True, 'y': True,
+                'false': False, '0': False, 'no': False, 'n': False}
+
+
+def _auto(value: str) -> Any:
+    """未声明类型的列：true/false/null/none 转为常量，含小数点的数字转 float，整数转 int，其余保持字符串"""
+    constant = _AUTO_CONSTANTS.get(value.lower(), _MISSING)
+    if constant is not _MISSING:
+        return constant
+    if '.' in value:
+        return float(value) if _FLOAT_PATTERN.fullmatch(value) else value
+    return int(value) if _INT_PATTERN.fullmatch(value) else value
+
+
+def _to_bool(value: str) -> bool:
+    result = _BOOL_VALUES.get(value.strip().lower())
+    if result is None:
+        raise ValueError(f"无法转换为 bool: {value}")
+    return result
+
+
+# 列类型 -> 转换函数，可注册自定义类型，如 COLUMN_TYPES['decimal'] = Decimal
+COLUMN_TYPES: Dict[str, Callable[[str], Any]] = {
+    'auto': _auto,
+    'str': str,
+    'int': int,
+    'float': float,
+    'bool': _to_bool,
+    'json': json.loads,
+}
+
+
+class CsvSchema:
+    """
+    CSV 列类型定义
+
+    列类型可以写在表头（如 code:str、price:float），也可以写在同名的 schema 文件中
+    （login.csv -> login.schema.yml，内容为 列名: 类型），两者同时存在时以 schema 文件为准，未声明的列按 auto 推断。
+    读取表头时为每列确定一次转换函数，之后逐行按列直接调用。空值统一转为 None。
+    """
 
+    def __init__(self, header: List[str], types: Dict[str, str] = None):
+        """
+        :param header: CSV 表头
+        :param types: 列名 -> 类型名，优先于表头注解
+        """
+        types = dict(types or {})
+        self.columns: List[Tuple[int, str, Callable[[str], Any]]] = []
+        self.first_column_name: Optional[str] = None
+        for index, raw in enumerate(header):
+            key, type_name = self._parse_header(raw or '')
+            if index == 0:
+                self.first_column_name = key or None
+            if not key:
+                continue
+            type_name = types.pop(key, type_name)
+            converter = COLUMN_TYPES.get(type_name)
+            if converter is None:
+                raise ValueError(f"CSV 列 {key} 的类型不支持: {type_name}，可选: {', '.join(COLUMN_TYPES)}")
+            self.columns.append((index, key, converter))
+        if types:
+            raise ValueError(f"schema 中的列在 CSV 表头中不存在: {', '.join(types)}")
+
+    @staticmethod
+    def _parse_header(raw: str) -> Tuple[str, str]:
+        """表头 code:str -> (code, str)，冒号后不是已知类型时整体作为列名"""
+        key = raw.strip()
+        name, separator, type_name = key.rpartition(':')
+        if separator and type_name.strip() in COLUMN_TYPES:
+            return name.strip(), type_name.strip()
+        return key, 'auto'
+
+    @classmethod
+    def schema_path(cls, file_path: str) -> str:
+        """CSV 文件对应的 schema 文件路径"""
+        return f"{os.path.splitext(file_path)[0]}.schema.yml"
+
+    @classmethod
+    def for_file(cls, file_path: str, header: List[str]) -> 'CsvSchema':
+        """根据表头注解和 schema 文件创建"""
+        schema_path = cls.schema_path(file_path)
+        types = None
+        if os.path.exists(schema_path):
+            with open(schema_path, 'r', encoding='utf-8') as f:
+                types = yaml.safe_load(f) or {}
+            if not isinstance(types, dict):
+                raise ValueError(f"schema 文件格式错误，应为 列名: 类型: {schema_path}")
+            types = {str(key): str(value) for key, value in types.items()}
+        return cls(header, types)
+
+    def convert(self, values: List[str], i: int, file_name: str) -> Dict[str, Any]:
+        """
+        转换一行数据
+        :param values: 原始值列表，按列顺序
+        :param i: 数据行序号（从0开始）
+        :param file_name: CSV 文件名
+        """
+        width = len(values)
+        clean_row = {}
+        for index, key, converter in self.columns:
+            value = values[index] if index < width else None
+            # 第一列为空时使用默认值
+            if index == 0 and not value:
+                value = f"test_case_{i + 1}"
+            if not value:
+                clean_row[key] = None
+                continue
+            try:
+                clean_row[key] = converter(value)
+            except ValueError as e:
+                raise ValueError(f"{file_name} 第{i + 1}行 列 {key} 转换失败: {e}") from None
+
+        # 添加元数据
+        clean_row['_csv_row'] = i + 1
+        clean_row['_csv_file'] = file_name
+        if self.first_column_name:
+            clean_row['_first_column'] = self.first_column_name
+        return clean_row
+
+
+def _data_rows(reader: Iterator[List[str]]) -> Iterator[Tuple[int, List[str]]]:
+    """数据行 (序号, 原始值列表)，与 DictReader 一致，空行不计入序号"""
+    i = 0
+    for values in reader:
+        if values:
+            yield i, values
+            i += 1
+
+
+def _read_csv_file(file_path: str) -> CsvData:
+    """读取 CSV 文件，返回数据列表和第一列的名称"""
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"CSV 文件不存在: {file_path}")
-    cases = []
-    first_column_name = None
+    file_name = os.path.basename(file_path)
 
-    with open(file_path, 'r', encoding='utf-8-sig') as f:
-        reader = csv_module.DictReader(f)
+    with open(file_path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv_module.reader(f)
+        header = next(reader, None)
+        if not header:
+            return [], None
+        schema = CsvSchema.for_file(file_path, header)
+        cases = [schema.convert(values, i, file_name) for i, values in _data_rows(reader)]
 
-        # 获取第一列的名称
-        if reader.fieldnames:
-            first_column_name = reader.fieldnames[0]
+    return cases, schema.first_column_name
+
+
+def csv_shard() -> Tuple[int, int]:
+    """
+    当前机器的 CSV 分片 (分片序号, 分片总数)，取自 --csv-shard / TEST_CSV_SHARD / config.yml 的 csv.shard
+    """
+    value = str(config.CSV_SHARD)
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise ValueError(f"CSV 分片格式错误: {value}，应为 分片序号/分片总数，如 0/4")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"CSV 分片超出范围: {value}")
+    return index, count
+
+
+class CsvBatch:
+    """
+    流式 CSV 数据源的一个批次
+
+    迭代时逐行读取文件，只转换属于本批次的行，不在内存中保留整个文件。
+    数据行按行号确定归属：先按 行号 % 分片总数 分到各机器，机器内再按 (行号 // 分片总数) % 批次数 分到各批次，
+    同一文件、同样的分片与批次数下每行的归属固定不变。
+    """
 
-        for i, row in enumerate(reader):
-            clean_row = {}
+    def __init__(self, file_path: str, batch: int, batches: int, shard: Tuple[int, int] = (0, 1)):
+        """
+        :param file_path: CSV 文件路径
+        :param batch: 批次序号（从0开始）
+        :param batches: 批次总数
+        :param shard: (分片序号, 分片总数)
+        """
+        self.file_path = file_path
+        self.batch = batch
+        self.batches = batches
+        self.shard = shard
 
-            # 处理每一列
-            for j, (key, value) in enumerate(row.items()):
-                if not key or not key.strip():
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        shard_index, shard_count = self.shard
+        file_name = os.path.basename(self.file_path)
+        with open(self.file_path, 'r', encoding='utf-8-sig', newline='') as f:
+            reader = csv_module.reader(f)
+            header = next(reader, None)
+            if not header:
+                return
+            schema = CsvSchema.for_file(self.file_path, header)
+            for i, values in _data_rows(reader):
+                if i % shard_count != shard_index or (i // shard_count) % self.batches != self.batch:
                     continue
+                yield schema.convert(values, i, file_name)
+
+    def each(self, func: Callable[[Dict[str, Any]], Any], max_failures: int = None) -> int:
+        """
+        逐行执行 func，单行失败不中断批次，全部执行完后汇总抛出 AssertionError
+        :param func: 每行数据执行的函数，如 lambda data: te().case('e_push.yml', '维护债券', data)
+        :param max_failures: 失败行数达到该值时提前结束批次
+        :return: 执行的行数
+        """
+        count = 0
+        failures = []
+        for row in self:
+            count += 1
+            try:
+                func(row)
+            except Exception as e:
+                first_column = row.get('_first_column')
+                failures.append(f"第{row['_csv_row']}行 {row.get(first_column, '') if first_column else ''}: {e}")
+                if max_failures and len(failures) >= max_failures:
+                    break
+        if failures:
+            shown = '\n'.join(failures[:20])
+            more = f"\n... 其余 {len(failures) - 20} 行省略" if len(failures) > 20 else ''
+            raise AssertionError(f"{self} 执行 {count} 行，失败 {len(failures)} 行:\n{shown}{more}")
+        return count
+
+    def __repr__(self) -> str:
+        shard_index, shard_count = self.shard
+        return (f"CsvBatch({os.path.basename(self.file_path)}, batch={self.batch + 1}/{self.batches}, "
+                f"shard={shard_index}/{shard_count})")
+
+
+def csv_stream(csv_file_path: str, batches: int = None, **kwargs):
+    """
+    流式 CSV 参数化装饰器 - 适用于行数很多的数据文件
+
+    收集用例时不读取文件内容，只生成 batches 个用例，每个用例得到一个可迭代的批次 rows，
+    执行时逐行读取属于该批次的数据。pytest-xdist 将各批次分发到不同工作进程，
+    多台机器执行时用 --csv-shard 分片序号/分片总数 划分数据行。
+
+    用法：
+    @csv_stream('bond_price.csv', batches=8)
+    def test_example(rows):
+        rows.each(lambda data: te().case('e_push.yml', '维护债券', data))
+
+    :param csv_file_path: CSV 文件路径，相对路径的查找规则同 csv
+    :param batches: 批次数，默认取 xdist 工作进程数（未使用 xdist 时为1）
+    """
+
+    def decorator(test_func):
+        file_path = _resolve_path(csv_file_path, test_func)
+        count = batches or int(os.getenv('PYTEST_XDIST_WORKER_COUNT') or 1)
+        shard = csv_shard()
+
+        parametrize_kwargs = {
+            'argnames': 'rows',
+            'argvalues': [CsvBatch(file_path, batch, count, shard) for batch in range(count)],
+            'ids': [f"batch_{batch + 1}of{count}" for batch in range(count)],
+        }
+        parametrize_kwargs.update(kwargs)
+        return pytest.mark.parametrize(**parametrize_kwargs)(test_func)
+
+    return decorator
+
 
-                key = key.strip()
-
-                # 第一列特别处理（确保有值）
-                if j == 0 and (value is None or value == ''):
-                    # 如果第一列为空，使用默认值
-                    value = f"test_case_{i + 1}"
-
-                # 类型转换
-                if value is None or value == '':
-                    clean_row[key] = None
-                elif value.lower() == 'true':
-                    clean_row[key] = True
-                elif value.lower() == 'false':
-                    clean_row[key] = False
-                elif value.lower() == 'null' or value.lower() == 'none':
-                    clean_row[key] = None
-                else:
-                    # 尝试转换为数字
-                    try:
-                        if '.' in value:
-                            clean_row[key] = float(value)
-                        else:
-                            clean_row[key] = int(value)
-                    except ValueError:
-                        clean_row[key] = value
-
-            # 添加元数据
-            clean_row['_csv_row'] = i + 1
-            clean_row['_csv_file'] = os.path.basename(file_path)
-
-            # 记录第一列的名称
-            if first_column_name:
-                clean_row['_first_column'] = first_column_name
-
-            cases.append(clean_row)
-
-    return cases, first_column_name
\ No newline at end of file
+# 全局 CSV 解析缓存实例
+csv_cache = CsvCache.from_config()
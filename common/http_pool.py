@@ -0,0 +1,117 @@
+import threading
+from typing import Dict, Any
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from common.config import config
+from common.log import test_logger
+
+
+class ConnectionPoolManager:
+    """
+    进程级连接池管理器
+
+    所有 ApiRequest 的会话共享同一个 HTTPAdapter，按主机维护 keep-alive 连接池，
+    TCP/TLS 握手在每个进程内每个主机只需进行一次。会话本身（cookies、请求头）仍然相互独立。
+    """
+
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 10,
+                 max_retries: int = 3, backoff_factor: float = 0.3):
+        """
+        :param pool_connections: 缓存的主机连接池数量
+        :param pool_maxsize: 每个主机连接池保持的最大连接数
+        :param max_retries: 连接失败重试次数（读超时仅对幂等方法重试）
+        :param backoff_factor: 重试退避因子
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self._adapter = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls) -> 'ConnectionPoolManager':
+        """根据 config.yml 的 http 节点创建"""
+        http_config = config.get('http', default={}) or {}
+        return cls(
+            pool_connections=http_config.get('pool_connections', 10),
+            pool_maxsize=http_config.get('pool_maxsize', 10),
+            max_retries=http_config.get('max_retries', config.MAX_RETRIES),
+            backoff_factor=http_config.get('backoff_factor', 0.3)
+        )
+
+    @property
+    def adapter(self) -> HTTPAdapter:
+        """共享的连接适配器（首次使用时创建）"""
+        if self._adapter is None:
+            with self._lock:
+                if self._adapter is None:
+                    retry = Retry(
+                        total=self.max_retries,
+                        connect=self.max_retries,
+                        read=self.max_retries,
+                        status=0,
+                        backoff_factor=self.backoff_factor,
+                        raise_on_status=False
+                    )
+                    self._adapter = HTTPAdapter(
+                        pool_connections=self.pool_connections,
+                        pool_maxsize=self.pool_maxsize,
+                        max_retries=retry
+                    )
+        return self._adapter
+
+    def session(self) -> requests.Session:
+        """创建一个使用共享连接池的会话"""
+        session = requests.Session()
+        adapter = self.adapter
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def release(self, session: requests.Session):
+        """释放会话，保留共享连接池中的连接"""
+        session.cookies.clear()
+        session.adapters.clear()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        连接复用统计
+        :return: {主机: {'connections': 新建连接数, 'requests': 请求数, 'reused': 复用连接的请求数}}
+        """
+        if self._adapter is None:
+            return {}
+        pools = self._adapter.poolmanager.pools
+        result = {}
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host = f"{pool.scheme}://{pool.host}:{pool.port}"
+            result[host] = {
+                'connections': pool.num_connections,
+                'requests': pool.num_requests,
+                'reused': max(pool.num_requests - pool.num_connections, 0)
+            }
+        return result
+
+    def log_stats(self):
+        """输出连接复用统计"""
+        logger = test_logger.get_logger()
+        for host, item in self.stats().items():
+            logger.info(f"连接池 {host}: 请求 {item['requests']} 次, "
+                        f"新建连接 {item['connections']} 个, 复用 {item['reused']} 次")
+
+    def close(self):
+        """关闭所有连接"""
+        with self._lock:
+            if self._adapter is not None:
+                self._adapter.close()
+                self._adapter = None
+
+
+# 全局连接池管理器实例
+http_pool = ConnectionPoolManager.from_config()
@@ -0,0 +1,205 @@
+import argparse
+import json
+import math
+import threading
+import time
+from collections import Counter
+from typing import Dict, Any, List, Optional, Sequence
+
+from common.base_api import TestExecutor
+from common.log import test_logger
+from common.variable_store import VariableStore, variable_store
+
+
+def percentile(sorted_values: List[float], percent: float) -> float:
+    """最近秩法计算百分位数（输入需已排序）"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(percent / 100.0 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class LoadTestReport:
+    """压测结果统计"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.requests: Counter = Counter()
+        self.errors: Dict[str, Counter] = {}
+        self.started = 0.0
+        self.finished = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, step: str, latency: Optional[float], error: Optional[str] = None):
+        """记录一次请求"""
+        with self._lock:
+            self.requests[step] += 1
+            if latency is not None:
+                self.latencies.setdefault(step, []).append(latency)
+            if error:
+                self.errors.setdefault(step, Counter())[error] += 1
+
+    @staticmethod
+    def _summary(latencies: List[float], count: int, errors: Counter, elapsed: float) -> Dict[str, Any]:
+        values = sorted(latencies)
+        return {
+            'requests': count,
+            'errors': sum(errors.values()),
+            'throughput': round(count / elapsed, 2) if elapsed > 0 else 0.0,
+            'p50': percentile(values, 50),
+            'p90': percentile(values, 90),
+            'p99': percentile(values, 99),
+            'max': values[-1] if values else 0.0,
+            'error_breakdown': dict(errors.most_common())
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        汇总结果（耗时单位: 秒，吞吐量单位: 请求/秒）
+        :return: {'duration', 'total': 汇总, 'steps': {用例: 统计}}
+        """
+        elapsed = (self.finished or time.time()) - self.started
+        all_latencies = [value for values in self.latencies.values() for value in values]
+        all_errors = sum(self.errors.values(), Counter())
+        return {
+            'duration': round(elapsed, 3),
+            'total': self._summary(all_latencies, sum(self.requests.values()), all_errors, elapsed),
+            'steps': {
+                step: self._summary(self.latencies.get(step, []), count, self.errors.get(step, Counter()), elapsed)
+                for step, count in self.requests.items()
+            }
+        }
+
+
+class LoadRunner:
+    """
+    压测模式 - 复用 YAML 用例
+
+    每个虚拟用户循环执行用例流程，拥有独立的变量作用域（初始变量来自全局变量存储和传入变量）
+    和独立的会话（Cookie、长连接在流程的各步骤之间保持），
+    时延取框架记录的 response_time，错误按验证失败项/异常类型分类统计。
+    """
+
+    def __init__(self, flow: Sequence[Sequence], concurrency: int = 10, duration: float = 60,
+                 rps: float = None, variables: Dict[str, Any] = None, ramp_up: float = 0):
+        """
+        :param flow: 用例流程，每项为 (用例文件, 用例名) 或 (用例文件, 用例名, 变量)
+        :param concurrency: 虚拟用户数
+        :param duration: 持续时间（秒）
+        :param rps: 目标每秒请求数，为空时不限速
+        :param variables: 所有虚拟用户共用的初始变量
+        :param ramp_up: 虚拟用户逐步启动的总时长（秒）
+        """
+        if not flow:
+            raise ValueError("压测流程不能为空")
+        self.flow = [tuple(step) for step in flow]
+        self.concurrency = concurrency
+        self.duration = duration
+        self.rps = rps
+        self.variables = dict(variables or {})
+        self.ramp_up = ramp_up
+        self.report = LoadTestReport()
+        self.logger = test_logger.get_logger()
+        self._next_slot = 0.0
+        self._pace_lock = threading.Lock()
+
+    def _acquire_slot(self, deadline: float) -> bool:
+        """按目标 RPS 分配发送时刻，超过截止时间返回False"""
+        if not self.rps:
+            return time.time() < deadline
+        with self._pace_lock:
+            slot = max(self._next_slot, time.time())
+            self._next_slot = slot + 1.0 / self.rps
+        if slot >= deadline:
+            return False
+        delay = slot - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        return True
+
+    @staticmethod
+    def _classify_error(executor: TestExecutor, error: Exception) -> str:
+        """错误分类：验证失败按 字段 比较器 期望值 归类，其他按异常类型"""
+        last_result = executor.response_api.last_result
+        if isinstance(error, AssertionError) and last_result:
+            for vr in last_result.get('validation_results', []):
+                if not vr.get('pass', False):
+                    return f"验证失败: {vr.get('field')} {vr.get('comparator')} {vr.get('expected')}"
+        return type(error).__name__
+
+    def _virtual_user(self, deadline: float):
+        """单个虚拟用户：在独立变量作用域中循环执行流程，整个生命周期使用同一个执行器（会话、Cookie、长连接）"""
+        store = VariableStore()
+        store.update(variable_store.snapshot())
+        executor = TestExecutor(store)
+        try:
+            while True:
+                for step in self.flow:
+                    if not self._acquire_slot(deadline):
+                        return
+                    path, case_name = step[0], step[1]
+                    data = dict(self.variables)
+                    if len(step) > 2 and step[2]:
+                        data.update(step[2])
+                    name = f"{path}::{case_name}"
+                    # 请求未发出时不沿用上一步的结果
+                    executor.response_api.last_result = None
+                    try:
+                        result = executor.case(path, case_name, data)
+                        self.report.record(name, result.get('response_time'))
+                    except Exception as e:
+                        last_result = executor.response_api.last_result
+                        latency = last_result.get('response_time') if last_result else None
+                        self.report.record(name, latency, self._classify_error(executor, e))
+        finally:
+            executor.request_api.close()
+
+    def run(self) -> Dict[str, Any]:
+        """执行压测并返回汇总结果"""
+        self.report.started = time.time()
+        deadline = self.report.started + self.duration
+        self._next_slot = self.report.started
+        threads = []
+        for index in range(self.concurrency):
+            thread = threading.Thread(target=self._virtual_user, args=(deadline,),
+                                      name=f"vu-{index}", daemon=True)
+            threads.append(thread)
+            thread.start()
+            if self.ramp_up and self.concurrency > 1:
+                time.sleep(self.ramp_up / (self.concurrency - 1))
+        for thread in threads:
+            thread.join()
+        self.report.finished = time.time()
+
+        summary = self.report.summary()
+        total = summary['total']
+        self.logger.info(
+            f"压测完成: 请求 {total['requests']} 次, 错误 {total['errors']} 次, 吞吐量 {total['throughput']}/s, "
+            f"p50={total['p50']:.3f}s p90={total['p90']:.3f}s p99={total['p99']:.3f}s max={total['max']:.3f}s"
+        )
+        return summary
+
+
+def main(argv: Sequence[str] = None):
+    parser = argparse.ArgumentParser(description="使用 YAML 用例进行压测")
+    parser.add_argument('steps', nargs='+', help="用例流程，格式: 用例文件::用例名，按顺序执行")
+    parser.add_argument('--concurrency', type=int, default=10, help="虚拟用户数")
+    parser.add_argument('--duration', type=float, default=60, help="持续时间（秒）")
+    parser.add_argument('--rps', type=float, default=None, help="目标每秒请求数")
+    parser.add_argument('--ramp-up', type=float, default=0, help="虚拟用户启动总时长（秒）")
+    parser.add_argument('--var', action='append', default=[], help="初始变量，格式: name=value")
+    parser.add_argument('--output', default=None, help="结果输出的 JSON 文件")
+    args = parser.parse_args(argv)
+
+    flow = [tuple(step.split('::', 1)) for step in args.steps]
+    variables = dict(item.split('=', 1) for item in args.var)
+    summary = LoadRunner(flow, args.concurrency, args.duration, args.rps, variables, args.ramp_up).run()
+    text = json.dumps(summary, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    test_logger.get_logger().info(f"压测结果:\n{text}")
+
+
+if __name__ == '__main__':
+    main()
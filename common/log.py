@@ -1,19 +1,143 @@
+import atexit
 import json
 import logging
 import os
+import queue
+import random
 import sys
+import threading
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, Any
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Any, List
 import colorlog
 
+from common.config import config
 from common.os_path import get_object_path
 
 
+class LazyJson:
+    """延迟序列化的 JSON 日志参数，只有记录真正输出时才执行 json.dumps"""
+
+    __slots__ = ('data',)
+
+    def __init__(self, data: Any):
+        self.data = data
+
+    def __str__(self):
+        return json.dumps(self.data, indent=4, ensure_ascii=False)
+
+
+class BodyLogPolicy:
+    """响应体日志策略：限制输出的字节数（UTF-8 编码后）、嵌套深度和列表元素数，失败时按采样率输出完整响应体"""
+
+    def __init__(self, max_bytes: int = 8192, max_depth: int = 6, max_items: int = 20,
+                 full_on_failure: bool = True, failure_sample_rate: float = 1.0):
+        """
+        :param max_bytes: 输出的最大字节数（按 UTF-8 编码计算），0 表示不限制
+        :param max_depth: 最大嵌套深度，0 表示不限制
+        :param max_items: 列表/字典最多输出的元素数，0 表示不限制
+        :param full_on_failure: 用例失败时是否输出完整响应体
+        :param failure_sample_rate: 失败时输出完整响应体的采样率（0~1）
+        """
+        self.max_bytes = max_bytes
+        self.max_depth = max_depth
+        self.max_items = max_items
+        self.full_on_failure = full_on_failure
+        self.failure_sample_rate = failure_sample_rate
+
+    @classmethod
+    def from_config(cls) -> 'BodyLogPolicy':
+        """根据 config.yml 的 log.body 节点创建"""
+        body_config = config.get('log', 'body', default={}) or {}
+        return cls(**{key: body_config[key] for key in
+                      ('max_bytes', 'max_depth', 'max_items', 'full_on_failure', 'failure_sample_rate')
+                      if key in body_config})
+
+    def should_log_full_body(self) -> bool:
+        """失败时是否输出完整响应体（按采样率）"""
+        return self.full_on_failure and random.random() < self.failure_sample_rate
+
+
+class TruncatedJson(LazyJson):
+    """按日志策略截断的延迟序列化 JSON 参数"""
+
+    __slots__ = ('policy',)
+
+    def __init__(self, data: Any, policy: BodyLogPolicy):
+        super().__init__(data)
+        self.policy = policy
+
+    def _truncate(self, value: Any, depth: int) -> Any:
+        policy = self.policy
+        if isinstance(value, (dict, list)):
+            if policy.max_depth and depth >= policy.max_depth:
+                return f"<{type(value).__name__}: {len(value)}项>"
+            limit = policy.max_items or len(value)
+            if isinstance(value, dict):
+                result = {k: self._truncate(v, depth + 1) for k, v in list(value.items())[:limit]}
+                if len(value) > limit:
+                    result['...'] = f"省略 {len(value) - limit} 项"
+            else:
+                result = [self._truncate(item, depth + 1) for item in value[:limit]]
+                if len(value) > limit:
+                    result.append(f"... 省略 {len(value) - limit} 项")
+            return result
+        # 按 UTF-8 编码长度截断（中文每个字符 3 字节），字符数不超过 max_bytes/4 时不可能超限，无需编码
+        if isinstance(value, str) and policy.max_bytes and len(value) > policy.max_bytes // 4:
+            encoded = value.encode('utf-8')
+            if len(encoded) > policy.max_bytes:
+                return encoded[:policy.max_bytes].decode('utf-8', errors='ignore') + '...'
+        return value
+
+    def __str__(self):
+        text = json.dumps(self._truncate(self.data, 0), indent=4, ensure_ascii=False)
+        max_bytes = self.policy.max_bytes
+        if max_bytes:
+            encoded = text.encode('utf-8')
+            if len(encoded) > max_bytes:
+                text = encoded[:max_bytes].decode('utf-8', errors='ignore') + \
+                       f"\n...(已截断，共 {len(encoded)} 字节)"
+        return text
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """队列处理器 - 调用线程只入队，不做格式化"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class _RoutingHandler(logging.Handler):
+    """后台线程中按日志器名称把记录分发给各自的处理器"""
+
+    def __init__(self):
+        super().__init__()
+        self.routes: Dict[str, List[logging.Handler]] = {}
+
+    def handle(self, record: logging.LogRecord):
+        # 日志器被淘汰时入队的关闭标记：此前的记录都已输出，可以安全关闭处理器
+        close_handlers = getattr(record, 'close_handlers', None)
+        if close_handlers is not None:
+            if self.routes.get(record.name) is close_handlers:
+                del self.routes[record.name]
+            for handler in close_handlers:
+                handler.close()
+            return
+        for handler in self.routes.get(record.name, ()):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
 class TestLogger:
     """测试用例执行日志处理器"""
 
+    # 默认日志器，被各模块长期持有，不参与淘汰
+    DEFAULT_LOGGER = "执行日志"
+
     def __init__(self, log_level: str = "INFO", log_dir: str = get_object_path()+"\logs",
-                 console_output: bool = True, file_output: bool = True):
+                 console_output: bool = True, file_output: bool = True, queue_mode: bool = None,
+                 body_policy: BodyLogPolicy = None, max_loggers: int = None):
         """
         初始化日志处理器
 
@@ -21,12 +145,35 @@ class TestLogger:
         :param log_dir: 日志目录
         :param console_output: 是否输出到控制台
         :param file_output: 是否输出到文件
+        :param queue_mode: 是否使用队列模式（格式化和写文件在后台线程完成），默认读取config.yml的log.queue
+        :param body_policy: 响应体日志策略，默认读取config.yml的log.body
+        :param max_loggers: 同时保留的用例日志器数量上限（LRU淘汰并关闭文件句柄），默认读取config.yml的log.max_loggers
         """
         self.log_level = log_level
         self.log_dir = log_dir
         self.console_output = console_output
         self.file_output = file_output
-        self.loggers = {}
+        self.loggers: "OrderedDict[str, logging.Logger]" = OrderedDict()
+        if max_loggers is None:
+            max_loggers = config.get('log', 'max_loggers', default=64)
+        self.max_loggers = max_loggers
+        self._registry_lock = threading.RLock()
+        self.body_policy = body_policy or BodyLogPolicy.from_config()
+
+        # 队列模式：调用线程只入队，后台监听线程负责格式化和输出
+        if queue_mode is None:
+            queue_mode = bool(config.get('log', 'queue', default=False))
+        self.queue_mode = queue_mode
+        self._queue_handler = None
+        self._router = None
+        self._listener = None
+        if queue_mode:
+            log_queue = queue.SimpleQueue()
+            self._queue_handler = _DeferredQueueHandler(log_queue)
+            self._router = _RoutingHandler()
+            self._listener = QueueListener(log_queue, self._router)
+            self._listener.start()
+            atexit.register(self.stop)
 
         # 创建日志目录
         if file_output and not os.path.exists(log_dir):
@@ -35,16 +182,26 @@ class TestLogger:
     logging.getLogger().handlers = []
     logging.getLogger().propagate = False
 
-    def get_logger(self, test_case_name: str = "执行日志") -> logging.Logger:
+    def get_logger(self, test_case_name: str = DEFAULT_LOGGER) -> logging.Logger:
         """
         获取指定测试用例的日志器
 
         :param test_case_name: 测试用例名称
         :return: 日志器实例
         """
-        if test_case_name in self.loggers:
-            return self.loggers[test_case_name]
-
+        with self._registry_lock:
+            logger = self.loggers.get(test_case_name)
+            if logger is not None:
+                self.loggers.move_to_end(test_case_name)
+                return logger
+
+            logger = self._create_logger(test_case_name)
+            self.loggers[test_case_name] = logger
+            self._evict()
+            return logger
+
+    def _create_logger(self, test_case_name: str) -> logging.Logger:
+        """创建日志器及其处理器"""
         # 创建日志器
         logger = logging.getLogger(test_case_name)
         logger.setLevel(getattr(logging, self.log_level.upper()))
@@ -69,11 +226,13 @@ class TestLogger:
             datefmt='%Y-%m-%d %H:%M:%S'
         )
 
+        handlers = []
+
         # 控制台处理器
         if self.console_output:
             console_handler = logging.StreamHandler(sys.stdout)
             console_handler.setFormatter(formatter)
-            logger.addHandler(console_handler)
+            handlers.append(console_handler)
 
         # 文件处理器
         if self.file_output:
@@ -83,11 +242,47 @@ class TestLogger:
 
             file_handler = logging.FileHandler(log_filepath, encoding='utf-8')
             file_handler.setFormatter(file_formatter)
-            logger.addHandler(file_handler)
+            handlers.append(file_handler)
+
+        if self.queue_mode:
+            self._router.routes[test_case_name] = handlers
+            logger.addHandler(self._queue_handler)
+        else:
+            for handler in handlers:
+                logger.addHandler(handler)
 
-        self.loggers[test_case_name] = logger
         return logger
 
+    def _evict(self):
+        """超出上限时淘汰最久未使用的日志器（默认日志器除外）"""
+        if not self.max_loggers:
+            return
+        while len(self.loggers) > self.max_loggers:
+            name = next((key for key in self.loggers if key != self.DEFAULT_LOGGER), None)
+            if name is None:
+                return
+            self._release(name, self.loggers.pop(name))
+
+    def _release(self, test_case_name: str, logger: logging.Logger):
+        """关闭日志器的处理器，并从 logging 的全局注册表中移除"""
+        if self.queue_mode:
+            # 队列中可能还有该日志器的记录，由后台线程按顺序处理完后再关闭
+            handlers = self._router.routes.get(test_case_name, [])
+            marker = logging.LogRecord(test_case_name, logging.NOTSET, __file__, 0, '', None, None)
+            marker.close_handlers = handlers
+            self._queue_handler.enqueue(marker)
+        else:
+            for handler in logger.handlers:
+                handler.close()
+        logger.handlers = []
+        logging.Logger.manager.loggerDict.pop(test_case_name, None)
+
+    def stop(self):
+        """停止后台监听线程（输出队列中剩余的记录）"""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
     def log_test_start(self, test_case_name: str):
         """记录测试开始"""
         logger = self.get_logger(test_case_name)
@@ -97,11 +292,11 @@ class TestLogger:
         """记录请求详情"""
         logger = self.get_logger(test_case_name)
         logger.info("请求详情:")
-        logger.info(f"  URL: {request_details.get('url')}")
-        logger.info(f"  方法: {request_details.get('method')}")
-        logger.info(f"  请求头: {request_details.get('headers', {})}")
-        logger.info(f"  参数: {request_details.get('params', {})}")
-        logger.info(f"  数据: {request_details.get('data', {})}")
+        logger.info("  URL: %s", request_details.get('url'))
+        logger.info("  方法: %s", request_details.get('method'))
+        logger.info("  请求头: %s", request_details.get('headers', {}))
+        logger.info("  参数: %s", request_details.get('params', {}))
+        logger.info("  数据: %s", request_details.get('data', {}))
 
     def log_response_details(self, test_case_name: str, response_result: Dict[str, Any]):
         """记录响应详情"""
@@ -110,10 +305,15 @@ class TestLogger:
         logger.info(f"  状态码: {response_result.get('status_code')}")
         logger.info(f"  响应时间: {response_result.get('response_time')}秒")
 
-        # 记录响应数据（截断长内容）
+        # 记录响应数据（按策略截断长内容，只有记录真正输出时才序列化）
         response_data = response_result.get('response_data', {})
-        json_res = json.dumps(response_data,indent=4,ensure_ascii=False)
-        logger.info(f"  响应数据: \n{json_res}")
+        logger.info("  响应数据: \n%s", TruncatedJson(response_data, self.body_policy))
+
+    def log_failure_body(self, test_case_name: str, response_data: Any):
+        """用例失败时按采样率记录完整响应体"""
+        if self.body_policy.should_log_full_body():
+            logger = self.get_logger(test_case_name)
+            logger.error("  完整响应数据: \n%s", LazyJson(response_data))
 
     def log_validation_results(self, test_case_name: str, validation_results: list):
         """记录验证结果"""
@@ -192,7 +392,7 @@ test_logger = TestLogger()
 
 
 def setup_logger(level: str = "INFO", log_dir: str = ".\logs",
-                 console: bool = True, file: bool = True) -> TestLogger:
+                 console: bool = True, file: bool = True, queue_mode: bool = None) -> TestLogger:
     """
     设置全局日志处理器
 
@@ -200,10 +400,11 @@ def setup_logger(level: str = "INFO", log_dir: str = ".\logs",
     :param log_dir: 日志目录
     :param console: 是否控制台输出
     :param file: 是否文件输出
+    :param queue_mode: 是否使用队列模式
     :return: 日志处理器实例
     """
     global test_logger
-    test_logger = TestLogger(level, log_dir, console, file)
+    test_logger = TestLogger(level, log_dir, console, file, queue_mode)
     return test_logger
 
 
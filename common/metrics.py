@@ -0,0 +1,223 @@
+import csv
+import json
+import os
+import re
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+from common.config import config
+from common.log import test_logger
+from common.parallel import worker_path
+
+# 路径中的数字、UUID、长十六进制段视为参数，归并为同一个路径模板
+_ID_SEGMENT = re.compile(r'^(\d+|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}|[0-9a-fA-F]{24,})$')
+
+# 指标标识: (请求方法, 路径模板)
+MetricKey = Tuple[str, str]
+
+
+def path_template(path: str) -> str:
+    """
+    请求路径模板：去掉查询串，参数段替换为 {id}
+    如 /api/order/123?x=1 -> /api/order/{id}
+    """
+    path = (path or '/').split('?', 1)[0].split('#', 1)[0] or '/'
+    return '/'.join('{id}' if _ID_SEGMENT.match(segment) else segment for segment in path.split('/'))
+
+
+class LatencyHistogram:
+    """
+    HDR 风格的时延直方图
+
+    数值按微秒记录在对数-线性桶中（每个 2 的幂区间再等分 64 份），相对误差不超过 1/64，
+    内存占用与样本数无关。最大值、最小值和总和精确记录。
+    """
+
+    SUB_BUCKET_BITS = 6
+
+    __slots__ = ('counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self):
+        self.counts: Dict[Tuple[int, int], int] = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def record(self, seconds: float):
+        """记录一个时延（秒）"""
+        value = max(int(seconds * 1_000_000), 0)
+        shift = max(value.bit_length() - self.SUB_BUCKET_BITS - 1, 0)
+        bucket = (shift, value >> shift)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, percent: float) -> float:
+        """百分位数（秒），取所在桶的上界且不超过最大值"""
+        if not self.count:
+            return 0.0
+        target = max(int(percent / 100.0 * self.count + 0.999999), 1)
+        seen = 0
+        for shift, sub in sorted(self.counts, key=lambda b: b[1] << b[0]):
+            seen += self.counts[(shift, sub)]
+            if seen >= target:
+                upper = ((sub + 1) << shift) - 1
+                return min(upper, self.max) / 1_000_000
+        return self.max / 1_000_000
+
+    def summary(self) -> Dict[str, Any]:
+        """count/min/mean/p50/p95/p99/max，时间单位: 秒"""
+        return {
+            'count': self.count,
+            'min': (self.min or 0) / 1_000_000,
+            'mean': round(self.total / self.count / 1_000_000, 6) if self.count else 0.0,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'max': self.max / 1_000_000
+        }
+
+
+class MetricsCollector:
+    """
+    接口时延指标收集器
+
+    按 (请求方法, 路径模板) 分别统计各阶段时延直方图:
+    - total: 发送请求到响应体读取完毕的总耗时
+    - ttfb: 发送请求到收到响应头的耗时（response.elapsed，包含建立连接）
+    - download: 读取响应体的耗时（total - ttfb）
+    requests/httpx 不暴露 DNS/连接/TLS 的分项耗时，调用方能提供时可通过 phases 参数传入。
+    录制回放（cassette replay）模式下请求不访问网络，不记录指标。
+    """
+
+    def __init__(self, enabled: bool = True, output_dir: str = None):
+        """
+        :param enabled: 是否收集
+        :param output_dir: 会话结束时汇总文件的输出目录
+        """
+        self.enabled = enabled
+        self.output_dir = output_dir or os.path.join(config.BASE_DIR, 'metrics')
+        self._metrics: Dict[MetricKey, Dict[str, LatencyHistogram]] = {}
+        self._errors: Dict[MetricKey, int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls) -> 'MetricsCollector':
+        """根据 config.yml 的 metrics 节点创建"""
+        metrics_config = config.get('metrics', default={}) or {}
+        output_dir = metrics_config.get('output_dir') or 'metrics'
+        return cls(
+            enabled=metrics_config.get('enabled', True),
+            output_dir=os.path.join(config.BASE_DIR, output_dir)
+        )
+
+    def record(self, method: str, path: str, total: float, ttfb: float = None,
+               phases: Dict[str, float] = None):
+        """
+        记录一次请求
+        :param method: 请求方法
+        :param path: 请求路径（自动转换为路径模板）
+        :param total: 总耗时（秒）
+        :param ttfb: 首字节耗时（秒）
+        :param phases: 其他分项耗时，如 {'dns': 0.001, 'connect': 0.002}
+        """
+        if not self.enabled:
+            return
+        timings = {'total': total}
+        if ttfb is not None:
+            timings['ttfb'] = ttfb
+            timings['download'] = max(total - ttfb, 0.0)
+        if phases:
+            timings.update(phases)
+        key = ((method or 'GET').upper(), path_template(path))
+        with self._lock:
+            histograms = self._metrics.setdefault(key, {})
+            for phase, seconds in timings.items():
+                if seconds is None:
+                    continue
+                histogram = histograms.get(phase)
+                if histogram is None:
+                    histogram = histograms[phase] = LatencyHistogram()
+                histogram.record(seconds)
+
+    def record_error(self, method: str, path: str):
+        """记录一次请求失败（未收到响应）"""
+        if not self.enabled:
+            return
+        key = ((method or 'GET').upper(), path_template(path))
+        with self._lock:
+            self._errors[key] = self._errors.get(key, 0) + 1
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """
+        汇总结果，按总耗时 p95 倒序
+        :return: [{'method', 'path', 'errors', 'phases': {阶段: 统计}}]
+        """
+        with self._lock:
+            keys = set(self._metrics) | set(self._errors)
+            rows = [
+                {
+                    'method': method,
+                    'path': path,
+                    'errors': self._errors.get((method, path), 0),
+                    'phases': {phase: histogram.summary()
+                               for phase, histogram in self._metrics.get((method, path), {}).items()}
+                }
+                for method, path in keys
+            ]
+        rows.sort(key=lambda row: row['phases'].get('total', {}).get('p95', 0.0), reverse=True)
+        return rows
+
+    def write_summary(self, output_dir: str = None) -> Optional[str]:
+        """
+        输出 metrics.json 与 metrics.csv（CSV 每行一个接口的一个阶段，xdist 执行时文件名带工作进程标识）
+        全部请求都失败的接口没有时延样本，CSV 中输出一行 total 阶段，count 为 0、时延列为空
+        :return: 输出目录，没有数据时返回None
+        """
+        rows = self.summary()
+        if not rows:
+            return None
+        output_dir = output_dir or self.output_dir
+        os.makedirs(output_dir, exist_ok=True)
+
+        # xdist 执行时每个工作进程输出各自的文件，如 metrics.gw0.json
+        with open(worker_path(os.path.join(output_dir, 'metrics.json')), 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=2, ensure_ascii=False)
+
+        fields = ['count', 'min', 'mean', 'p50', 'p95', 'p99', 'max']
+        with open(worker_path(os.path.join(output_dir, 'metrics.csv')), 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['method', 'path', 'phase', 'errors'] + fields)
+            for row in rows:
+                if not row['phases']:
+                    writer.writerow([row['method'], row['path'], 'total', row['errors'], 0] + [''] * (len(fields) - 1))
+                    continue
+                for phase, stats in row['phases'].items():
+                    writer.writerow([row['method'], row['path'], phase, row['errors']] +
+                                    [stats[field] for field in fields])
+
+        logger = test_logger.get_logger()
+        for row in rows:
+            if not row['phases']:
+                logger.warning(f"接口 {row['method']} {row['path']} 全部请求失败: {row['errors']} 次")
+        for row in rows[:10]:
+            total = row['phases'].get('total')
+            if total:
+                logger.info(f"接口时延 {row['method']} {row['path']}: 请求 {total['count']} 次, "
+                            f"p50={total['p50']:.3f}s p95={total['p95']:.3f}s "
+                            f"p99={total['p99']:.3f}s max={total['max']:.3f}s")
+        logger.info(f"接口时延统计已写入: {output_dir}")
+        return output_dir
+
+    def clear(self):
+        """清空已收集的指标"""
+        with self._lock:
+            self._metrics.clear()
+            self._errors.clear()
+
+
+# 全局指标收集器实例
+metrics = MetricsCollector.from_config()
@@ -0,0 +1,449 @@
+import argparse
+import asyncio
+import glob
+import json
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, Any, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from common.config import config
+from common.log import test_logger
+from common.request_encapsulation import extract_entry
+from common.validation import satisfying_value
+from utils.jsonpath_utils import KEY, INDEX, WILDCARD, compile_path
+from utils.template_utils import PLACEHOLDER_PATTERN, compile_string, render, template_variables
+from utils.yaml_utils import case_catalog
+
+_REASONS = {200: 'OK', 201: 'Created', 204: 'No Content', 400: 'Bad Request',
+            401: 'Unauthorized', 403: 'Forbidden', 404: 'Not Found', 500: 'Internal Server Error'}
+
+
+def _steps(path: str) -> Tuple[Tuple, ...]:
+    """路径转换为步骤，开头的 $ 和 . 可省略"""
+    return compile_path(path).steps
+
+
+def _extract_steps(path: str) -> Tuple[Tuple, ...]:
+    """extract 路径的步骤，与 ApiResponse 的提取规则一致：$.data 表示响应体本身"""
+    return _steps(path[6:] if path.startswith('$.data') else path)
+
+
+def _set_path(root: Any, steps: Sequence[Tuple], value: Any) -> Any:
+    """
+    按步骤在数据中写入值，缺少的中间节点自动创建，已有节点类型冲突时忽略
+    :return: 新的根节点
+    """
+    def container(step):
+        return [] if step[0] in (INDEX, WILDCARD) or step[2] is not None else {}
+
+    if root is None:
+        root = container(steps[0])
+    current = root
+    for position, (kind, arg, as_index) in enumerate(steps):
+        last = position == len(steps) - 1
+        child = value if last else container(steps[position + 1])
+        if kind == KEY and as_index is None:
+            if not isinstance(current, dict):
+                return root
+            if last or not isinstance(current.get(arg), (dict, list)):
+                current[arg] = child
+            current = current[arg]
+        else:
+            if not isinstance(current, list):
+                return root
+            index = 0 if kind == WILDCARD else (as_index if as_index is not None else arg)
+            if index < 0:
+                index = 0
+            while len(current) <= index:
+                current.append(None)
+            if last or not isinstance(current[index], (dict, list)):
+                current[index] = child
+            current = current[index]
+    return root
+
+
+def _merge(base: Any, other: Any) -> Any:
+    """深度合并两个合成的响应体（同一接口被多个用例使用时）"""
+    if isinstance(base, dict) and isinstance(other, dict):
+        merged = dict(base)
+        for key, value in other.items():
+            merged[key] = _merge(merged[key], value) if key in merged else value
+        return merged
+    if isinstance(base, list) and isinstance(other, list):
+        merged = list(base)
+        for index, value in enumerate(other):
+            if index < len(merged):
+                merged[index] = _merge(merged[index], value)
+            else:
+                merged.append(value)
+        return merged
+    return base if other is None else other
+
+
+class MockRoute:
+    """模拟接口：请求方法 + 路径对应的响应"""
+
+    def __init__(self, method: str, path: str, status: int = 200, headers: Dict[str, str] = None,
+                 body: Any = None, cookies: Dict[str, str] = None):
+        self.method = method.upper()
+        self.path = path
+        self.status = status
+        self.headers = dict(headers or {})
+        self.body = body
+        self.cookies = dict(cookies or {})
+        self.cases: List[str] = []
+        # 路径中的 ${...} 按通配匹配
+        template = compile_string(path)
+        self.pattern = re.compile('^' + '[^/]+'.join(re.escape(literal) for literal in template.literals) + '$') \
+            if template is not None else None
+        self._templated = None
+        self._cached: Optional[bytes] = None
+
+    @property
+    def templated(self) -> bool:
+        """响应体中是否含有 ${...} 占位符（按请求参数渲染）"""
+        if self._templated is None:
+            if isinstance(self.body, str):
+                self._templated = bool(re.search(PLACEHOLDER_PATTERN, self.body))
+            elif isinstance(self.body, (dict, list)):
+                self._templated = bool(template_variables(self.body))
+            else:
+                self._templated = False
+        return self._templated
+
+    def render(self, variables: Dict[str, Any] = None, keep_alive: bool = True) -> bytes:
+        """生成完整的 HTTP 响应报文，不含占位符的响应只生成一次"""
+        if not self.templated and self._cached is not None and keep_alive:
+            return self._cached
+        body = render(self.body, variables or {}) if self.templated else self.body
+        if isinstance(body, (dict, list)):
+            payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            content_type = 'application/json;charset=UTF-8'
+        else:
+            payload = ('' if body is None else str(body)).encode('utf-8')
+            content_type = 'text/plain;charset=UTF-8'
+        lines = [f"HTTP/1.1 {self.status} {_REASONS.get(self.status, 'OK')}"]
+        headers = {'Content-Type': content_type}
+        headers.update(self.headers)
+        headers['Content-Length'] = str(len(payload))
+        headers['Connection'] = 'keep-alive' if keep_alive else 'close'
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        lines.extend(f"Set-Cookie: {name}={value}; Path=/" for name, value in self.cookies.items())
+        message = ('\r\n'.join(lines) + '\r\n\r\n').encode('utf-8') + payload
+        if not self.templated and keep_alive:
+            self._cached = message
+        return message
+
+    def __repr__(self):
+        return f"MockRoute({self.method} {self.path} -> {self.status})"
+
+
+def route_from_case(case: Dict[str, Any]) -> Optional[MockRoute]:
+    """
+    根据用例生成模拟接口：响应体按 extract/validate 中的路径合成，
+    用例中的 mock 节点（status/headers/cookies/body）可覆盖合成结果
+    """
+    request = case.get('request') or {}
+    path = request.get('path')
+    if not path:
+        return None
+    route = MockRoute(request.get('method', 'GET'), path.split('?', 1)[0])
+    route.cases.append(case.get('case_name'))
+
+    body = None
+    for var_name, var in (case.get('extract') or {}).items():
+        # 与执行时一致解析 {from, path, save_as} 写法
+        entry = extract_entry(var_name, var)
+        if entry is None:
+            continue
+        var = entry[1]
+        if var.startswith('$.cookies'):
+            name = var[10:]
+            if name:
+                route.cookies[name] = f"mock_{name}"
+        elif var.startswith('$.headers'):
+            name = var[10:]
+            if name:
+                route.headers[name] = f"mock_{name}"
+        elif not var.startswith(('$.status', '$.url')):
+            steps = _extract_steps(var)
+            if steps:
+                body = _set_path(body, steps, f"mock_{var_name}")
+
+    for validation in case.get('validate') or []:
+        if not isinstance(validation, (list, tuple)) or len(validation) < 3:
+            continue
+        field, comparator, expected = validation[0], validation[1], validation[2]
+        if isinstance(expected, str) and re.search(PLACEHOLDER_PATTERN, expected):
+            # 期望值依赖运行时变量，无法预先合成
+            continue
+        ok, value = satisfying_value(comparator, expected)
+        if not ok or not isinstance(field, str):
+            continue
+        if not field.startswith('$'):
+            continue
+        # 与 ApiResponse._get_field_value 一致：除特殊字段外，路径直接作用于响应体
+        name = field[1:].lstrip('.')
+        if name == 'status_code':
+            try:
+                route.status = int(value)
+            except (TypeError, ValueError):
+                pass
+        elif name and name not in ('headers', 'cookies', 'response_time', 'url', 'encoding'):
+            body = _set_path(body, _steps(field), value)
+
+    route.body = body if body is not None else {}
+    override = case.get('mock')
+    if isinstance(override, dict):
+        route.status = int(override.get('status', route.status))
+        route.headers.update(override.get('headers') or {})
+        route.cookies.update(override.get('cookies') or {})
+        if 'body' in override:
+            route.body = override['body']
+    return route
+
+
+def build_routes(files: Iterable[str] = None) -> List[MockRoute]:
+    """
+    由用例文件生成模拟接口，同一接口被多个用例使用时合并响应体
+    :param files: 用例文件，默认 case_data 目录下的全部 yml 文件
+    """
+    if files is None:
+        files = sorted(os.path.basename(path) for path in glob.glob(os.path.join(config.CASE_DATA_DIR, '*.yml')))
+    routes: Dict[Tuple[str, str], MockRoute] = {}
+    for file_path in files:
+        index, _ = case_catalog.get_entry(file_path)
+        for case in (index or {}).values():
+            route = route_from_case(case)
+            if route is None:
+                continue
+            key = (route.method, route.path)
+            existing = routes.get(key)
+            if existing is None:
+                routes[key] = route
+                continue
+            existing.cases.extend(route.cases)
+            existing.body = _merge(existing.body, route.body)
+            existing.headers.update(route.headers)
+            existing.cookies.update(route.cookies)
+            if route.status != 200:
+                existing.status = route.status
+    return list(routes.values())
+
+
+class MockServer:
+    """
+    基于 asyncio 的本地模拟服务
+
+    由 case_data 中用例的 request 节点生成接口，响应满足用例的 extract/validate，
+    支持 HTTP/1.1 keep-alive。在后台线程中运行，可作为上下文管理器使用：
+
+    with MockServer(port=0) as server:
+        requests.get(server.url + '/api/...')
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 18080, files: Iterable[str] = None,
+                 routes: Iterable[MockRoute] = None):
+        """
+        :param host: 监听地址
+        :param port: 监听端口，0 表示随机端口
+        :param files: 用例文件，默认 case_data 目录下的全部 yml 文件
+        :param routes: 直接指定的模拟接口（指定后不再读取用例文件）
+        """
+        self.host = host
+        self.port = port
+        routes = list(routes) if routes is not None else build_routes(files)
+        self._exact: Dict[Tuple[str, str], MockRoute] = {}
+        self._patterns: List[MockRoute] = []
+        for route in routes:
+            if route.pattern is None:
+                self._exact[(route.method, route.path)] = route
+            else:
+                self._patterns.append(route)
+        self.hits: Counter = Counter()
+        self.logger = test_logger.get_logger()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._server = None
+        self._connections = set()
+
+    @classmethod
+    def from_config(cls, **kwargs) -> 'MockServer':
+        """根据 config.yml 的 mock 节点创建"""
+        mock_config = config.get('mock', default={}) or {}
+        kwargs.setdefault('host', mock_config.get('host', '127.0.0.1'))
+        kwargs.setdefault('port', mock_config.get('port', 18080))
+        return cls(**kwargs)
+
+    @property
+    def routes(self) -> List[MockRoute]:
+        return list(self._exact.values()) + self._patterns
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def match(self, method: str, path: str) -> Optional[MockRoute]:
+        """查找请求对应的模拟接口"""
+        route = self._exact.get((method, path))
+        if route is not None:
+            return route
+        for route in self._patterns:
+            if route.method == method and route.pattern.match(path):
+                return route
+        return None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """处理一个连接上的请求（keep-alive）"""
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                lines = head.decode('latin-1').split('\r\n')
+                method, target = lines[0].split(' ', 2)[:2]
+                headers = {}
+                for line in lines[1:]:
+                    if ':' in line:
+                        name, value = line.split(':', 1)
+                        headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length') or 0)
+                raw_body = await reader.readexactly(length) if length else b''
+                keep_alive = headers.get('connection', '').lower() != 'close'
+
+                parts = urlsplit(target)
+                route = self.match(method.upper(), parts.path)
+                if route is None:
+                    message = MockRoute(method, parts.path, status=404,
+                                        body={'message': f"未配置的模拟接口: {method} {parts.path}"}) \
+                        .render(keep_alive=keep_alive)
+                else:
+                    self.hits[(route.method, route.path)] += 1
+                    variables = self._request_variables(parts.query, raw_body) if route.templated else None
+                    message = route.render(variables, keep_alive)
+                writer.write(message)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    @staticmethod
+    def _request_variables(query: str, raw_body: bytes) -> Dict[str, Any]:
+        """模板变量：查询参数与请求体（JSON 对象或表单）中的字段"""
+        variables: Dict[str, Any] = dict(parse_qsl(query, keep_blank_values=True))
+        if raw_body:
+            text = raw_body.decode('utf-8', errors='replace')
+            try:
+                data = json.loads(text)
+            except ValueError:
+                data = dict(parse_qsl(text, keep_blank_values=True))
+            if isinstance(data, dict):
+                variables.update(data)
+        return variables
+
+    def start(self) -> 'MockServer':
+        """
+        在后台线程中启动服务，返回时端口已可用
+        :raises OSError: 端口被占用等原因导致监听失败
+        """
+        if self._loop is not None:
+            return self
+        loop = asyncio.new_event_loop()
+        started = threading.Event()
+        errors: List[BaseException] = []
+
+        def run():
+            asyncio.set_event_loop(loop)
+            try:
+                self._server = loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+                self.port = self._server.sockets[0].getsockname()[1]
+            except BaseException as e:
+                errors.append(e)
+                return
+            finally:
+                started.set()
+            loop.run_forever()
+
+        self._loop = loop
+        self._thread = threading.Thread(target=run, name='mock-server', daemon=True)
+        self._thread.start()
+        started.wait()
+        if errors:
+            self._thread.join()
+            loop.close()
+            self._loop = self._thread = self._server = None
+            self.logger.error(f"模拟服务启动失败: {self.url}, {errors[0]}")
+            raise errors[0]
+        self.logger.info(f"模拟服务已启动: {self.url}, 接口 {len(self.routes)} 个")
+        return self
+
+    def stop(self):
+        """停止服务"""
+        loop, self._loop = self._loop, None
+        if loop is None:
+            return
+
+        async def shutdown():
+            self._server.close()
+            # 关闭仍保持 keep-alive 的连接
+            connections = list(self._connections)
+            for task in connections:
+                task.cancel()
+            await asyncio.gather(*connections, return_exceptions=True)
+            await self._server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join()
+        loop.close()
+        self._thread = None
+
+    def __enter__(self) -> 'MockServer':
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def main(argv: Sequence[str] = None):
+    parser = argparse.ArgumentParser(description="根据 case_data 用例启动本地模拟服务")
+    parser.add_argument('files', nargs='*', help="用例文件，默认 case_data 目录下的全部 yml 文件")
+    parser.add_argument('--host', default=None, help="监听地址，默认读取config.yml")
+    parser.add_argument('--port', type=int, default=None, help="监听端口，默认读取config.yml")
+    parser.add_argument('--routes', action='store_true', help="只打印生成的接口及响应，不启动服务")
+    args = parser.parse_args(argv)
+
+    kwargs = {'files': args.files or None}
+    if args.host:
+        kwargs['host'] = args.host
+    if args.port is not None:
+        kwargs['port'] = args.port
+    server = MockServer.from_config(**kwargs)
+    if args.routes:
+        for route in server.routes:
+            print(f"{route.method} {route.path} -> {route.status} ({', '.join(map(str, route.cases))})")
+            if route.headers or route.cookies:
+                print(f"headers: {route.headers}, cookies: {route.cookies}")
+            print(json.dumps(route.body, indent=2, ensure_ascii=False))
+        return
+
+    server.start()
+    print(f"模拟服务: {server.url} (Ctrl+C 停止)")
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
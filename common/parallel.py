@@ -0,0 +1,172 @@
+import glob
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, Callable, List, Optional
+
+# 文件锁：Windows 使用 msvcrt，其他平台使用 fcntl
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+    import fcntl
+
+
+def worker_id() -> Optional[str]:
+    """pytest-xdist 工作进程标识（如 gw0），非 xdist 执行时返回None"""
+    return os.getenv('PYTEST_XDIST_WORKER') or None
+
+
+def run_id() -> str:
+    """
+    本次执行的标识：主进程在 start_run 中生成并写入环境变量 TEST_RUN_ID，xdist 工作进程继承，
+    未调用 start_run 时取 xdist 的执行标识，否则为当前进程号
+    """
+    return os.getenv('TEST_RUN_ID') or os.getenv('PYTEST_XDIST_TESTRUNUID') or f"pid{os.getpid()}"
+
+
+def run_dir() -> str:
+    """本次执行的临时目录（run_once 的结果缓存），位于系统临时目录下"""
+    return os.path.join(tempfile.gettempdir(), 'automation-xdist', run_id())
+
+
+def start_run():
+    """主进程在会话开始（启动 xdist 工作进程之前）调用，生成本次执行的标识"""
+    os.environ.setdefault('TEST_RUN_ID', uuid.uuid4().hex)
+
+
+def finish_run():
+    """主进程在会话结束时调用，删除本次执行的临时目录（其中可能有 token 等结果）"""
+    shutil.rmtree(run_dir(), ignore_errors=True)
+
+
+def worker_path(path: str) -> str:
+    """
+    工作进程独立的文件路径，如 extract.yml -> extract.gw0.yml，非 xdist 执行时原样返回
+    :param path: 文件路径
+    """
+    worker = worker_id()
+    if not worker:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{worker}{ext}"
+
+
+def worker_files(path: str) -> List[str]:
+    """
+    各工作进程对应 path 的独立文件（worker_path 生成），按工作进程编号排序
+    :param path: 文件路径，如 extract.yml
+    """
+    root, ext = os.path.splitext(path)
+    files = glob.glob(f"{glob.escape(root)}.gw*{ext}")
+    pattern = re.compile(re.escape(root) + r'\.gw(\d+)' + re.escape(ext) + '$')
+    matched = []
+    for file in files:
+        match = pattern.match(file)
+        if match:
+            matched.append((int(match.group(1)), file))
+    return [file for _, file in sorted(matched)]
+
+
+class FileLock:
+    """
+    跨进程文件锁（Windows/Linux 通用），同一进程内的线程之间同样互斥
+    用法：
+    with FileLock('extract.yml.lock'):
+        ...
+    """
+
+    def __init__(self, path: str, timeout: float = 60, interval: float = 0.05):
+        """
+        :param path: 锁文件路径
+        :param timeout: 等待超时时间（秒）
+        :param interval: 重试间隔（秒）
+        """
+        self.path = path
+        self.timeout = timeout
+        self.interval = interval
+        self._fd: Optional[int] = None
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+
+    def _try_lock(self, fd: int) -> bool:
+        try:
+            if msvcrt is not None:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def acquire(self):
+        """获取锁，超时抛出 TimeoutError"""
+        self._thread_lock.acquire()
+        if self._depth:
+            self._depth += 1
+            return
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT)
+        deadline = time.monotonic() + self.timeout
+        while not self._try_lock(fd):
+            if time.monotonic() >= deadline:
+                os.close(fd)
+                self._thread_lock.release()
+                raise TimeoutError(f"获取文件锁超时: {self.path}")
+            time.sleep(self.interval)
+        self._fd = fd
+        self._depth = 1
+
+    def release(self):
+        """释放锁"""
+        self._depth -= 1
+        if not self._depth:
+            fd, self._fd = self._fd, None
+            try:
+                if msvcrt is not None:
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+                else:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+            finally:
+                os.close(fd)
+        self._thread_lock.release()
+
+    def __enter__(self) -> 'FileLock':
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
+def run_once(key: str, func: Callable[[], Any], directory: str = None) -> Any:
+    """
+    在一次执行（xdist 的所有工作进程）中只调用一次 func，其他进程等待并读取其结果
+    结果需可序列化为 JSON，func 抛出异常时不缓存，由下一个进程重试
+
+    :param key: 结果标识，如 ebd_token
+    :param func: 计算结果的函数
+    :param directory: 结果缓存目录，默认 run_dir()，会话结束时由主进程的 finish_run 删除
+    """
+    if not worker_id():
+        return func()
+    directory = directory or run_dir()
+    # 结果可能包含 token，目录仅当前用户可访问
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    name = re.sub(r'[^\w.-]+', '_', key)
+    result_path = os.path.join(directory, f"{name}.json")
+    with FileLock(os.path.join(directory, f"{name}.lock")):
+        if os.path.exists(result_path):
+            with open(result_path, encoding='utf-8') as f:
+                return json.load(f)
+        value = func()
+        temp_path = f"{result_path}.{worker_id()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(temp_path, result_path)
+        return value
@@ -0,0 +1,214 @@
+import hashlib
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Any, List
+
+from common.config import config
+from common.log import test_logger
+from common.metrics import LatencyHistogram
+from common.parallel import worker_id, worker_path
+
+# 用例总耗时和网络请求对应的阶段名，框架开销 = 用例总耗时 - 发送请求
+CASE_PHASE = 'case'
+REQUEST_PHASE = 'send_request'
+
+_NULL_CONTEXT = nullcontext()
+
+
+class PhaseProfiler:
+    """
+    框架开销分析（默认关闭）
+
+    模式由 --profile 选项（TEST_PROFILE）或 config.yml 的 profile.mode 指定:
+    - off: 关闭，各阶段计时为空操作
+    - phases: 统计 TestExecutor.case 各阶段耗时，会话结束时输出汇总表
+    - cprofile: 同 phases，并为每个用例输出 cProfile 文件（.prof）
+    - pyinstrument: 同 phases，并为每个用例输出 pyinstrument 报告（.html，需安装 pyinstrument）
+    """
+
+    MODES = ('off', 'phases', 'cprofile', 'pyinstrument')
+
+    def __init__(self, output_dir: str = None):
+        """
+        :param output_dir: 汇总文件和单个用例剖析文件的输出目录
+        """
+        self.output_dir = output_dir or os.path.join(config.BASE_DIR, 'profile')
+        self._phases: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+        # cProfile 不能嵌套启用，同一时间只剖析一个用例
+        self._dump_lock = threading.Lock()
+        # 剖析文件序号，参数化或重复执行的用例不会互相覆盖
+        self._sequence = itertools.count(1)
+
+    @classmethod
+    def from_config(cls) -> 'PhaseProfiler':
+        """根据 config.yml 的 profile 节点创建"""
+        output_dir = config.get('profile', 'output_dir', default='profile') or 'profile'
+        return cls(os.path.join(config.BASE_DIR, output_dir))
+
+    @property
+    def mode(self) -> str:
+        mode = config.PROFILE
+        return mode if mode in self.MODES else 'off'
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != 'off'
+
+    def record(self, name: str, seconds: float):
+        """记录一个阶段的耗时"""
+        with self._lock:
+            histogram = self._phases.get(name)
+            if histogram is None:
+                histogram = self._phases[name] = LatencyHistogram()
+            histogram.record(seconds)
+
+    def phase(self, name: str):
+        """
+        阶段计时，关闭时返回空上下文
+        用法：
+        with profiler.phase('merge_variables'):
+            ...
+        """
+        if not self.enabled:
+            return _NULL_CONTEXT
+        return self._timed(name)
+
+    @contextmanager
+    def _timed(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def case(self, case_name: str, dump: bool = True):
+        """
+        用例计时，cprofile/pyinstrument 模式下同时输出该用例的剖析文件
+        :param case_name: 用例名，用作剖析文件名
+        :param dump: 是否输出剖析文件（异步引擎中的用例不输出）
+        """
+        mode = self.mode
+        if mode == 'off':
+            return _NULL_CONTEXT
+        if dump and mode in ('cprofile', 'pyinstrument'):
+            return self._profiled(case_name, mode)
+        return self._timed(CASE_PHASE)
+
+    @contextmanager
+    def _profiled(self, case_name: str, mode: str):
+        if not self._dump_lock.acquire(blocking=False):
+            # 其他线程正在剖析，本用例只计时
+            with self._timed(CASE_PHASE):
+                yield
+            return
+        try:
+            if mode == 'pyinstrument':
+                # pyinstrument 为可选依赖，仅该模式需要
+                from pyinstrument import Profiler
+                profiler = Profiler()
+                start, stop = profiler.start, profiler.stop
+            else:
+                import cProfile
+                profiler = cProfile.Profile()
+                start, stop = profiler.enable, profiler.disable
+            start()
+            try:
+                with self._timed(CASE_PHASE):
+                    yield
+            finally:
+                stop()
+                self._dump(profiler, case_name, mode)
+        finally:
+            self._dump_lock.release()
+
+    def _file_name(self, case_name: str, ext: str) -> str:
+        """
+        剖析文件名: 用例名_pytest用例标识摘要_序号.扩展名，xdist 执行时带工作进程标识（如 .gw0.prof）
+        """
+        name = re.sub(r'[\\/:*?"<>|\s]+', '_', case_name) or 'case'
+        node_id = os.environ.get('PYTEST_CURRENT_TEST', '').rsplit(' ', 1)[0]
+        digest = hashlib.sha1(node_id.encode('utf-8')).hexdigest()[:8]
+        return worker_path(os.path.join(self.output_dir, f"{name}_{digest}_{next(self._sequence):04d}.{ext}"))
+
+    def _dump(self, profiler, case_name: str, mode: str):
+        """输出单个用例的剖析文件"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        if mode == 'cprofile':
+            profiler.dump_stats(self._file_name(case_name, 'prof'))
+        else:
+            with open(self._file_name(case_name, 'html'), 'w', encoding='utf-8') as f:
+                f.write(profiler.output_html())
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """
+        各阶段耗时汇总（时间单位: 秒），share 为占用例总耗时的比例
+        :return: [{'phase', 'count', 'total', 'mean', 'p95', 'max', 'share'}]
+        """
+        with self._lock:
+            phases = {name: histogram for name, histogram in self._phases.items()}
+            case_total = phases[CASE_PHASE].total / 1_000_000 if CASE_PHASE in phases else 0.0
+            rows = []
+            for name, histogram in phases.items():
+                stats = histogram.summary()
+                total = histogram.total / 1_000_000
+                rows.append({
+                    'phase': name,
+                    'count': stats['count'],
+                    'total': round(total, 6),
+                    'mean': stats['mean'],
+                    'p95': stats['p95'],
+                    'max': stats['max'],
+                    'share': round(total / case_total, 4) if case_total else None
+                })
+        rows.sort(key=lambda row: row['total'], reverse=True)
+        return rows
+
+    def overhead(self) -> float:
+        """框架开销（秒）：用例总耗时减去发送请求的耗时"""
+        with self._lock:
+            case_total = self._phases.get(CASE_PHASE)
+            request_total = self._phases.get(REQUEST_PHASE)
+            if case_total is None:
+                return 0.0
+            return max(case_total.total - (request_total.total if request_total else 0), 0) / 1_000_000
+
+    def write_summary(self, output_dir: str = None):
+        """输出汇总表到日志，并追加写入 phases.jsonl 便于跟踪各版本的框架开销"""
+        rows = self.summary()
+        if not rows:
+            return
+        logger = test_logger.get_logger()
+        logger.info(f"{'阶段':<20}{'次数':>8}{'总耗时(s)':>12}{'平均(ms)':>12}{'p95(ms)':>12}{'占比':>8}")
+        for row in rows:
+            share = f"{row['share'] * 100:.1f}%" if row['share'] is not None else '-'
+            logger.info(f"{row['phase']:<20}{row['count']:>8}{row['total']:>12.3f}"
+                        f"{row['mean'] * 1000:>12.3f}{row['p95'] * 1000:>12.3f}{share:>8}")
+        overhead = self.overhead()
+        logger.info(f"框架开销（用例总耗时 - 发送请求）: {overhead:.3f}s")
+
+        output_dir = output_dir or self.output_dir
+        os.makedirs(output_dir, exist_ok=True)
+        record = {
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'worker': worker_id(),
+            'mode': self.mode,
+            'overhead': round(overhead, 6),
+            'phases': rows
+        }
+        with open(os.path.join(output_dir, 'phases.jsonl'), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def clear(self):
+        """清空已统计的耗时"""
+        with self._lock:
+            self._phases.clear()
+
+
+# 全局框架开销分析器实例
+profiler = PhaseProfiler.from_config()
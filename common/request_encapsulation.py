@@ -1,6 +1,5 @@
 # 外部库
-import json
-import re
+import time
 
 from requests import Response
 import requests
@@ -9,15 +8,25 @@ from urllib.parse import urljoin
 
 # 内部库
 
+from common.allure_utils import AllureReport
+from common.cassette import cassette
+from common.config import config
+from common.http_pool import http_pool
 from common.log import test_logger
-from utils.yaml_utils import YamlUtils
+from common.metrics import metrics
+from common.validation import ValidationRule, body_path, compile_field, compile_validations, response_url
+from utils import json_utils
+from utils.json_stream import parse_paths
+from utils.jsonpath_utils import compile_path
+from utils.template_utils import render_string
 
 
 class ApiRequest:
     """接口请求封装"""
 
     def __init__(self):
-        self.session = requests.session()
+        # 会话之间相互独立，底层连接池由进程内所有会话共享
+        self.session = http_pool.session()
         self.logger = test_logger
 
     def send_request(self, request_config: Dict[str, Any], variables: Dict[str, Any] = None,
@@ -30,59 +39,86 @@ class ApiRequest:
         :param test_case_name: 用例名称
         :return:
         """
+        request_kwargs = None
         try:
-            # 处理变量
-            variables = variables or {}
-
-            # 构建完整的URL
-            url_source = request_config.get('url')
-            # 判断是不是完整的URL,不是URL就去config.yml找
-            if isinstance(url_source, str) and (url_source.startswith(('http://', 'https://'))):
-                base_url = url_source
-            else:
-                base_url = YamlUtils().read_config('base', url_source)
-
-            url = base_url + request_config.get('path')
-            # 准备请求参数
-            method = request_config.get('method', 'GET').upper()
-            headers = self._process_headers(request_config.get('headers', {}), variables)
-            data = self._process_request_data(request_config, variables)
-            params = self._process_params(request_config.get('params', {}), variables)
-            cookies = self._process_cookies(request_config.get('cookies', {}), variables)
-            auth = self._process_auth(request_config.get('auth'), variables)
-            files = self._process_files(request_config.get('files'), variables)
-            request_details = {
-                'url': url,
-                'method': method,
-                'headers': headers,
-                'params': params,
-                'data': data
-            }
-            self.logger.log_request_details(test_case_name, request_details)
-            # 设置超时
-            timeout = request_config.get('timeout', 60)
+            request_kwargs = self.prepare_request(request_config, variables, test_case_name)
+            if cassette.replaying:
+                # 回放模式：返回录制的响应，不访问网络
+                return cassette.replay(request_kwargs)
 
             # 发送请求
-            response = self.session.request(
-                method=method,
-                url=url,
-                headers=headers,
-                params=params,
-                data=data if not self._is_json_content(headers) else None,
-                json=data if self._is_json_content(headers) else None,
-                cookies=cookies,
-                auth=auth,
-                files=files,
-                timeout=timeout,
-                allow_redirects=request_config.get('allow_redirects', True),
-                verify=request_config.get('verify_ssl', False)
-            )
+            started = time.perf_counter()
+            response = self.session.request(**request_kwargs)
+            metrics.record(request_kwargs['method'], request_config.get('path', ''),
+                           total=time.perf_counter() - started, ttfb=response.elapsed.total_seconds())
+            if cassette.recording:
+                cassette.record(request_kwargs, response)
             return response
 
         except Exception as e:
+            if request_kwargs is not None:
+                metrics.record_error(request_kwargs['method'], request_config.get('path', ''))
             self.logger.log_error(test_case_name, f"请求发送失败: {str(e)}", e)
             raise
 
+    def prepare_request(self, request_config: Dict[str, Any], variables: Dict[str, Any] = None,
+                        test_case_name: str = "unknown") -> Dict[str, Any]:
+        """
+        构建请求参数（同步/异步引擎共用）
+
+        :param request_config: 请求配置
+        :param variables: 变量字典
+        :param test_case_name: 用例名称
+        :return: requests 风格的请求参数
+        """
+        # 处理变量
+        variables = variables or {}
+
+        # 构建完整的URL
+        url_source = request_config.get('url')
+        # 判断是不是完整的URL,不是URL就按当前环境从config.yml的地址表中查找
+        if isinstance(url_source, str) and (url_source.startswith(('http://', 'https://'))):
+            base_url = url_source
+        else:
+            base_url = config.get_base_url(url_source)
+
+        url = base_url + request_config.get('path')
+        # 准备请求参数
+        method = request_config.get('method', 'GET').upper()
+        headers = self._process_headers(request_config.get('headers', {}), variables)
+        data = self._process_request_data(request_config, variables)
+        params = self._process_params(request_config.get('params', {}), variables)
+        cookies = self._process_cookies(request_config.get('cookies', {}), variables)
+        auth = self._process_auth(request_config.get('auth'), variables, headers)
+        files = self._process_files(request_config.get('files'), variables)
+        request_details = {
+            'url': url,
+            'method': method,
+            'headers': headers,
+            'params': params,
+            'data': data
+        }
+        self.logger.log_request_details(test_case_name, request_details)
+
+        is_json = self._is_json_content(headers)
+        return {
+            'method': method,
+            'url': url,
+            'headers': headers,
+            'params': params,
+            'data': data if not is_json else None,
+            'json': data if is_json else None,
+            'cookies': cookies,
+            'auth': auth,
+            'files': files,
+            # 设置超时
+            'timeout': request_config.get('timeout', 60),
+            'allow_redirects': request_config.get('allow_redirects', True),
+            'verify': request_config.get('verify_ssl', False),
+            # 流式读取响应体（只解析用例提取和验证用到的部分），异步引擎忽略
+            'stream': bool(request_config.get('stream', False))
+        }
+
     def _build_url(self, request_config: Dict[str, Any], variables: Dict[str, Any]) -> str:
         """构建完整的URL"""
         base_url = self._replace_variables(request_config.get('url', '').strip(), variables) or self.base_url
@@ -147,8 +183,9 @@ class ApiRequest:
                 processed_data[key] = value
         return processed_data
 
-    def _process_auth(self, auth_config: Optional[Dict[str, Any]], variables: Dict[str, Any]) -> Optional[Tuple]:
-        """处理认证信息"""
+    def _process_auth(self, auth_config: Optional[Dict[str, Any]], variables: Dict[str, Any],
+                      headers: Dict[str, str]) -> Optional[Tuple]:
+        """处理认证信息，bearer 令牌写入本次请求的请求头（用例中显式配置的 Authorization 优先）"""
         if not auth_config:
             return None
 
@@ -159,7 +196,7 @@ class ApiRequest:
             return (username, password)
         elif auth_type == 'bearer':
             token = self._replace_variables(auth_config.get('token', ''), variables)
-            self.session.headers.update({'Authorization': f'Bearer {token}'})
+            headers.setdefault('Authorization', f'Bearer {token}')
             return None
         return None
 
@@ -199,19 +236,117 @@ class ApiRequest:
 
     def _replace_variables(self, text: str, variables: Dict[str, Any]) -> str:
         """替换变量占位符"""
-        if not isinstance(text, str) or '${' not in text:
-            return text
+        return render_string(text, variables)
 
-        for var_name, var_value in variables.items():
-            placeholder = f"${{{var_name}}}"
-            if placeholder in text:
-                text = text.replace(placeholder, str(var_value))
+    def close(self):
+        """关闭会话（连接归还共享连接池）"""
+        http_pool.release(self.session)
 
-        return text
 
-    def close(self):
-        """关闭会话"""
-        self.session.close()
+class ResponseBody:
+    """
+    响应体 - 每个响应只解码一次，解析结果在提取、验证和日志之间共享
+
+    指定 paths 且响应体尚未读取（stream=True 发送的请求）时流式解析：
+    只构造 paths 用到的部分，所有路径确定后停止读取，此时 json/data 为只包含这些部分的文档。
+    """
+
+    __slots__ = ('response', 'paths', 'streamed', '_data', '_json', '_json_error')
+
+    _UNSET = object()
+
+    # 流式读取的数据块大小
+    CHUNK_SIZE = 65536
+
+    def __init__(self, response: Response, paths: List[str] = None):
+        """
+        :param response: 响应对象
+        :param paths: 流式解析时需要的响应体路径，None 表示完整解析
+        """
+        self.response = response
+        self.paths = paths if paths is not None and self._unread(response) else None
+        self.streamed = False
+        self._data = self._UNSET
+        self._json = self._UNSET
+        self._json_error = None
+
+    @staticmethod
+    def _unread(response: Any) -> bool:
+        """响应体是否尚未读取（requests 以 stream=True 发送时，读取前 _content 为 False）"""
+        return getattr(response, '_content', None) is False
+
+    @property
+    def data(self) -> Any:
+        """按 Content-Type 解析的响应数据：JSON 响应返回解析结果，否则返回文本"""
+        if self._data is self._UNSET:
+            content_type = self.response.headers.get('Content-Type', '').lower()
+            if 'application/json' in content_type:
+                try:
+                    self._data = self.json
+                except ValueError:
+                    # 流式解析失败时响应体已部分读取，无法再取得文本
+                    self._data = None if self.streamed else self.response.text
+            else:
+                self._data = self.response.text
+        return self._data
+
+    @property
+    def json(self) -> Any:
+        """按 JSON 解析的响应体（不检查 Content-Type），无法解析时抛出 ValueError"""
+        if self._json is self._UNSET and self._json_error is None:
+            try:
+                self._json = self._decode()
+            except ValueError as e:
+                self._json_error = e
+        if self._json_error is not None:
+            raise self._json_error
+        return self._json
+
+    def _decode(self) -> Any:
+        response = self.response
+        if self.paths is not None and self._unread(response):
+            self.streamed = True
+            return parse_paths(response.iter_content(self.CHUNK_SIZE), self.paths, response.encoding)
+        encoding = (response.encoding or 'utf-8').lower().replace('_', '-')
+        if encoding in ('utf-8', 'utf8'):
+            return json_utils.loads(response.content)
+        return json_utils.loads(response.text)
+
+
+# extract 字典写法 {from, path, save_as} 中 from 对应的路径前缀，body 表示响应体
+_EXTRACT_SOURCES = {
+    'cookies': '$.cookies.',
+    'headers': '$.headers.',
+    'body': '',
+    'status': '$.status',
+    'status_code': '$.status',
+    'url': '$.url',
+}
+
+
+def extract_entry(var_name: str, var: Any) -> Optional[Tuple[str, str]]:
+    """
+    解析一条 extract 配置
+    - 变量名: 路径，如 token: $.data.token
+    - 变量名: {from: cookies/headers/body/status/url, path: 名称或路径, save_as: 变量名（默认为键名）}
+    :return: (保存的变量名, 路径)，格式不支持时返回None
+    """
+    if isinstance(var, str):
+        return var_name, var
+    if not isinstance(var, dict):
+        return None
+    prefix = _EXTRACT_SOURCES.get(str(var.get('from', 'body')).strip().lower())
+    if prefix is None:
+        return None
+    path = var.get('path') or ''
+    if not isinstance(path, str):
+        return None
+    save_as = var.get('save_as') or var_name
+    if prefix in ('$.status', '$.url'):
+        return save_as, prefix
+    if prefix:
+        return save_as, (prefix + path) if path else prefix[:-1]
+    return save_as, path
 
 
 class ApiResponse:
@@ -219,6 +354,7 @@ class ApiResponse:
 
     def __init__(self):
         self.variables = {}
+        self.last_result = None
         self.logger = test_logger
 
     def process_response(self, response: Response, case_data: Dict[str, Any],
@@ -231,9 +367,15 @@ class ApiResponse:
         :param case_data: test_case_name 用例名称
         :return: 处理结果
         """
+        self.last_result = None
+        stream_paths = self._stream_paths(case_data)
+        body = None
         try:
-            # 解析响应数据
-            response_data = self._parse_response_data(response)
+            # 解析响应数据（整个处理过程只解码一次，流式模式只解析提取和验证用到的部分）
+            body = ResponseBody(response, stream_paths)
+            response_data = body.data
+            if body.streamed:
+                self.logger.get_logger().info(f"流式解析响应体: 路径 {stream_paths}")
 
             result = {
                 'success': True,
@@ -245,11 +387,13 @@ class ApiResponse:
                 'extracted_variables': {},
                 'validation_results': []
             }
+            # 保留最近一次的处理结果，验证失败抛出异常时调用方仍可获取
+            self.last_result = result
             # 响应日志
             self.logger.log_response_details(test_case_name, result)
 
             # 提取变量
-            self._extract_variables(response, case_data.get('extract', {}), result)
+            self._extract_variables(response, case_data.get('extract', {}), result, body)
             self.logger.log_variable_extraction(test_case_name, result['extracted_variables'])
 
             # 执行验证
@@ -263,39 +407,74 @@ class ApiResponse:
 
         except Exception as e:
             self.logger.log_error(test_case_name, f"响应处理失败: {str(e)}", e)
-            raise {
-                'success': False,
-                'error': str(e),
-                'response': None
-            }
+            if self.last_result is not None:
+                self.logger.log_failure_body(test_case_name, self.last_result['response_data'])
+            raise
+        finally:
+            if body is not None and body.paths is not None:
+                # 未读完的响应体不再下载，关闭连接
+                response.close()
+
+    @staticmethod
+    def _stream_paths(case_data: Dict[str, Any]) -> Optional[List[str]]:
+        """
+        流式解析需要的响应体路径：用例 extract 与 validate 用到的路径的并集
+        :return: 用例未设置 request.stream、需要附加完整响应体或有路径需要整个响应体时返回None
+        """
+        if not (case_data.get('request') or {}).get('stream'):
+            return None
+        if AllureReport.policy.should_attach_body(case_data, failed=False):
+            return None
+
+        paths = []
+        for var_name, var in (case_data.get('extract') or {}).items():
+            entry = extract_entry(var_name, var)
+            if entry is None:
+                continue
+            path = entry[1]
+            if path.startswith(('$.cookies', '$.headers', '$.status', '$.url')):
+                continue
+            # 与 _extract_variables 一致：$.data 之后的部分作用于响应体
+            if path.startswith('$.data'):
+                path = path[6:]
+            if not path or path in ('.', '$'):
+                return None
+            paths.append(path)
+        for validation in case_data.get('validate') or []:
+            if not isinstance(validation, (list, tuple)) or len(validation) < 3 or not isinstance(validation[0], str):
+                continue
+            path = body_path(validation[0])
+            if path == '':
+                return None
+            if path is not None:
+                paths.append(path)
+        return paths
 
     def _parse_response_data(self, response: Response) -> Any:
         """解析响应数据"""
-        content_type = response.headers.get('Content-Type', '').lower()
-
-        if 'application/json' in content_type:
-            try:
-                return response.json()
-            except json.JSONDecodeError:
-                return response.text
-        else:
-            return response.text
+        return ResponseBody(response).data
 
-    def _extract_variables(self, response: Any, extract_config: Dict[str, Any], result: Dict[str, Any]):
+    def _extract_variables(self, response: Any, extract_config: Dict[str, Any], result: Dict[str, Any],
+                           body: ResponseBody = None):
         """
         从响应中提取变量，支持从响应对象的不同部分提取
         :param response: 响应数据
         :param extract_config: 提取数据
         :param result:
+        :param body: 已解析的响应体，为空时按需解析
         :return:
         """
         if not extract_config:
             return
+        body = body or ResponseBody(response)
 
         for var_name, var in extract_config.items():
             try:
-                path = var
-                save_as = var_name
+                entry = extract_entry(var_name, var)
+                if entry is None:
+                    self.logger.get_logger().warning(f"提取变量失败 {var_name}: 不支持的提取配置 {var}")
+                    continue
+                save_as, path = entry
 
                 # 根据路径前缀确定提取来源
                 if path.startswith('$.cookies'):
@@ -311,7 +490,7 @@ class ApiResponse:
                 elif path.startswith('$.data'):
                     # 从响应体数据提取
                     data_path = path[6:]  # 去掉 '$.data'
-                    response_data = getattr(response, 'json', lambda: {})() if hasattr(response, 'json') else {}
+                    response_data = body.json
                     variable_value = self._extract_value_by_path(response_data, data_path)
 
                 elif path.startswith('$.status'):
@@ -320,11 +499,11 @@ class ApiResponse:
 
                 elif path.startswith('$.url'):
                     # 提取 URL
-                    variable_value = response.url if hasattr(response, 'url') else None
+                    variable_value = response_url(response)
 
                 else:
                     # 默认从响应体提取
-                    response_data = getattr(response, 'json', lambda: {})() if hasattr(response, 'json') else {}
+                    response_data = body.json
                     variable_value = self._extract_value_by_path(response_data, path)
 
                 if variable_value is not None:
@@ -389,255 +568,60 @@ class ApiResponse:
         return response_obj.cookies.get(cookie_name)
 
     def _extract_value_by_path(self, data: Any, path: str) -> Any:
-        """根据路径提取值，支持 JSONPath 风格"""
+        """根据路径提取值，支持 JSONPath 风格（路径编译后缓存）"""
         if not path or path == '.' or path == '$':
             return data
-
-        # 标准化路径：去掉开头的 $ 和可能的 .
-        if path.startswith('$'):
-            path = path[1:]
-        if path.startswith('.'):
-            path = path[1:]
-
-        # 如果路径为空，返回原始数据
-        if not path:
-            return data
-
-        # 解析路径组件
-        components = self._parse_jsonpath_components(path)
-        current_data = data
-
-        for component in components:
-            if current_data is None:
-                return None
-
-            # 处理数组索引 [0], [1], ['key'], ["key"] 等
-            if component.startswith('[') and component.endswith(']'):
-                index_str = component[1:-1]  # 去掉方括号
-
-                # 处理带引号的键 ['key'], ["key"]
-                if (index_str.startswith("'") and index_str.endswith("'")) or \
-                        (index_str.startswith('"') and index_str.endswith('"')):
-                    key = index_str[1:-1]  # 去掉引号
-                    if isinstance(current_data, dict):
-                        current_data = current_data.get(key)
-                    elif isinstance(current_data, list):
-                        # 在列表中的每个元素中查找该键（如果元素是字典）
-                        results = []
-                        for item in current_data:
-                            if isinstance(item, dict) and key in item:
-                                results.append(item[key])
-                        # 根据结果数量返回
-                        if not results:
-                            return None
-                        current_data = results[0] if len(results) == 1 else results
-                    else:
-                        return None
-
-                # 处理数字索引
-                elif index_str.isdigit() or (index_str.startswith('-') and index_str[1:].isdigit()):
-                    index = int(index_str)
-
-                    if isinstance(current_data, list):
-                        # 处理负索引
-                        if index < 0:
-                            index = len(current_data) + index
-
-                        if 0 <= index < len(current_data):
-                            current_data = current_data[index]
-                        else:
-                            return None
-                    else:
-                        return None
-
-                # 处理不带引号的键 [key]（简写形式）
-                else:
-                    key = index_str
-                    if isinstance(current_data, dict):
-                        current_data = current_data.get(key)
-                    elif isinstance(current_data, list):
-                        # 尝试在列表元素中查找
-                        results = []
-                        for item in current_data:
-                            if isinstance(item, dict) and key in item:
-                                results.append(item[key])
-                        if results:
-                            current_data = results[0] if len(results) == 1 else results
-                        else:
-                            return None
-                    else:
-                        return None
-
-            # 处理普通的键（无方括号）
-            else:
-                if isinstance(current_data, dict):
-                    current_data = current_data.get(component)
-                elif isinstance(current_data, list):
-                    # 尝试将组件转换为索引
-                    if component.isdigit():
-                        index = int(component)
-                        if 0 <= index < len(current_data):
-                            current_data = current_data[index]
-                        else:
-                            return None
-                    else:
-                        # 在列表元素中查找键
-                        results = []
-                        for item in current_data:
-                            if isinstance(item, dict) and component in item:
-                                results.append(item[component])
-                        if results:
-                            current_data = results[0] if len(results) == 1 else results
-                        else:
-                            return None
-                else:
-                    return None
-
-        return current_data
-
-    def _parse_jsonpath_components(self, path: str) -> list:
-        """解析 JSONPath 表达式为组件列表"""
-        components = []
-        i = 0
-        length = len(path)
-
-        while i < length:
-            char = path[i]
-
-            if char == '.':
-                i += 1
-                if i >= length:
-                    break
-
-                # 检查下一个字符是否是 [
-                if path[i] == '[':
-                    # 处理 .[ 的情况，跳过 . 直接处理 [
-                    continue
-                else:
-                    # 处理 .key 的情况
-                    start = i
-                    while i < length and path[i] not in ['[', '.']:
-                        i += 1
-                    if start < i:
-                        components.append(path[start:i])
-
-            elif char == '[':
-                # 找到匹配的 ]
-                bracket_end = path.find(']', i)
-                if bracket_end == -1:
-                    raise ValueError(f"Unclosed bracket in path: {path}")
-
-                components.append(path[i:bracket_end + 1])  # 包括方括号
-                i = bracket_end + 1
-
-            else:
-                # 处理开头的键（没有 . 前缀）
-                start = i
-                while i < length and path[i] not in ['[', '.']:
-                    i += 1
-                if start < i:
-                    components.append(path[start:i])
-
-        return components
+        return compile_path(path).evaluate(data)
 
     def _validate_response(self, response: Response, response_data: Any,
                            validate_config: List, result: Dict[str, Any]):
-        """验证响应"""
+        """验证响应（validate 列表编译为验证计划后执行，编译结果按用例缓存）"""
         if not validate_config:
             return
 
-        for validation in validate_config:
-            try:
-                # 简化配置格式：[字段路径, 比较器, 期望值]
-                if len(validation) >= 3:
-                    field_path = validation[0]
-                    comparator = validation[1]
-                    expected = validation[2]
-                    message = validation[3] if len(validation) > 3 else ''
-                else:
-                    self.logger.get_logger().error(f"验证配置格式错误: {validation}")
-                    continue
-
-                # 获取实际值
-                actual_value = self._get_field_value(field_path, response, response_data)
-
-                # 执行比较
-                is_pass = self._compare_values(actual_value, expected, comparator)
+        logger = self.logger.get_logger()
+        for rule, validation in compile_validations(validate_config).rules:
+            if rule is None:
+                logger.error(f"验证配置格式错误: {validation}")
+                continue
 
-                validation_result = {
-                    'field': field_path,
-                    'expected': expected,
-                    'actual': actual_value,
-                    'comparator': comparator,
-                    'message': message,
-                    'pass': is_pass
-                }
-
-                result['validation_results'].append(validation_result)
-
-                if is_pass:
-                    self.logger.get_logger().info(f"验证通过: {field_path} {comparator} {expected}")
-                else:
-                    error_msg = f"验证失败: {field_path} {comparator} {expected}, 实际值: {actual_value}"
-                    if message:
-                        error_msg = f"{message}: {error_msg}"
-                    self.logger.get_logger().error(error_msg)
-                    raise AssertionError(error_msg)
-
-            except AssertionError as e:
-                raise
+            try:
+                # 获取实际值并比较
+                actual_value = rule.actual(response, response_data)
+                is_pass = rule.compare(actual_value)
             except Exception as e:
-                self.logger.get_logger().error(f"验证执行失败: {str(e)}")
+                logger.error(f"验证执行失败: {str(e)}")
                 result['validation_results'].append({
-                    'field': field_path if 'field_path' in locals() else 'unknown',
-                    'expected': expected if 'expected' in locals() else None,
+                    'field': rule.field,
+                    'expected': rule.expected,
                     'actual': None,
-                    'comparator': comparator if 'comparator' in locals() else 'unknown',
+                    'comparator': rule.comparator,
                     'message': f"验证执行失败: {str(e)}",
                     'pass': False
                 })
                 raise AssertionError(f"验证执行失败: {str(e)}")
 
+            result['validation_results'].append({
+                'field': rule.field,
+                'expected': rule.expected,
+                'actual': actual_value,
+                'comparator': rule.comparator,
+                'message': rule.message,
+                'pass': is_pass
+            })
+
+            if is_pass:
+                logger.info(f"验证通过: {rule.field} {rule.comparator} {rule.expected}")
+            else:
+                error_msg = f"验证失败: {rule.field} {rule.comparator} {rule.expected}, 实际值: {actual_value}"
+                if rule.message:
+                    error_msg = f"{rule.message}: {error_msg}"
+                logger.error(error_msg)
+                raise AssertionError(error_msg)
+
     def _get_field_value(self, field_path: str, response: Response, response_data: Any) -> Any:
         """根据路径表达式获取字段值"""
-        # 所有路径都以$开头
-        if not field_path.startswith('$'):
-            # 如果不是路径表达式，返回整个响应数据
-            return response_data
-
-        # 移除开头的$符号
-        path = field_path[1:]
-
-        # 如果路径以.开头，去掉.
-        if path.startswith('.'):
-            path = path[1:]
-
-        # 特殊字段处理
-        if path == 'status_code':
-            return response.status_code
-        elif path == 'headers':
-            return dict(response.headers)
-        elif path == 'cookies':
-            return dict(response.cookies)
-        elif path == 'response_time':
-            return response.elapsed.total_seconds()
-        elif path == 'url':
-            return response.url
-        elif path == 'encoding':
-            return response.encoding
-        elif not path:  # 如果是"$"，返回整个响应数据
-            return response_data
-
-        # JSON响应数据路径提取（支持点号表示法）
-        if '.' in path or '[' in path:
-            return self._extract_json_path(response_data, path)
-
-        # 直接键查找
-        if isinstance(response_data, dict) and path in response_data:
-            return response_data[path]
-
-        # 尝试在响应数据中查找
-        return self._extract_json_path(response_data, path)
+        return compile_field(field_path)(response, response_data)
 
     def _extract_json_path(self, data: Any, path: str) -> Any:
         """提取JSON路径的值"""
@@ -649,159 +633,11 @@ class ApiResponse:
             # 这里无法获取status_code，应该在_get_field_value中处理
             return None
 
-        # 分割路径
-        if '.' in path:
-            parts = path.split('.')
-        else:
-            parts = [path]
-
-        current = data
-
-        for part in parts:
-            if current is None:
-                return None
-
-            # 处理数组索引，如 items[0] 或 [0]
-            if '[' in part and part.endswith(']'):
-                # 处理两种情况：key[0] 和 [0]
-                if part.startswith('['):
-                    # 直接数组索引，如 [0]
-                    index = int(part[1:-1])
-                    if isinstance(current, list) and 0 <= index < len(current):
-                        current = current[index]
-                    else:
-                        return None
-                else:
-                    # 带键名的数组索引，如 items[0]
-                    key = part.split('[')[0]
-                    index_str = part.split('[')[1][:-1]
-                    index = int(index_str)
-
-                    if isinstance(current, dict) and key in current:
-                        current = current[key]
-                        if isinstance(current, list) and 0 <= index < len(current):
-                            current = current[index]
-                        else:
-                            return None
-                    else:
-                        return None
-            else:
-                # 普通键访问
-                if isinstance(current, dict) and part in current:
-                    current = current[part]
-                elif isinstance(current, list):
-                    # 如果是列表，可以按索引访问
-                    try:
-                        index = int(part)
-                        if 0 <= index < len(current):
-                            current = current[index]
-                        else:
-                            return None
-                    except ValueError:
-                        # 如果不是数字，尝试在列表元素中查找
-                        found = False
-                        for item in current:
-                            if isinstance(item, dict) and part in item:
-                                current = item[part]
-                                found = True
-                                break
-                        if not found:
-                            return None
-                else:
-                    return None
-
-        return current
+        return compile_path(path).evaluate(data, first_match=True)
 
     def _compare_values(self, actual: Any, expected: Any, comparator: str) -> bool:
-        """比较值，支持常用比较运算符"""
-        try:
-            # 处理None值
-            if actual is None:
-                return False
-
-            # 处理比较器字符串
-            comparator = str(comparator).strip()
-
-            # 自动转换类型匹配（字符串和数字）
-            if comparator in ['==', '!=', '>', '<', '>=', '<=']:
-                # 尝试将actual和expected转换为相同类型
-                try:
-                    # 如果两者都是数字字符串，转换为数字比较
-                    if isinstance(actual, (int, float)) or (
-                            isinstance(actual, str) and actual.replace('.', '', 1).isdigit()):
-                        if isinstance(expected, (int, float)) or (
-                                isinstance(expected, str) and expected.replace('.', '', 1).isdigit()):
-                            actual_float = float(actual)
-                            expected_float = float(expected)
-
-                            if comparator == '==':
-                                return abs(actual_float - expected_float) < 0.000001  # 浮点数比较容差
-                            elif comparator == '!=':
-                                return abs(actual_float - expected_float) > 0.000001
-                            elif comparator == '>':
-                                return actual_float > expected_float
-                            elif comparator == '<':
-                                return actual_float < expected_float
-                            elif comparator == '>=':
-                                return actual_float >= expected_float
-                            elif comparator == '<=':
-                                return actual_float <= expected_float
-                except:
-                    pass  # 转换失败，按原样比较
-
-            # 按原样比较
-            if comparator == '==':
-                return str(actual) == str(expected)
-            elif comparator == '!=':
-                return str(actual) != str(expected)
-            elif comparator == '>':
-                try:
-                    return float(actual) > float(expected)
-                except:
-                    return False
-            elif comparator == '<':
-                try:
-                    return float(actual) < float(expected)
-                except:
-                    return False
-            elif comparator == '>=':
-                try:
-                    return float(actual) >= float(expected)
-                except:
-                    return False
-            elif comparator == '<=':
-                try:
-                    return float(actual) <= float(expected)
-                except:
-                    return False
-            elif comparator in ['in', '包含']:
-                return str(expected) in str(actual)
-            elif comparator in ['not in', '不包含']:
-                return str(expected) not in str(actual)
-            elif comparator in ['regex', '正则匹配']:
-                return bool(re.search(str(expected), str(actual)))
-            elif comparator in ['length', '长度']:
-                try:
-                    return len(actual) == int(expected)
-                except:
-                    return False
-            elif comparator in ['startswith', '以开头']:
-                return str(actual).startswith(str(expected))
-            elif comparator in ['endswith', '以结尾']:
-                return str(actual).endswith(str(expected))
-            elif comparator in ['type', '类型']:
-                return type(actual).__name__ == str(expected)
-            elif comparator in ['exists', '存在']:
-                return actual is not None
-            elif comparator in ['not_exists', '不存在']:
-                return actual is None
-            else:
-                self.logger.get_logger().warning(f"不支持的比较器: {comparator}")
-                return False
-        except Exception as e:
-            self.logger.get_logger().error(
-                f"比较失败: {e}, actual={actual}, expected={expected}, comparator={comparator}")
-            return False
+        """比较值，支持常用比较运算符及通过 register_comparator 注册的比较器"""
+        return ValidationRule(('$', comparator, expected)).compare(actual)
 
     def set_variable(self, name: str, value: Any):
         """设置变量"""
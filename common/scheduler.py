@@ -0,0 +1,222 @@
+import glob
+import os
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, Iterable, List, Optional, Sequence, Set, Tuple
+
+from common.base_api import TestExecutor
+from common.config import config
+from common.request_encapsulation import extract_entry
+from common.log import test_logger
+from common.variable_store import VariableStore, variable_store
+from utils.template_utils import template_variables
+from utils.yaml_utils import case_catalog
+
+# 用例标识: (用例文件, 用例名)
+CaseKey = Tuple[str, str]
+
+
+class ScheduleError(Exception):
+    """调度计划错误（依赖环、变量缺少提供者等），在发送任何请求之前抛出"""
+
+
+class CaseNode:
+    """调度图中的用例节点"""
+
+    __slots__ = ('key', 'case', 'data', 'produces', 'consumes', 'depends_on', 'dependents')
+
+    def __init__(self, key: CaseKey, case: Dict[str, Any], data: Optional[Dict[str, Any]] = None):
+        self.key = key
+        self.case = case
+        self.data = data
+        # extract 声明的变量
+        self.produces: Set[str] = set(_extract_names(case.get('extract')))
+        # ${...} 占位符引用的变量
+        self.consumes: Set[str] = set(template_variables(case))
+        self.depends_on: Set[CaseKey] = set()
+        self.dependents: Set[CaseKey] = set()
+
+    def __repr__(self):
+        return f"CaseNode({self.key[0]}::{self.key[1]})"
+
+
+def _extract_names(extract_config: Any) -> Iterable[str]:
+    """extract 配置中保存的变量名，与执行时 ApiResponse 的解析一致（extract_entry），不支持的写法不产出变量"""
+    if not isinstance(extract_config, dict):
+        return []
+    names = []
+    for var_name, var in extract_config.items():
+        entry = extract_entry(var_name, var)
+        if entry is not None:
+            names.append(entry[0])
+    return names
+
+
+class CaseScheduler:
+    """
+    依赖感知的并行用例调度器
+
+    以 extract 声明的变量为产出、以 ${...} 占位符为消费，在所有用例文件之间建立依赖图。
+    每个变量只依赖一个提供者：同一文件中的优先，其次是排在用例之前且最近的用例。
+    互不依赖的用例在线程池中并行执行，用例只等待真正为其提供变量的用例。
+    依赖环和缺少提供者的变量在发送任何请求之前检查，变量存储中已有的变量视为已满足。
+    """
+
+    def __init__(self, files: Iterable[str] = None, variables: Dict[str, Any] = None,
+                 max_workers: int = 4, store: VariableStore = None):
+        """
+        :param files: 参与建图的用例文件，默认 case_data 目录下的全部 yml 文件
+        :param variables: 外部提供的变量（如登录用户名、密码），视为已满足的依赖
+        :param max_workers: 并行执行的线程数
+        :param store: 变量存储，默认使用全局变量存储（extract.yml），其中已有的变量视为已满足的依赖
+        """
+        if files is None:
+            files = sorted(os.path.basename(path) for path in glob.glob(os.path.join(config.CASE_DATA_DIR, '*.yml')))
+        self.files = list(files)
+        self.variables = dict(variables or {})
+        self.max_workers = max_workers
+        self.store = store
+        self.logger = test_logger.get_logger()
+        self.nodes: Dict[CaseKey, CaseNode] = {}
+        self._producers: Dict[str, List[CaseKey]] = {}
+        # 用例在 文件顺序 + 文件内顺序 中的位置，用于选择最近的提供者
+        self._order: Dict[CaseKey, int] = {}
+        self._load()
+
+    def _load(self):
+        """读取所有用例并登记变量提供者"""
+        for file_path in self.files:
+            index, duplicates = case_catalog.get_entry(file_path)
+            if index is None:
+                continue
+            if duplicates:
+                raise ScheduleError(f"用例名重复: {duplicates}, 文件: {file_path}")
+            for case_name, case in index.items():
+                node = CaseNode((file_path, case_name), case)
+                self.nodes[node.key] = node
+                self._order[node.key] = len(self._order)
+                for var_name in node.produces:
+                    self._producers.setdefault(var_name, []).append(node.key)
+
+    def _producer_of(self, var_name: str, consumer: CaseKey) -> Optional[CaseKey]:
+        """
+        变量的提供者（自身除外）：同一文件中的优先，其次排在用例之前的优先，再按距离最近选择
+        :return: 没有提供者时返回None
+        """
+        position = self._order[consumer]
+
+        def rank(key: CaseKey) -> tuple:
+            distance = self._order[key] - position
+            return key[0] != consumer[0], distance > 0, abs(distance)
+
+        producers = [key for key in self._producers.get(var_name, []) if key != consumer]
+        return min(producers, key=rank) if producers else None
+
+    def plan(self, cases: Iterable[Sequence] = None) -> Dict[CaseKey, CaseNode]:
+        """
+        生成调度计划，自动包含所选用例依赖的提供者
+        :param cases: 要执行的用例，每项为 (文件, 用例名) 或 (文件, 用例名, 变量)，默认全部用例
+        :return: 参与执行的节点
+        """
+        requested: Dict[CaseKey, Optional[Dict[str, Any]]] = {}
+        for item in (cases if cases is not None else self.nodes.keys()):
+            key = (item[0], item[1])
+            if key not in self.nodes:
+                raise ScheduleError(f"未找到对应用例：{key[1]} - 在文件 {key[0]} 中")
+            requested[key] = item[2] if len(item) > 2 else None
+
+        known = set(self.variables) | set((self.store or variable_store).snapshot())
+        planned: Dict[CaseKey, CaseNode] = {}
+        missing: Dict[CaseKey, List[str]] = {}
+        pending = list(requested)
+        while pending:
+            key = pending.pop()
+            if key in planned:
+                continue
+            source = self.nodes[key]
+            node = CaseNode(key, source.case, requested.get(key))
+            planned[key] = node
+            provided = known | set(node.data or {})
+            for var_name in sorted(node.consumes):
+                producer = self._producer_of(var_name, key)
+                if producer is not None:
+                    node.depends_on.add(producer)
+                    pending.append(producer)
+                elif var_name not in provided:
+                    missing.setdefault(key, []).append(var_name)
+
+        if missing:
+            details = "\n".join(f"  {key[0]}::{key[1]}: {', '.join(names)}" for key, names in missing.items())
+            raise ScheduleError(f"以下变量没有提供者:\n{details}")
+
+        for node in planned.values():
+            for dependency in node.depends_on:
+                planned[dependency].dependents.add(node.key)
+        self._check_cycles(planned)
+        return planned
+
+    @staticmethod
+    def _check_cycles(planned: Dict[CaseKey, CaseNode]):
+        """检查依赖环，发现时报告环上的用例"""
+        visiting, done = set(), set()
+
+        def visit(key: CaseKey, path: List[CaseKey]):
+            visiting.add(key)
+            path.append(key)
+            for dependency in sorted(planned[key].depends_on):
+                if dependency in visiting:
+                    cycle = path[path.index(dependency):] + [dependency]
+                    raise ScheduleError("用例依赖存在环: " + " -> ".join(f"{f}::{n}" for f, n in cycle))
+                if dependency not in done:
+                    visit(dependency, path)
+            path.pop()
+            visiting.discard(key)
+            done.add(key)
+
+        for key in sorted(planned):
+            if key not in done:
+                visit(key, [])
+
+    def run(self, cases: Iterable[Sequence] = None) -> Dict[CaseKey, Dict[str, Any]]:
+        """
+        按依赖关系并行执行用例
+        :param cases: 要执行的用例，默认全部用例
+        :return: {(文件, 用例名): {'status': passed/failed/skipped, 'result': 执行结果, 'error': 异常}}
+        """
+        planned = self.plan(cases)
+        remaining = {key: len(node.depends_on) for key, node in planned.items()}
+        outcomes: Dict[CaseKey, Dict[str, Any]] = {}
+
+        def execute(node: CaseNode) -> Dict[str, Any]:
+            variables = dict(self.variables)
+            variables.update(node.data or {})
+            return TestExecutor(self.store).case(node.key[0], node.key[1], variables)
+
+        def skip(key: CaseKey, reason: str):
+            for dependent in planned[key].dependents:
+                if dependent not in outcomes:
+                    outcomes[dependent] = {'status': 'skipped', 'result': None, 'error': reason}
+                    skip(dependent, reason)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            running = {}
+            for key in sorted(key for key, count in remaining.items() if count == 0):
+                running[pool.submit(execute, planned[key])] = key
+
+            while running:
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    key = running.pop(future)
+                    error = future.exception()
+                    if error is not None:
+                        outcomes[key] = {'status': 'failed', 'result': None, 'error': error}
+                        skip(key, f"依赖用例失败: {key[0]}::{key[1]}")
+                        continue
+                    outcomes[key] = {'status': 'passed', 'result': future.result(), 'error': None}
+                    for dependent in sorted(planned[key].dependents):
+                        remaining[dependent] -= 1
+                        if remaining[dependent] == 0 and dependent not in outcomes:
+                            running[pool.submit(execute, planned[dependent])] = dependent
+
+        passed = sum(1 for outcome in outcomes.values() if outcome['status'] == 'passed')
+        self.logger.info(f"调度执行完成: 共 {len(planned)} 个用例, 通过 {passed} 个")
+        return outcomes
@@ -0,0 +1,387 @@
+import re
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from requests import Response
+
+from common.log import test_logger
+from utils.jsonpath_utils import compile_path
+from utils.template_utils import TemplateCache
+
+# 浮点数相等比较的容差
+FLOAT_TOLERANCE = 0.000001
+
+
+class ComparatorSpec:
+    """
+    已注册的比较器
+
+    func(actual, prepared) -> bool，prepared 是 prepare(expected) 的结果，在编译验证计划时计算一次。
+    allow_none 为 False 时实际值为 None 直接判定失败，不调用 func。
+    example(expected) 生成一个满足比较的实际值（模拟服务合成响应时使用），无法生成时抛出 TypeError/ValueError。
+    """
+
+    __slots__ = ('name', 'func', 'prepare', 'allow_none', 'example')
+
+    def __init__(self, name: str, func: Callable[[Any, Any], bool],
+                 prepare: Callable[[Any], Any] = None, allow_none: bool = False,
+                 example: Callable[[Any], Any] = None):
+        self.name = name
+        self.func = func
+        self.prepare = prepare
+        self.allow_none = allow_none
+        self.example = example
+
+    def matches(self, actual: Any, expected: Any) -> bool:
+        """不经过验证计划直接比较（期望值每次预处理）"""
+        if actual is None and not self.allow_none:
+            return False
+        prepared = self.prepare(expected) if self.prepare is not None else None
+        return bool(self.func(actual, prepared))
+
+
+# 比较器名称（含别名） -> 比较器
+_COMPARATORS: Dict[str, ComparatorSpec] = {}
+
+
+def register_comparator(name: str, *aliases: str, prepare: Callable[[Any], Any] = None,
+                        allow_none: bool = False, example: Callable[[Any], Any] = None):
+    """
+    注册比较器（装饰器），同名比较器会被覆盖
+
+    用法：
+    @register_comparator('approx', '约等于', prepare=float)
+    def approx(actual, expected):
+        return abs(float(actual) - expected) < 0.01
+
+    :param name: 比较器名称，即 validate 中的第二项
+    :param aliases: 别名，如中文名称
+    :param prepare: 期望值预处理函数，编译验证计划时调用一次
+    :param allow_none: 实际值为 None 时是否仍调用比较函数
+    :param example: 由期望值生成满足比较的实际值，用于模拟服务，不提供时模拟服务不合成该验证
+    """
+
+    def decorator(func: Callable[[Any, Any], bool]):
+        spec = ComparatorSpec(name, func, prepare, allow_none, example)
+        for key in (name,) + aliases:
+            _COMPARATORS[key] = spec
+        return func
+
+    return decorator
+
+
+def get_comparator(name: Any) -> Optional[ComparatorSpec]:
+    """按名称或别名获取比较器，未注册时返回None"""
+    return _COMPARATORS.get(str(name).strip())
+
+
+def satisfying_value(comparator: Any, expected: Any) -> Tuple[bool, Any]:
+    """
+    生成满足验证条件的实际值（由比较器的 example 生成，并用比较器本身确认）
+    :return: (是否能够生成, 值)
+    """
+    spec = get_comparator(comparator)
+    if spec is None or spec.example is None:
+        return False, None
+    try:
+        value = spec.example(expected)
+        if spec.matches(value, expected):
+            return True, value
+    except (TypeError, ValueError, re.error):
+        pass
+    return False, None
+
+
+# ---------------------------------------------------------------- 内置比较器
+
+def _is_numeric_like(value: Any) -> bool:
+    """数字或数字字符串（如 200、'3.5'）"""
+    return isinstance(value, (int, float)) or (isinstance(value, str) and value.replace('.', '', 1).isdigit())
+
+
+def _to_number(value: Any) -> Optional[float]:
+    """数字或数字字符串转为 float，否则返回None"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        digits = value.replace('.', '', 1)
+        # isdigit 包含上标等 float 不接受的字符，isdecimal 与 float 一致
+        if digits.isdigit() and digits.isdecimal():
+            return float(value)
+    return None
+
+
+def _to_float(value: Any) -> Optional[float]:
+    """任意值尝试转为 float（如 '-1'、'1e3'），失败返回None"""
+    number = _to_number(value)
+    if number is not None:
+        return number
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class _Expected:
+    """预处理后的期望值：原始字符串、数字字符串对应的数字、任意形式的 float"""
+
+    __slots__ = ('text', 'number', 'float')
+
+    def __init__(self, expected: Any):
+        self.text = str(expected)
+        self.number = _to_number(expected) if _is_numeric_like(expected) else None
+        self.float = _to_float(expected)
+
+
+def _ordering(operator: Callable[[float, float], bool]) -> Callable[[Any, _Expected], bool]:
+    """大小比较：两边都能转为数字时比较，否则判定失败"""
+
+    def compare(actual: Any, expected: _Expected) -> bool:
+        if expected.number is not None:
+            number = _to_number(actual)
+            if number is not None:
+                return operator(number, expected.number)
+        actual_float = _to_float(actual)
+        return actual_float is not None and expected.float is not None and operator(actual_float, expected.float)
+
+    return compare
+
+
+def _same(expected: Any) -> Any:
+    return expected
+
+
+def _number_example(offset: float) -> Callable[[Any], float]:
+    return lambda expected: float(expected) + offset
+
+
+@register_comparator('==', prepare=_Expected, example=_same)
+def _equals(actual: Any, expected: _Expected) -> bool:
+    """两边都是数字（字符串）时按数值比较，否则按字符串比较"""
+    if expected.number is not None:
+        number = _to_number(actual)
+        if number is not None:
+            return abs(number - expected.number) < FLOAT_TOLERANCE
+    return str(actual) == expected.text
+
+
+@register_comparator('!=', prepare=_Expected, example=lambda expected: f"not_{expected}")
+def _not_equals(actual: Any, expected: _Expected) -> bool:
+    if expected.number is not None:
+        number = _to_number(actual)
+        if number is not None:
+            return abs(number - expected.number) > FLOAT_TOLERANCE
+    return str(actual) != expected.text
+
+
+register_comparator('>', prepare=_Expected, example=_number_example(1))(_ordering(lambda a, b: a > b))
+register_comparator('<', prepare=_Expected, example=_number_example(-1))(_ordering(lambda a, b: a < b))
+register_comparator('>=', prepare=_Expected, example=_same)(_ordering(lambda a, b: a >= b))
+register_comparator('<=', prepare=_Expected, example=_same)(_ordering(lambda a, b: a <= b))
+
+
+@register_comparator('in', '包含', prepare=str, example=_same)
+def _contains(actual: Any, expected: str) -> bool:
+    return expected in str(actual)
+
+
+@register_comparator('not in', '不包含', prepare=str, example=lambda expected: 'mock')
+def _not_contains(actual: Any, expected: str) -> bool:
+    return expected not in str(actual)
+
+
+@register_comparator('regex', '正则匹配', prepare=lambda expected: re.compile(str(expected)))
+def _regex(actual: Any, pattern: re.Pattern) -> bool:
+    return pattern.search(str(actual)) is not None
+
+
+def _to_int(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@register_comparator('length', '长度', prepare=_to_int, example=lambda expected: ['mock'] * int(expected))
+def _length(actual: Any, expected: Optional[int]) -> bool:
+    if expected is None or not hasattr(actual, '__len__'):
+        return False
+    return len(actual) == expected
+
+
+@register_comparator('startswith', '以开头', prepare=str, example=_same)
+def _startswith(actual: Any, expected: str) -> bool:
+    return str(actual).startswith(expected)
+
+
+@register_comparator('endswith', '以结尾', prepare=str, example=_same)
+def _endswith(actual: Any, expected: str) -> bool:
+    return str(actual).endswith(expected)
+
+
+# type 比较器各类型的示例值
+_TYPE_EXAMPLES = {'str': 'mock', 'int': 0, 'float': 0.0, 'bool': True, 'list': [], 'dict': {}}
+
+
+@register_comparator('type', '类型', prepare=str, example=lambda expected: _TYPE_EXAMPLES.get(str(expected)))
+def _type(actual: Any, expected: str) -> bool:
+    return type(actual).__name__ == expected
+
+
+@register_comparator('exists', '存在', example=lambda expected: 'mock')
+def _exists(actual: Any, expected: Any) -> bool:
+    return actual is not None
+
+
+# 字段不存在（取值为None）时通过；原 _compare_values 对 None 一律判定失败，not_exists 永远不会通过
+@register_comparator('not_exists', '不存在', allow_none=True)
+def _not_exists(actual: Any, expected: Any) -> bool:
+    return actual is None
+
+
+# ---------------------------------------------------------------- 字段取值
+
+def response_url(response: Any) -> Optional[str]:
+    """响应的最终 URL 字符串（httpx 响应的 URL 对象转换为字符串，与 requests 一致）"""
+    url = getattr(response, 'url', None)
+    return None if url is None else str(url)
+
+
+# 特殊字段：从响应对象取值
+_SPECIAL_FIELDS: Dict[str, Callable[[Response], Any]] = {
+    'status_code': lambda response: response.status_code,
+    'headers': lambda response: dict(response.headers),
+    'cookies': lambda response: dict(response.cookies),
+    'response_time': lambda response: response.elapsed.total_seconds(),
+    'url': response_url,
+    'encoding': lambda response: response.encoding,
+}
+
+FieldGetter = Callable[[Response, Any], Any]
+
+
+def body_path(field_path: str) -> Optional[str]:
+    """
+    验证字段对应的响应体路径
+    :return: 响应体路径，'' 表示整个响应体，响应对象的属性（status_code 等）返回None
+    """
+    if not field_path.startswith('$'):
+        return ''
+    path = field_path[1:]
+    if path.startswith('.'):
+        path = path[1:]
+    return None if path in _SPECIAL_FIELDS else path
+
+
+def compile_field(field_path: str) -> FieldGetter:
+    """
+    编译验证字段路径为取值函数 getter(response, response_data)
+    - 不以 $ 开头、$ 本身: 整个响应数据
+    - $.status_code/headers/cookies/response_time/url/encoding: 响应对象的对应属性
+    - 其他路径直接作用于响应数据，键作用于列表时取第一个匹配项
+    """
+    path = body_path(field_path)
+    if path is None:
+        special = _SPECIAL_FIELDS[field_path[1:].lstrip('.')]
+        return lambda response, data: special(response)
+    if not path:
+        return lambda response, data: data
+
+    compiled = compile_path(path)
+    if '.' in path or '[' in path:
+        return lambda response, data: compiled.evaluate(data, first_match=True)
+
+    # 单个键：字典中存在时直接取值
+    def get_key(response: Response, data: Any) -> Any:
+        if isinstance(data, dict) and path in data:
+            return data[path]
+        return compiled.evaluate(data, first_match=True)
+
+    return get_key
+
+
+# ---------------------------------------------------------------- 验证计划
+
+class ValidationRule:
+    """
+    编译后的单条验证 [字段路径, 比较器, 期望值, 说明]
+
+    字段路径、比较器和期望值预处理只在编译时执行一次。
+    编译阶段的错误（路径无法解析、正则无效等）记录下来，执行时按原有方式报告。
+    """
+
+    __slots__ = ('field', 'comparator', 'expected', 'message', 'getter', 'spec', 'prepared',
+                 'field_error', 'compare_error')
+
+    def __init__(self, validation: Sequence):
+        self.field, self.comparator, self.expected = validation[0], validation[1], validation[2]
+        self.message = validation[3] if len(validation) > 3 else ''
+        self.getter: Optional[FieldGetter] = None
+        self.prepared: Any = None
+        self.field_error: Optional[Exception] = None
+        self.compare_error: Optional[Exception] = None
+
+        try:
+            self.getter = compile_field(self.field)
+        except Exception as e:
+            self.field_error = e
+
+        self.spec = get_comparator(self.comparator)
+        if self.spec is not None and self.spec.prepare is not None:
+            try:
+                self.prepared = self.spec.prepare(self.expected)
+            except Exception as e:
+                self.compare_error = e
+
+    def actual(self, response: Response, response_data: Any) -> Any:
+        """获取实际值，路径编译失败时抛出编译时的异常"""
+        if self.field_error is not None:
+            raise self.field_error
+        return self.getter(response, response_data)
+
+    def compare(self, actual: Any) -> bool:
+        """比较实际值与期望值，比较器不存在或比较出错时记录日志并判定失败"""
+        spec = self.spec
+        if spec is None:
+            test_logger.get_logger().warning(f"不支持的比较器: {str(self.comparator).strip()}")
+            return False
+        if actual is None and not spec.allow_none:
+            return False
+        try:
+            if self.compare_error is not None:
+                raise self.compare_error
+            return bool(spec.func(actual, self.prepared))
+        except Exception as e:
+            test_logger.get_logger().error(
+                f"比较失败: {e}, actual={actual}, expected={self.expected}, comparator={self.comparator}")
+            return False
+
+
+class ValidationPlan:
+    """
+    用例 validate 列表编译后的验证计划
+
+    格式错误（少于3项）的验证项保留为 (None, 原配置)，执行时记录错误并跳过。
+    """
+
+    __slots__ = ('rules',)
+
+    def __init__(self, validate_config: List):
+        self.rules: List[Tuple[Optional[ValidationRule], Any]] = [
+            (rule_cache.get(validation) if _is_rule(validation) else None, validation)
+            for validation in validate_config
+        ]
+
+
+def _is_rule(validation: Any) -> bool:
+    return isinstance(validation, (list, tuple)) and len(validation) >= 3
+
+
+# 验证计划与单条验证的缓存，均按内容缓存：
+# 相同的 validate 列表（变量替换后）只编译一次，含占位符的列表中未变化的验证项同样复用
+plan_cache = TemplateCache(factory=ValidationPlan)
+rule_cache = TemplateCache(maxsize=4096, factory=ValidationRule)
+
+
+def compile_validations(validate_config: List) -> ValidationPlan:
+    """获取 validate 列表对应的验证计划（编译结果按内容缓存）"""
+    return plan_cache.get(validate_config)
@@ -0,0 +1,225 @@
+import atexit
+import os
+import threading
+from typing import Dict, Any, Iterable, Optional
+
+import yaml
+
+from common.config import config
+from common.log import test_logger
+from common.os_path import get_object_path
+from common.parallel import FileLock, worker_files, worker_id, worker_path
+
+
+class VariableStore:
+    """
+    会话级变量存储 - 在内存中维护提取的变量
+
+    首次访问时从 extract.yml 加载历史变量，之后的读写都在内存中完成；
+    仅在调用 flush()、会话结束或延迟落盘计时到期时才写回文件。
+    """
+
+    def __init__(self, file_path: Optional[str] = None, flush_delay: float = 0,
+                 seed_path: Optional[str] = None):
+        """
+        :param file_path: 持久化文件路径，为None时只保存在内存中
+        :param flush_delay: 延迟落盘时间（秒），0 表示只在 flush()/会话结束时写入
+        :param seed_path: 加载初始变量的文件（只读），设置后不读取持久化文件，持久化文件只用于写回
+        """
+        self.file_path = file_path
+        self.flush_delay = flush_delay
+        self.seed_path = seed_path
+        self.logger = test_logger.get_logger()
+        self._variables: Optional[Dict[str, Any]] = None
+        self._dirty = False
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.RLock()
+
+    def _read(self, path: str) -> Optional[Dict[str, Any]]:
+        """读取变量文件，文件不存在时返回None"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return yaml.safe_load(f) or {}
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.logger.warning(f"读取{os.path.basename(path)}失败: {e}")
+            return {}
+
+    def _load(self) -> Dict[str, Any]:
+        """加载持久化文件中的变量（只执行一次）"""
+        if self._variables is None:
+            source = self.seed_path or self.file_path
+            self._variables = (self._read(source) if source else None) or {}
+        return self._variables
+
+    def snapshot(self) -> Dict[str, Any]:
+        """获取所有变量的副本"""
+        with self._lock:
+            return dict(self._load())
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """获取变量"""
+        with self._lock:
+            return self._load().get(name, default)
+
+    def update(self, variables: Dict[str, Any]):
+        """合并变量（新变量会覆盖旧变量）"""
+        if not variables:
+            return
+        with self._lock:
+            self._load().update(variables)
+            self._mark_dirty()
+
+    def delete(self, names: Iterable[str]):
+        """删除指定变量"""
+        with self._lock:
+            variables = self._load()
+            removed = False
+            for name in names:
+                if name in variables:
+                    del variables[name]
+                    removed = True
+            if removed:
+                self._mark_dirty()
+
+    def clear(self):
+        """清空内存中的变量并清空持久化文件"""
+        with self._lock:
+            self._cancel_timer()
+            self._variables = {}
+            self._dirty = False
+            if self.file_path:
+                try:
+                    with open(self.file_path, encoding='utf-8', mode='w') as f:
+                        f.truncate()
+                except Exception as e:
+                    self.logger.error(f"清空 {os.path.basename(self.file_path)} 失败: {e}")
+                    raise
+
+    def flush(self):
+        """将变量写回持久化文件（无变化时不写）"""
+        with self._lock:
+            self._cancel_timer()
+            if not self._dirty or not self.file_path:
+                return
+            temp_path = f"{self.file_path}.tmp"
+            try:
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    yaml.dump(self._variables, f, allow_unicode=True, default_flow_style=False)
+                os.replace(temp_path, self.file_path)
+                self._dirty = False
+            except Exception as e:
+                self.logger.error(f"保存变量到{os.path.basename(self.file_path)}失败: {e}")
+
+    def _mark_dirty(self):
+        """标记有未落盘的变更，并按需启动延迟落盘"""
+        self._dirty = True
+        if self.file_path and self.flush_delay and self._timer is None:
+            self._timer = threading.Timer(self.flush_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+
+class SharedVariableStore(VariableStore):
+    """
+    跨进程共享的变量存储（pytest-xdist 工作进程之间）
+
+    每次读写都在文件锁内完成：写入立即落盘，读取时文件有变化才重新解析。
+    """
+
+    def __init__(self, file_path: str, lock_path: Optional[str] = None):
+        """
+        :param file_path: 共享的持久化文件路径
+        :param lock_path: 锁文件路径，默认 <file_path>.lock
+        """
+        super().__init__(file_path)
+        self._file_lock = FileLock(lock_path or f"{file_path}.lock")
+        self._stamp = None
+
+    def _load(self) -> Dict[str, Any]:
+        """文件的修改时间或大小变化时重新读取（调用方持有文件锁）"""
+        try:
+            stat = os.stat(self.file_path)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            stamp = None
+        if self._variables is None or stamp != self._stamp:
+            self._variables = (self._read(self.file_path) if stamp else None) or {}
+            self._stamp = stamp
+        return self._variables
+
+    def _write(self):
+        temp_path = f"{self.file_path}.{worker_id() or os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            yaml.dump(self._variables, f, allow_unicode=True, default_flow_style=False)
+        os.replace(temp_path, self.file_path)
+        stat = os.stat(self.file_path)
+        self._stamp = (stat.st_mtime_ns, stat.st_size)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock, self._file_lock:
+            return dict(self._load())
+
+    def get(self, name: str, default: Any = None) -> Any:
+        with self._lock, self._file_lock:
+            return self._load().get(name, default)
+
+    def update(self, variables: Dict[str, Any]):
+        if not variables:
+            return
+        with self._lock, self._file_lock:
+            self._load().update(variables)
+            self._write()
+
+    def delete(self, names: Iterable[str]):
+        with self._lock, self._file_lock:
+            variables = self._load()
+            removed = False
+            for name in names:
+                if name in variables:
+                    del variables[name]
+                    removed = True
+            if removed:
+                self._write()
+
+    def clear(self):
+        with self._lock, self._file_lock:
+            self._variables = {}
+            self._write()
+
+    def flush(self):
+        """写入已在每次变更时完成"""
+
+
+def remove_worker_files():
+    """删除上次执行遗留的工作进程变量文件（主进程在会话开始时调用）"""
+    for path in worker_files(os.path.join(get_object_path(), 'extract.yml')):
+        os.remove(path)
+
+
+def _create_variable_store() -> VariableStore:
+    """
+    创建全局变量存储
+    - 普通执行：项目根目录的 extract.yml
+    - xdist 执行：每个工作进程以 extract.yml 为初始值，变量写回独立的 extract.<worker>.yml
+      （上次执行遗留的工作进程文件不会被读取，并由主进程在会话开始时删除）
+    - xdist 且 config.yml 中 extract.shared 为 true：所有工作进程通过文件锁共享 extract.yml
+    """
+    file_path = os.path.join(get_object_path(), 'extract.yml')
+    flush_delay = config.get('extract', 'flush_delay', default=0) or 0
+    if not worker_id():
+        return VariableStore(file_path, flush_delay=flush_delay)
+    if config.get('extract', 'shared', default=False):
+        return SharedVariableStore(file_path)
+    return VariableStore(worker_path(file_path), flush_delay=flush_delay, seed_path=file_path)
+
+
+# 全局变量存储实例（对应项目根目录的 extract.yml）
+variable_store = _create_variable_store()
+atexit.register(variable_store.flush)
@@ -1,5 +1,11 @@
 import pytest
 from common.base_api import TestExecutor as te
+from common.cassette import cassette
+from common.http_pool import http_pool
+from common.metrics import metrics
+from common.parallel import finish_run, run_once, start_run, worker_id
+from common.profiler import profiler
+from common.variable_store import remove_worker_files, variable_store
 import sys
 import io
 import pytest
@@ -25,13 +31,38 @@ def pytest_collection_modifyitems(items):
                         base = item.nodeid.split('[')[0]
                         item._nodeid = f"{base}[{name}]"
 
+def pytest_sessionstart(session):
+    """主进程（非 xdist 工作进程）在会话开始时生成执行标识、删除遗留的工作进程变量文件、清空录制文件"""
+    if not worker_id():
+        start_run()
+        remove_worker_files()
+        cassette.start_session()
+
+def pytest_sessionfinish(session, exitstatus):
+    """会话结束时将提取的变量写回 extract.yml，输出连接复用统计、接口时延统计和框架开销统计，主进程合并各工作进程的录制文件并删除本次执行的临时目录"""
+    variable_store.flush()
+    if not worker_id():
+        cassette.finish_session()
+        finish_run()
+    http_pool.log_stats()
+    metrics.write_summary()
+    profiler.write_summary()
+
 #银行间债券
 GZ = "20国开10"
 @pytest.fixture(scope="session")
 def ebd_token():
+    """ebond 登录 token，xdist 并行执行时整个执行只登录一次，各工作进程共享结果"""
     data = {'username': 'admin', 'password': 'GJqQ1c3wPgdBCQyG0QnZzA=='}
-    res = te().case('login.yml', 'ebond登录', data)
-    return res['response_data']['access_token']
+
+    def login():
+        res = te().case('login.yml', 'ebond登录', data)
+        return {'token': res['response_data']['access_token'], 'variables': res['extracted_variables']}
+
+    shared = run_once('ebd_token', login)
+    # 未执行登录的工作进程同样需要 token_type/access_token 等提取变量
+    variable_store.update(shared['variables'])
+    return shared['token']
 
 def hentai_token():
     data = {'username': '17375770915', 'password': 'GJqQ1c3wPgdBCQyG0QnZzA=='}
@@ -17,6 +17,30 @@ def pytest_addoption(parser):
         default="test",
         help="测试环境: dev/test/prod"
     )
+    parser.addoption(
+        "--engine",
+        action="store",
+        default=None,
+        help="请求执行引擎: sync/async（默认读取config.yml）"
+    )
+    parser.addoption(
+        "--profile",
+        action="store",
+        default=None,
+        help="框架开销分析: off/phases/cprofile/pyinstrument（默认读取config.yml）"
+    )
+    parser.addoption(
+        "--cassette",
+        action="store",
+        default=None,
+        help="HTTP录制回放: off/record/replay（默认读取config.yml）"
+    )
+    parser.addoption(
+        "--csv-shard",
+        action="store",
+        default=None,
+        help="CSV流式数据源分片: 分片序号/分片总数，如 0/4（默认读取config.yml）"
+    )
 
 
 def pytest_configure(config):
@@ -36,6 +60,18 @@ def pytest_configure(config):
     # 设置环境变量
     env = config.getoption("--env")
     os.environ["TEST_ENV"] = env
+    engine = config.getoption("--engine")
+    if engine:
+        os.environ["TEST_ENGINE"] = engine
+    profile = config.getoption("--profile")
+    if profile:
+        os.environ["TEST_PROFILE"] = profile
+    cassette = config.getoption("--cassette")
+    if cassette:
+        os.environ["TEST_CASSETTE"] = cassette
+    csv_shard = config.getoption("--csv-shard")
+    if csv_shard:
+        os.environ["TEST_CSV_SHARD"] = csv_shard
 
     # 动态添加pytest选项
     config.option.alluredir = allure_dir
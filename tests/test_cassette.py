@@ -0,0 +1,110 @@
+import json
+from datetime import timedelta
+
+import pytest
+from requests.models import Response
+
+from common import parallel
+from common.cassette import REDACTED, Cassette, CassetteError, body_hash, request_key
+from utils.jsonpath_utils import compile_path
+
+TOKEN = 'eyJhbGciOiJIUzI1NiJ9.token-value'
+
+
+def _response(url, body, cookies=None):
+    response = Response()
+    response.status_code = 200
+    response.url = url
+    response.encoding = 'utf-8'
+    response.elapsed = timedelta(milliseconds=5)
+    response.headers['Content-Type'] = 'application/json'
+    for name, value in (cookies or {}).items():
+        response.cookies.set(name, value)
+    response._content = json.dumps(body).encode('utf-8')
+    return response
+
+
+def _login():
+    return {'method': 'POST', 'url': 'http://api.test/login', 'json': {'username': 'admin', 'password': 'p@ss'}}
+
+
+def _authorised(token):
+    """登录后的请求：token 出现在请求头、未列入脱敏列表的查询参数和请求体字段中"""
+    return {'method': 'POST', 'url': f'http://api.test/orders?sign={token}&page=1',
+            'headers': {'Authorization': f'Bearer {token}'},
+            'json': {'session': token, 'filter': {'code': '20国开10'}}}
+
+
+def _flow(cassette, send):
+    """登录 -> 从响应中提取 token -> 携带 token 查询，返回查询结果"""
+    login = send(_login(), {'data': {'access_token': TOKEN, 'user': 'admin'}})
+    token = compile_path('$.data.access_token').evaluate(login.json())
+    orders = send(_authorised(token), {'data': [{'id': 1}]})
+    return token, orders.json()
+
+
+class TestCassette:
+
+    def test_record_then_replay_login_flow(self, tmp_path):
+        path = str(tmp_path / 'cassette.jsonl')
+        recorder = Cassette(path)
+
+        def record(kwargs, body):
+            response = _response(kwargs['url'], body)
+            recorder.record(kwargs, response)
+            return response
+
+        assert _flow(recorder, record) == (TOKEN, {'data': [{'id': 1}]})
+        recorder.close()
+        text = open(path, encoding='utf-8').read()
+        assert TOKEN not in text and 'p@ss' not in text
+
+        player = Cassette(path)
+        token, orders = _flow(player, lambda kwargs, body: player.replay(kwargs))
+        assert token == REDACTED
+        assert orders == {'data': [{'id': 1}]}
+
+    def test_replay_unknown_request(self, tmp_path):
+        path = tmp_path / 'cassette.jsonl'
+        path.write_text('', encoding='utf-8')
+        with pytest.raises(CassetteError):
+            Cassette(str(path)).replay(_authorised('other'))
+
+    def test_secrets_shared_between_workers(self, tmp_path, monkeypatch):
+        """xdist: 一个工作进程登录（run_once），另一个工作进程使用 token"""
+        monkeypatch.setenv('TEST_RUN_ID', f'cassette-{tmp_path.name}')
+        monkeypatch.setenv('TEST_CASSETTE', 'record')
+        path = str(tmp_path / 'cassette.jsonl')
+        try:
+            monkeypatch.setenv('PYTEST_XDIST_WORKER', 'gw0')
+            gw0 = Cassette(path)
+            gw0.record(_login(), _response('http://api.test/login', {'data': {'access_token': TOKEN}}))
+            gw0.close()
+            monkeypatch.setenv('PYTEST_XDIST_WORKER', 'gw1')
+            gw1 = Cassette(path)
+            gw1.record(_authorised(TOKEN), _response('http://api.test/orders', {'data': []}))
+            gw1.close()
+            monkeypatch.delenv('PYTEST_XDIST_WORKER')
+            Cassette(path).finish_session()
+        finally:
+            parallel.finish_run()
+
+        player = Cassette(path)
+        assert player.replay(_authorised(REDACTED)).json() == {'data': []}
+
+    def test_body_hash_redacts_fields(self):
+        redact = {'password'}
+        assert body_hash({'user': 'a', 'password': 'x'}, redact=redact) == \
+            body_hash({'user': 'a', 'password': 'y'}, redact=redact)
+        assert body_hash({'user': 'a'}) != body_hash({'user': 'b'})
+        # JSON 字符串请求体与 json= 请求体一致
+        assert body_hash(None, '{"password": "x", "user": "a"}', redact) == \
+            body_hash({'user': 'a', 'password': 'z'}, redact=redact)
+        assert body_hash(None, {'password': 'x'}, redact) == body_hash(None, {'password': 'y'}, redact)
+        assert body_hash(None, b'\xff\x00') == body_hash(None, b'\xff\x00')
+
+    def test_request_key_normalises_url(self):
+        key = request_key({'method': 'get', 'url': 'HTTP://Api.Test:80/a?b=2&a=1#x'})
+        assert key == request_key({'method': 'GET', 'url': 'http://api.test/a', 'params': {'a': '1', 'b': '2'}})
+        assert request_key({'method': 'GET', 'url': 'http://h/a?token=1'}, {'token'}) == \
+            request_key({'method': 'GET', 'url': 'http://h/a?token=2'}, {'token'})
@@ -0,0 +1,228 @@
+import os
+import pickle
+
+import pytest
+
+import common.csv_decorator as csv_decorator
+from common.csv_decorator import COLUMN_TYPES, CsvBatch, CsvCache, CsvSchema, csv_shard, csv_stream
+
+
+def _write(path, text, mtime_ns=None):
+    """写入文件并设置修改时间，避免文件系统时间精度不足导致修改前后 mtime 相同"""
+    path.write_text(text, encoding='utf-8')
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+    return str(path)
+
+
+_MTIME = 1_700_000_000_000_000_000
+
+
+class TestCsvCache:
+
+    def test_reloads_when_file_changes(self, tmp_path):
+        path = _write(tmp_path / 'login.csv', 'name,code\ncase1,1\n', _MTIME)
+        cache = CsvCache()
+        cases, first_column = cache.load(path)
+        assert first_column == 'name'
+        assert [case['code'] for case in cases] == [1]
+
+        # 大小不变、修改时间变化
+        _write(tmp_path / 'login.csv', 'name,code\ncase1,2\n', _MTIME + 1)
+        assert [case['code'] for case in cache.load(path)[0]] == [2]
+        # 修改时间不变、大小变化
+        _write(tmp_path / 'login.csv', 'name,code\ncase1,2\ncase2,3\n', _MTIME + 1)
+        assert [case['code'] for case in cache.load(path)[0]] == [2, 3]
+
+    def test_unchanged_file_parsed_once(self, tmp_path, monkeypatch):
+        path = _write(tmp_path / 'login.csv', 'name,code\ncase1,1\n')
+        calls = []
+        read = csv_decorator._read_csv_file
+        monkeypatch.setattr(csv_decorator, '_read_csv_file', lambda p: calls.append(p) or read(p))
+        cache = CsvCache()
+        cache.load(path)
+        cache.load(path)
+        assert len(calls) == 1
+
+    def test_returns_row_copies(self, tmp_path):
+        path = _write(tmp_path / 'login.csv', 'name,code\ncase1,1\n')
+        cache = CsvCache()
+        cache.load(path)[0][0]['code'] = 'changed'
+        assert cache.load(path)[0][0]['code'] == 1
+
+    def test_disk_cache_shared_between_processes(self, tmp_path, monkeypatch):
+        path = _write(tmp_path / 'login.csv', 'name,code\ncase1,1\n', _MTIME)
+        cache_dir = str(tmp_path / 'cache')
+        expected = CsvCache(cache_dir).load(path)
+
+        def fail(p):
+            raise AssertionError('应读取磁盘缓存')
+
+        # 新的缓存实例（相当于新的 pytest 进程）直接读取 pickle
+        monkeypatch.setattr(csv_decorator, '_read_csv_file', fail)
+        assert CsvCache(cache_dir).load(path) == expected
+        monkeypatch.undo()
+
+        # 文件变化后磁盘缓存失效
+        _write(tmp_path / 'login.csv', 'name,code\ncase1,9\n', _MTIME + 1)
+        assert CsvCache(cache_dir).load(path)[0][0]['code'] == 9
+
+    def test_corrupt_disk_cache_ignored(self, tmp_path):
+        path = _write(tmp_path / 'login.csv', 'name,code\ncase1,1\n')
+        cache = CsvCache(str(tmp_path / 'cache'))
+        cache.load(path)
+        with open(cache._disk_path(os.path.abspath(path)), 'wb') as f:
+            f.write(pickle.dumps({'format': CsvCache.VERSION})[:5])
+        assert CsvCache(str(tmp_path / 'cache')).load(path)[0][0]['code'] == 1
+
+    def test_missing_file(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            CsvCache().load(str(tmp_path / 'missing.csv'))
+
+
+def _rows_file(tmp_path, count):
+    lines = ['name,value'] + [f"row{i},{i}" for i in range(count)]
+    return _write(tmp_path / 'rows.csv', '\n'.join(lines) + '\n')
+
+
+class TestCsvShard:
+
+    @pytest.mark.parametrize('value, expected', [('0/1', (0, 1)), ('2/4', (2, 4)), (' 3 / 4 ', (3, 4))])
+    def test_parse(self, monkeypatch, value, expected):
+        monkeypatch.setenv('TEST_CSV_SHARD', value)
+        assert csv_shard() == expected
+
+    @pytest.mark.parametrize('value', ['4/4', '-1/2', '0/0', '1', 'a/b'])
+    def test_invalid(self, monkeypatch, value):
+        monkeypatch.setenv('TEST_CSV_SHARD', value)
+        with pytest.raises(ValueError, match='CSV 分片'):
+            csv_shard()
+
+    @pytest.mark.parametrize('shards, batches', [(1, 1), (3, 1), (4, 3), (5, 8)])
+    def test_shards_and_batches_partition_rows(self, tmp_path, shards, batches):
+        path = _rows_file(tmp_path, 37)
+        seen = []
+        for shard in range(shards):
+            shard_rows = []
+            for batch in range(batches):
+                rows = [row['_csv_row'] for row in CsvBatch(path, batch, batches, (shard, shards))]
+                shard_rows.extend(rows)
+            # 每个分片得到的行与分片规则一致
+            assert all((row - 1) % shards == shard for row in shard_rows)
+            seen.extend(shard_rows)
+        assert sorted(seen) == list(range(1, 38))
+
+    def test_batch_is_stable(self, tmp_path):
+        path = _rows_file(tmp_path, 10)
+        batch = CsvBatch(path, 1, 3, (0, 2))
+        assert list(batch) == list(batch)
+        assert [row['name'] for row in batch] == ['row2', 'row8']
+
+
+class TestCsvBatch:
+
+    def test_each_aggregates_failures(self, tmp_path):
+        path = _rows_file(tmp_path, 6)
+        executed = []
+
+        def check(row):
+            executed.append(row['value'])
+            assert row['value'] % 2 == 0, f"奇数 {row['value']}"
+
+        with pytest.raises(AssertionError) as error:
+            CsvBatch(path, 0, 1).each(check)
+        assert executed == [0, 1, 2, 3, 4, 5]
+        message = str(error.value)
+        assert '执行 6 行，失败 3 行' in message
+        assert '第2行 row1: 奇数 1' in message
+
+    def test_each_stops_at_max_failures(self, tmp_path):
+        path = _rows_file(tmp_path, 6)
+        executed = []
+
+        def fail(row):
+            executed.append(row['value'])
+            raise ValueError('x')
+
+        with pytest.raises(AssertionError, match='失败 2 行'):
+            CsvBatch(path, 0, 1).each(fail, max_failures=2)
+        assert executed == [0, 1]
+        assert CsvBatch(path, 0, 2).each(lambda row: None) == 3
+
+    def test_csv_stream_parametrizes_batches(self, tmp_path, monkeypatch):
+        monkeypatch.setenv('TEST_CSV_SHARD', '1/2')
+        path = _rows_file(tmp_path, 4)
+
+        @csv_stream(path, batches=3)
+        def test_rows(rows):
+            pass
+
+        mark = test_rows.pytestmark[0]
+        assert mark.kwargs['ids'] == ['batch_1of3', 'batch_2of3', 'batch_3of3']
+        assert [(batch.batch, batch.batches, batch.shard) for batch in mark.kwargs['argvalues']] == \
+            [(0, 3, (1, 2)), (1, 3, (1, 2)), (2, 3, (1, 2))]
+
+
+class TestCsvSchema:
+
+    def test_header_types(self, tmp_path):
+        path = _write(tmp_path / 'bond.csv',
+                      'name,code:str,price:float,count:int,active:bool,extra:json,ratio:x,auto\n'
+                      'case1,00401,1,2,yes,"{""a"": 1}",3,4.5\n'
+                      ',,,,,,,\n')
+        cases, first_column = CsvCache().load(path)
+        assert first_column == 'name'
+        row = {key: value for key, value in cases[0].items() if not key.startswith('_')}
+        # 冒号后不是已知类型时整体作为列名
+        assert row == {'name': 'case1', 'code': '00401', 'price': 1.0, 'count': 2, 'active': True,
+                       'extra': {'a': 1}, 'ratio:x': 3, 'auto': 4.5}
+        assert cases[1]['name'] == 'test_case_2'
+        assert cases[1]['code'] is None and cases[1]['count'] is None
+
+    def test_auto_inference(self):
+        schema = CsvSchema(['name', 'value'])
+        values = ['1', '-2', '1.5', '.5', '1e3', '00401', 'true', 'NULL', 'abc', '1_000', '1.2.3']
+        assert [schema.convert(['n', value], 0, 'f.csv')['value'] for value in values] == \
+            [1, -2, 1.5, 0.5, '1e3', 401, True, None, 'abc', 1000, '1.2.3']
+
+    def test_conversion_error_names_column(self, tmp_path):
+        path = _write(tmp_path / 'bond.csv', 'name,count:int\ncase1,1\ncase2,abc\n')
+        with pytest.raises(ValueError, match=r'bond\.csv 第2行 列 count 转换失败'):
+            CsvCache().load(path)
+        path = _write(tmp_path / 'flag.csv', 'name,active:bool\ncase1,maybe\n')
+        with pytest.raises(ValueError, match='列 active'):
+            CsvCache().load(path)
+
+    def test_schema_file(self, tmp_path):
+        path = _write(tmp_path / 'bond.csv', 'name,code:int,price\ncase1,00401,1\n', _MTIME)
+        cache = CsvCache()
+        assert cache.load(path)[0][0]['code'] == 401
+
+        # 新增 schema 文件后重新解析，schema 优先于表头注解
+        schema = _write(tmp_path / 'bond.schema.yml', 'code: str\nprice: float\n', _MTIME)
+        row = cache.load(path)[0][0]
+        assert (row['code'], row['price']) == ('00401', 1.0)
+
+        # 只修改 schema 文件也会重新解析
+        _write(tmp_path / 'bond.schema.yml', 'code: str\nprice: str\n', _MTIME + 1)
+        assert cache.load(path)[0][0]['price'] == '1'
+
+        # 删除 schema 文件后恢复表头注解
+        os.remove(schema)
+        assert cache.load(path)[0][0]['code'] == 401
+
+    def test_schema_errors(self, tmp_path):
+        path = _write(tmp_path / 'bond.csv', 'name,code\ncase1,1\n')
+        _write(tmp_path / 'bond.schema.yml', 'missing: str\n')
+        with pytest.raises(ValueError, match='missing'):
+            CsvCache().load(path)
+        _write(tmp_path / 'bond.schema.yml', 'code: decimal\n')
+        with pytest.raises(ValueError, match='code 的类型不支持: decimal'):
+            CsvCache().load(path)
+        _write(tmp_path / 'bond.schema.yml', '- code\n')
+        with pytest.raises(ValueError, match='schema 文件格式错误'):
+            CsvCache().load(path)
+
+    def test_custom_type(self, monkeypatch):
+        monkeypatch.setitem(COLUMN_TYPES, 'upper', str.upper)
+        assert CsvSchema(['name', 'code:upper']).convert(['n', 'ab'], 0, 'f.csv')['code'] == 'AB'
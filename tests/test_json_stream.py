@@ -0,0 +1,99 @@
+import json
+import random
+
+import pytest
+
+from utils.json_stream import JsonStreamParser, build_path_tree, parse_paths
+from utils.jsonpath_utils import compile_path
+
+_KEYS = ['a', 'b', 'code', 'data', '0', '1', '名称', 'x y']
+_STRINGS = ['', 'text', '中文', 'quote"', 'back\\slash', 'é\U0001f600', ',:]}', '\n\t']
+_NUMBERS = [0, -1, 7, 2500, -2500.5, 1e-7, 3.14159, 12345678901234567890]
+
+
+def _random_value(rng: random.Random, depth: int):
+    kind = rng.random()
+    if depth <= 0 or kind < 0.35:
+        return rng.choice(_STRINGS + _NUMBERS + [True, False, None])
+    if kind < 0.7:
+        return {key: _random_value(rng, depth - 1) for key in rng.sample(_KEYS, rng.randint(0, 5))}
+    return [_random_value(rng, depth - 1) for _ in range(rng.randint(0, 5))]
+
+
+def _random_path(rng: random.Random, data) -> str:
+    """沿文档结构随机生成路径，偶尔加入不存在的键、负数下标、通配和键作用于列表"""
+    parts = []
+    current = data
+    for _ in range(rng.randint(1, 4)):
+        roll = rng.random()
+        if roll < 0.08:
+            parts.append('[*]')
+            break
+        if isinstance(current, dict) and current and roll < 0.85:
+            key = rng.choice(list(current))
+            parts.append(f"['{key}']" if not key.isidentifier() and not key.isdigit() else f".{key}")
+            current = current[key]
+        elif isinstance(current, list) and current and roll < 0.85:
+            index = rng.randrange(len(current))
+            parts.append(f"[{index - len(current) if rng.random() < 0.15 else index}]")
+            current = current[index]
+        else:
+            parts.append(f".{rng.choice(_KEYS)}" if rng.random() < 0.7 else f"[{rng.randint(0, 6)}]")
+            break
+    return ''.join(parts).lstrip('.')
+
+
+def _chunks(raw: bytes, size: int):
+    return [raw[i:i + size] for i in range(0, len(raw), size)]
+
+
+class TestJsonStreamParser:
+
+    @pytest.mark.parametrize('seed', range(20))
+    def test_matches_full_parse(self, seed):
+        """与 json.loads + CompiledPath 的结果一致（随机文档、路径与分块大小）"""
+        rng = random.Random(seed)
+        for _ in range(100):
+            document = _random_value(rng, 4)
+            raw = json.dumps(document, ensure_ascii=rng.random() < 0.5,
+                             indent=rng.choice([None, 2])).encode('utf-8')
+            paths = [_random_path(rng, document) for _ in range(rng.randint(1, 3))]
+            size = rng.choice([1, 2, 3, 7, 64, 65536])
+            partial = parse_paths(_chunks(raw, size), paths)
+            for path in paths:
+                compiled = compile_path(path)
+                for first_match in (False, True):
+                    assert compiled.evaluate(partial, first_match) == compiled.evaluate(document, first_match), \
+                        (raw, paths, path, size)
+
+    def test_number_split_across_chunks(self):
+        raw = b'{"a": [1, -2500.75, 3], "b": 1e10}'
+        for size in range(1, len(raw)):
+            assert parse_paths(_chunks(raw, size), ['a[1]', 'b']) == {'a': [None, -2500.75], 'b': 1e10}
+
+    def test_multibyte_character_split_across_chunks(self):
+        raw = json.dumps({'名称': '中文值', 'x': 1}, ensure_ascii=False).encode('utf-8')
+        for size in range(1, 6):
+            assert parse_paths(_chunks(raw, size), ['名称']) == {'名称': '中文值'}
+
+    def test_stops_reading_when_paths_resolved(self):
+        raw = json.dumps({'code': 0, 'data': list(range(10000))}).encode('utf-8')
+        chunks = iter(_chunks(raw, 16))
+        parser = JsonStreamParser(chunks)
+        assert parser.parse(build_path_tree(['code'])) == {'code': 0}
+        assert parser.consumed < 64
+        assert next(chunks, None) is not None
+
+    def test_utf8_bom(self):
+        assert parse_paths([b'\xef\xbb\xbf{"a": 1}'], ['a']) == {'a': 1}
+
+    def test_root_path_parses_whole_document(self):
+        assert build_path_tree(['$']) is None
+        assert parse_paths([b'[1, 2]'], ['$']) == [1, 2]
+
+    def test_empty_paths_do_not_read_body(self):
+        assert parse_paths(iter(()), []) is None
+
+    def test_invalid_document_raises(self):
+        with pytest.raises(json.JSONDecodeError):
+            parse_paths([b'{"a": '], ['a'])
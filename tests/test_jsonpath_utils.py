@@ -0,0 +1,71 @@
+import pytest
+
+from utils.jsonpath_utils import INDEX, KEY, WILDCARD, compile_path
+
+DATA = {
+    'code': 0,
+    'data': {
+        'content': [
+            {'id': 1, 'bondCode': '000001', 'tags': ['a', 'b']},
+            {'id': 2, 'bondCode': '000002'},
+            {'id': 3},
+        ],
+        'total': 3,
+        'x y': 'spaced',
+    },
+    'items': [[1, 2], [3, 4]],
+}
+
+
+class TestCompilePath:
+
+    @pytest.mark.parametrize('path, expected', [
+        ('code', 0),
+        ('$.code', 0),
+        ('.data.total', 3),
+        ("data['x y']", 'spaced'),
+        ('data["total"]', 3),
+        ('data[total]', 3),
+        ('data.content[0].bondCode', '000001'),
+        ('data.content[-1].id', 3),
+        ('data.content.0.id', 1),
+        ('data.content[0].tags[1]', 'b'),
+        ('items[1][0]', 3),
+        ('data.missing', None),
+        ('data.content[5]', None),
+        ('data.content[-4]', None),
+        ('code.sub', None),
+        ('code[0]', None),
+    ])
+    def test_evaluate(self, path, expected):
+        assert compile_path(path).evaluate(DATA) == expected
+
+    def test_key_on_list_collects_all_matches(self):
+        assert compile_path('data.content.bondCode').evaluate(DATA) == ['000001', '000002']
+        assert compile_path("data.content['id']").evaluate(DATA) == [1, 2, 3]
+        assert compile_path('data.content.missing').evaluate(DATA) is None
+
+    def test_key_on_list_single_match_is_unwrapped(self):
+        assert compile_path('data.content.tags').evaluate(DATA) == ['a', 'b']
+
+    def test_key_on_list_first_match(self):
+        assert compile_path('data.content.bondCode').evaluate(DATA, first_match=True) == '000001'
+
+    def test_wildcard(self):
+        assert compile_path('data.content[*].id').evaluate(DATA) == [1, 2, 3]
+        assert compile_path('data.*').evaluate({'data': {'a': 1, 'b': 2}}) == [1, 2]
+
+    def test_root_path(self):
+        assert compile_path('$').evaluate(DATA) is DATA
+        assert compile_path('').evaluate(DATA) is DATA
+
+    def test_steps(self):
+        assert compile_path("$.data[0]['k'].1[*]").steps == (
+            (KEY, 'data', None), (INDEX, 0, None), (KEY, 'k', None), (KEY, '1', 1), (WILDCARD, None, None))
+
+    def test_compiled_once(self):
+        assert compile_path('data.content[0].id') is compile_path('data.content[0].id')
+
+    def test_unclosed_bracket(self):
+        with pytest.raises(ValueError):
+            compile_path('data[0')
@@ -0,0 +1,53 @@
+import common.load_test as load_test
+from common.load_test import LoadRunner, percentile
+
+
+class _Executor:
+    """记录创建次数的执行器，每个用例耗时固定"""
+
+    created = []
+
+    def __init__(self, store):
+        self.store = store
+        self.steps = []
+        self.closed = False
+        self.request_api = self
+        self.response_api = self
+        self.last_result = None
+        _Executor.created.append(self)
+
+    def case(self, path, case_name, data=None):
+        self.steps.append(case_name)
+        if case_name == 'fail':
+            raise ConnectionError('refused')
+        self.last_result = {'response_time': 0.01, 'validation_results': []}
+        return self.last_result
+
+    def close(self):
+        self.closed = True
+
+
+class TestLoadRunner:
+
+    def test_one_executor_per_virtual_user(self, monkeypatch):
+        _Executor.created = []
+        monkeypatch.setattr(load_test, 'TestExecutor', _Executor)
+        summary = LoadRunner([('a.yml', 'login'), ('a.yml', 'query')], concurrency=2, duration=0.2, rps=50).run()
+        assert len(_Executor.created) == 2
+        assert all(executor.closed for executor in _Executor.created)
+        assert all(executor.steps[:2] == ['login', 'query'] for executor in _Executor.created)
+        assert summary['total']['requests'] == sum(len(executor.steps) for executor in _Executor.created)
+
+    def test_failed_step_does_not_reuse_previous_latency(self, monkeypatch):
+        _Executor.created = []
+        monkeypatch.setattr(load_test, 'TestExecutor', _Executor)
+        summary = LoadRunner([('a.yml', 'ok'), ('a.yml', 'fail')], concurrency=1, duration=0.1, rps=40).run()
+        step = summary['steps']['a.yml::fail']
+        assert step['errors'] == step['requests'] > 0
+        assert step['error_breakdown'] == {'ConnectionError': step['requests']}
+        assert step['max'] == 0.0
+
+    def test_percentile(self):
+        assert percentile([], 50) == 0.0
+        assert percentile([1, 2, 3, 4], 50) == 2
+        assert percentile([1, 2, 3, 4], 99) == 4
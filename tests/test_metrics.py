@@ -0,0 +1,46 @@
+import csv
+import json
+
+from common.metrics import LatencyHistogram, MetricsCollector, path_template
+
+
+class TestMetricsCollector:
+
+    def test_path_template(self):
+        assert path_template('/api/order/123?x=1') == '/api/order/{id}'
+        assert path_template('/api/user/0f8fad5b-d9cb-469f-a165-70867728950e/info') == '/api/user/{id}/info'
+        assert path_template('') == '/'
+
+    def test_histogram_percentiles(self):
+        histogram = LatencyHistogram()
+        for ms in range(1, 101):
+            histogram.record(ms / 1000)
+        assert histogram.count == 100
+        assert abs(histogram.percentile(50) - 0.050) <= 0.050 / 64
+        assert histogram.percentile(100) == histogram.max / 1_000_000 == 0.1
+
+    def test_csv_keeps_fully_failing_endpoints(self, tmp_path):
+        collector = MetricsCollector(output_dir=str(tmp_path))
+        collector.record('get', '/api/ok/1', 0.2, ttfb=0.1)
+        collector.record_error('GET', '/api/ok/2')
+        collector.record_error('POST', '/api/down')
+        collector.record_error('POST', '/api/down')
+        collector.write_summary()
+
+        with open(tmp_path / 'metrics.csv', encoding='utf-8') as f:
+            rows = {(row['method'], row['path'], row['phase']): row for row in csv.DictReader(f)}
+        assert rows[('GET', '/api/ok/{id}', 'total')]['errors'] == '1'
+        assert rows[('GET', '/api/ok/{id}', 'total')]['count'] == '1'
+        assert rows[('GET', '/api/ok/{id}', 'download')]['p50'] != ''
+        down = rows[('POST', '/api/down', 'total')]
+        assert (down['errors'], down['count'], down['p50'], down['max']) == ('2', '0', '', '')
+
+        with open(tmp_path / 'metrics.json', encoding='utf-8') as f:
+            summary = {(row['method'], row['path']): row for row in json.load(f)}
+        assert summary[('POST', '/api/down')] == {'method': 'POST', 'path': '/api/down', 'errors': 2, 'phases': {}}
+
+    def test_disabled(self, tmp_path):
+        collector = MetricsCollector(enabled=False, output_dir=str(tmp_path))
+        collector.record('GET', '/', 0.1)
+        collector.record_error('GET', '/')
+        assert collector.write_summary() is None
@@ -0,0 +1,33 @@
+import socket
+
+import pytest
+import requests
+
+from common.mock_server import MockRoute, MockServer
+
+
+class TestMockServer:
+
+    def test_serves_routes(self):
+        route = MockRoute('GET', '/api/order/${id}', body={'code': 0, 'id': '${id}'})
+        with MockServer(port=0, routes=[route]) as server:
+            response = requests.get(f"{server.url}/api/order/7")
+            assert response.status_code == 200
+            assert response.json()['code'] == 0
+            assert requests.get(f"{server.url}/missing").status_code == 404
+
+    def test_start_fails_when_port_in_use(self):
+        with socket.socket() as occupied:
+            occupied.bind(('127.0.0.1', 0))
+            occupied.listen()
+            port = occupied.getsockname()[1]
+            server = MockServer(port=port, routes=[])
+            with pytest.raises(OSError):
+                server.start()
+            # 启动失败后可以安全停止，端口释放后可以重新启动
+            server.stop()
+        server.start()
+        try:
+            assert server.port == port
+        finally:
+            server.stop()
@@ -0,0 +1,161 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+import yaml
+
+import common.variable_store as variable_store_module
+from common import parallel
+from common.parallel import FileLock, run_once, worker_files, worker_path
+from common.variable_store import VariableStore, remove_worker_files
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 子进程：以指定工作进程身份调用 run_once，func 记录调用次数并返回结果
+_RUN_ONCE = '''
+import json, sys, time
+from common.parallel import run_once
+
+def login():
+    with open(sys.argv[2], 'a') as f:
+        f.write(sys.argv[3] + '\\n')
+    time.sleep(0.5)
+    return {'token': 'abc', 'by': sys.argv[3]}
+
+print(json.dumps(run_once('ebd_token', login, directory=sys.argv[1])))
+'''
+
+_ACQUIRE = '''
+import sys
+from common.parallel import FileLock
+try:
+    with FileLock(sys.argv[1], timeout=0.2):
+        print('acquired')
+except TimeoutError:
+    print('timeout')
+'''
+
+
+def _python(code, *args, worker=None):
+    env = dict(os.environ)
+    env.pop('PYTEST_XDIST_WORKER', None)
+    if worker:
+        env['PYTEST_XDIST_WORKER'] = worker
+    return subprocess.Popen([sys.executable, '-c', code, *args], cwd=ROOT, env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+
+class TestFileLock:
+
+    def test_reentrant(self, tmp_path):
+        lock = FileLock(str(tmp_path / 'x.lock'))
+        with lock:
+            with lock:
+                assert lock._fd is not None
+            assert lock._fd is not None
+        assert lock._fd is None
+        # 释放后可以再次获取
+        with lock:
+            pass
+
+    def test_excludes_other_processes(self, tmp_path):
+        path = str(tmp_path / 'x.lock')
+        with FileLock(path):
+            assert _python(_ACQUIRE, path).communicate(timeout=30)[0].strip() == 'timeout'
+        assert _python(_ACQUIRE, path).communicate(timeout=30)[0].strip() == 'acquired'
+
+    def test_excludes_other_threads(self, tmp_path):
+        lock = FileLock(str(tmp_path / 'x.lock'))
+        order = []
+        with lock:
+            thread = threading.Thread(target=lambda: lock.acquire() or order.append('thread') or lock.release())
+            thread.start()
+            thread.join(0.2)
+            order.append('main')
+        thread.join(5)
+        assert order == ['main', 'thread']
+
+
+class TestRunOnce:
+
+    def test_runs_once_across_processes(self, tmp_path):
+        directory, calls = str(tmp_path / 'run'), str(tmp_path / 'calls.txt')
+        processes = [_python(_RUN_ONCE, directory, calls, worker, worker=worker) for worker in ('gw0', 'gw1')]
+        results = []
+        for process in processes:
+            out, err = process.communicate(timeout=60)
+            assert process.returncode == 0, err
+            results.append(json.loads(out))
+        with open(calls) as f:
+            called = f.read().split()
+        assert len(called) == 1
+        assert results[0] == results[1] == {'token': 'abc', 'by': called[0]}
+        with open(os.path.join(directory, 'ebd_token.json'), encoding='utf-8') as f:
+            assert json.load(f) == results[0]
+        if os.name == 'posix':
+            assert os.stat(directory).st_mode & 0o777 == 0o700
+
+    def test_without_xdist_calls_directly(self, tmp_path, monkeypatch):
+        monkeypatch.delenv('PYTEST_XDIST_WORKER', raising=False)
+        calls = []
+        assert run_once('key', lambda: calls.append(1) or len(calls), str(tmp_path)) == 1
+        assert run_once('key', lambda: calls.append(1) or len(calls), str(tmp_path)) == 2
+        assert os.listdir(tmp_path) == []
+
+    def test_failure_not_cached(self, tmp_path, monkeypatch):
+        monkeypatch.setenv('PYTEST_XDIST_WORKER', 'gw0')
+
+        def fail():
+            raise RuntimeError('login failed')
+
+        with pytest.raises(RuntimeError):
+            run_once('key', fail, str(tmp_path))
+        assert run_once('key', lambda: 'ok', str(tmp_path)) == 'ok'
+
+    def test_finish_run_removes_run_dir(self, monkeypatch):
+        monkeypatch.setenv('TEST_RUN_ID', 'test-finish-run')
+        monkeypatch.setenv('PYTEST_XDIST_WORKER', 'gw0')
+        run_once('key', lambda: 'token')
+        assert os.path.exists(parallel.run_dir())
+        parallel.finish_run()
+        assert not os.path.exists(parallel.run_dir())
+
+
+class TestWorkerFiles:
+
+    def test_worker_path(self, monkeypatch):
+        monkeypatch.delenv('PYTEST_XDIST_WORKER', raising=False)
+        assert worker_path('/p/extract.yml') == '/p/extract.yml'
+        monkeypatch.setenv('PYTEST_XDIST_WORKER', 'gw3')
+        assert worker_path('/p/extract.yml') == '/p/extract.gw3.yml'
+        assert worker_path('/p/cassette.jsonl') == '/p/cassette.gw3.jsonl'
+
+    def test_remove_worker_files(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(variable_store_module, 'get_object_path', lambda: str(tmp_path))
+        names = ['extract.yml', 'extract.gw0.yml', 'extract.gw12.yml', 'extract.gw2.yml', 'extract.gwx.yml',
+                 'extract.yml.lock', 'other.gw0.yml']
+        for name in names:
+            (tmp_path / name).write_text('', encoding='utf-8')
+        assert [os.path.basename(path) for path in worker_files(str(tmp_path / 'extract.yml'))] == \
+            ['extract.gw0.yml', 'extract.gw2.yml', 'extract.gw12.yml']
+        remove_worker_files()
+        assert sorted(os.listdir(tmp_path)) == ['extract.gwx.yml', 'extract.yml', 'extract.yml.lock', 'other.gw0.yml']
+
+    def test_worker_store_seeds_from_extract_yml(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(variable_store_module, 'get_object_path', lambda: str(tmp_path))
+        monkeypatch.setenv('PYTEST_XDIST_WORKER', 'gw1')
+        (tmp_path / 'extract.yml').write_text(yaml.dump({'token': 'seed'}), encoding='utf-8')
+        # 上次执行遗留的工作进程文件不被读取
+        (tmp_path / 'extract.gw1.yml').write_text(yaml.dump({'token': 'stale', 'old': 1}), encoding='utf-8')
+        store = variable_store_module._create_variable_store()
+        assert isinstance(store, VariableStore)
+        assert store.snapshot() == {'token': 'seed'}
+        store.update({'id': 5})
+        store.flush()
+        with open(tmp_path / 'extract.gw1.yml', encoding='utf-8') as f:
+            assert yaml.safe_load(f) == {'token': 'seed', 'id': 5}
+        with open(tmp_path / 'extract.yml', encoding='utf-8') as f:
+            assert yaml.safe_load(f) == {'token': 'seed'}
@@ -0,0 +1,86 @@
+import pytest
+
+import common.scheduler as scheduler
+from common.scheduler import CaseScheduler, ScheduleError
+from common.variable_store import VariableStore
+
+
+def _write(tmp_path, name, cases):
+    """cases: [(用例名, 提取的变量, 引用的变量)]"""
+    lines = ['test_cases:']
+    for case_name, produces, consumes in cases:
+        lines.append(f"  - case_name: {case_name}")
+        lines.append("    request:")
+        lines.append(f"      path: /{case_name}?" + '&'.join(f"{var}=${{{var}}}" for var in consumes))
+        if produces:
+            lines.append("    extract:")
+            lines.extend(f"      {var}: $.data.{var}" for var in produces)
+    path = tmp_path / name
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    return str(path)
+
+
+def _dependencies(planned):
+    return {key[1]: sorted(name for _, name in node.depends_on) for key, node in planned.items()}
+
+
+class TestPlan:
+
+    def test_same_file_producer_preferred(self, tmp_path):
+        a = _write(tmp_path, 'a.yml', [('login_a', ['token'], []), ('query_a', [], ['token'])])
+        b = _write(tmp_path, 'b.yml', [('login_b', ['token'], []), ('query_b', [], ['token'])])
+        planned = CaseScheduler([a, b], store=VariableStore()).plan()
+        assert _dependencies(planned) == {'login_a': [], 'query_a': ['login_a'], 'login_b': [], 'query_b': ['login_b']}
+
+    def test_nearest_earlier_producer(self, tmp_path):
+        a = _write(tmp_path, 'a.yml', [('first', ['id'], []), ('second', ['id'], []),
+                                       ('use', [], ['id']), ('later', ['id'], [])])
+        b = _write(tmp_path, 'b.yml', [('only_later', [], ['token']), ('login', ['token'], [])])
+        c = _write(tmp_path, 'c.yml', [('other', [], ['id'])])
+        planned = CaseScheduler([a, b, c], store=VariableStore()).plan()
+        assert _dependencies(planned)['use'] == ['second']
+        # 同一文件中没有之前的提供者时使用之后的
+        assert _dependencies(planned)['only_later'] == ['login']
+        # 其他文件的提供者中取之前最近的
+        assert _dependencies(planned)['other'] == ['later']
+
+    def test_selected_cases_pull_in_producers(self, tmp_path):
+        a = _write(tmp_path, 'a.yml', [('login', ['token'], []), ('query', [], ['token']), ('unrelated', [], [])])
+        planned = CaseScheduler([a], store=VariableStore()).plan([(a, 'query')])
+        assert sorted(name for _, name in planned) == ['login', 'query']
+
+    def test_missing_variable(self, tmp_path):
+        a = _write(tmp_path, 'a.yml', [('query', [], ['token', 'user'])])
+        with pytest.raises(ScheduleError, match='token'):
+            CaseScheduler([a], variables={'user': 'admin'}, store=VariableStore()).plan()
+        # 外部变量或变量存储中已有的变量视为已满足
+        CaseScheduler([a], variables={'user': 'admin', 'token': 't'}, store=VariableStore()).plan()
+        store = VariableStore()
+        store.update({'token': 'from extract.yml'})
+        assert _dependencies(CaseScheduler([a], variables={'user': 'admin'}, store=store).plan()) == {'query': []}
+
+    def test_cycle(self, tmp_path):
+        a = _write(tmp_path, 'a.yml', [('one', ['x'], ['y']), ('two', ['y'], ['x'])])
+        with pytest.raises(ScheduleError, match='环'):
+            CaseScheduler([a], store=VariableStore()).plan()
+
+
+class TestRun:
+
+    def test_failure_skips_dependents(self, tmp_path, monkeypatch):
+        a = _write(tmp_path, 'a.yml', [('login', ['token'], []), ('query', ['id'], ['token']),
+                                       ('detail', [], ['id']), ('independent', [], [])])
+        executed = []
+
+        def case(self, path, case_name, data=None):
+            executed.append(case_name)
+            if case_name == 'login':
+                raise AssertionError('登录失败')
+            return {'case_name': case_name}
+
+        monkeypatch.setattr(scheduler.TestExecutor, 'case', case)
+        outcomes = CaseScheduler([a], max_workers=2, store=VariableStore()).run()
+        status = {key[1]: outcome['status'] for key, outcome in outcomes.items()}
+        assert status == {'login': 'failed', 'query': 'skipped', 'detail': 'skipped', 'independent': 'passed'}
+        assert sorted(executed) == ['independent', 'login']
+        assert 'login' in outcomes[(a, 'detail')]['error']
@@ -0,0 +1,126 @@
+import os
+
+from utils.template_utils import Template, TemplateCache, render, render_string, template_cache, template_variables
+from utils.yaml_utils import CaseCatalog
+
+
+class TestRender:
+
+    def test_replaces_placeholders(self):
+        data = {'url': '/api/${id}', 'headers': {'Authorization': '${type} ${token}'}, 'list': ['${id}', 1]}
+        variables = {'id': 7, 'type': 'Bearer', 'token': 'abc'}
+        assert render(data, variables) == {
+            'url': '/api/7', 'headers': {'Authorization': 'Bearer abc'}, 'list': ['7', 1]}
+
+    def test_missing_variable_kept_and_reported(self):
+        missing = []
+        assert render('${a}-${b}', {'a': 1}, on_missing=missing.append) == '1-${b}'
+        assert missing == ['b']
+
+    def test_non_string_values_unchanged(self):
+        assert render(5, {}) == 5
+        assert render_string(None, {}) is None
+
+    def test_sees_in_place_mutation(self):
+        data = {'a': '1'}
+        assert render(data, {}) == {'a': '1'}
+        data['a'] = '2'
+        assert render(data, {}) == {'a': '2'}
+
+    def test_result_shares_nothing_with_source(self):
+        data = {'const': {'nested': [1, 2]}, 'value': '${v}'}
+        result = render(data, {'v': 1})
+        result['const']['nested'].append(3)
+        assert data == {'const': {'nested': [1, 2]}, 'value': '${v}'}
+
+    def test_compiled_once_per_content(self):
+        template_cache.clear()
+        data = {'a': '${x}', 'b': [1, 2]}
+        render(data, {'x': 1})
+        template = template_cache.get({'a': '${x}', 'b': [1, 2]})
+        assert render(dict(data), {'x': 2}) == {'a': '2', 'b': [1, 2]}
+        assert template_cache.get(data) is template
+
+    def test_template_variables(self):
+        assert template_variables({'a': ['${x}', {'b': '${y} ${x}'}]}) == {'x', 'y'}
+        assert template_variables('plain') == frozenset()
+
+
+class TestTemplate:
+
+    def test_constant_subtrees_are_copied(self):
+        data = {'const': {'nested': [1]}, 'value': '${v}'}
+        template = Template(data)
+        first = template.render({'v': 1})
+        first['const']['nested'].append(2)
+        assert template.render({'v': 2}) == {'const': {'nested': [1]}, 'value': '2'}
+
+
+class TestTemplateCache:
+
+    def test_keyed_by_content(self):
+        cache = TemplateCache(factory=lambda data: object())
+        data = [['$.code', '==', 0]]
+        compiled = cache.get(data)
+        assert cache.get([['$.code', '==', 0]]) is compiled
+        data[0][2] = 1
+        assert cache.get(data) is not compiled
+
+    def test_distinguishes_scalar_types(self):
+        cache = TemplateCache(factory=lambda data: object())
+        assert len({id(cache.get([value])) for value in (1, True, 1.0, '1')}) == 4
+
+    def test_compiles_private_copy(self):
+        cache = TemplateCache()
+        data = {'a': {'b': '${x}'}, 'c': [1]}
+        template = cache.get(data)
+        data['c'].append(2)
+        assert template.render({'x': 1}) == {'a': {'b': '1'}, 'c': [1]}
+
+    def test_bounded(self):
+        cache = TemplateCache(maxsize=2)
+        for i in range(5):
+            cache.get([i])
+        assert len(cache._cache) == 2
+
+
+class TestCaseCatalogTemplate:
+
+    def test_cached_per_file_version(self, tmp_path):
+        path = tmp_path / 'cases.yml'
+        path.write_text("test_cases:\n  - case_name: a\n    request:\n      path: /x/${id}\n", encoding='utf-8')
+        catalog = CaseCatalog()
+        template = catalog.get_template(str(path), 'a')
+        assert template is catalog.get_template(str(path), 'a')
+        assert template.render({'id': 1})['request']['path'] == '/x/1'
+
+        path.write_text("test_cases:\n  - case_name: a\n    request:\n      path: /yy/${id}\n", encoding='utf-8')
+        assert catalog.get_template(str(path), 'a').render({'id': 1})['request']['path'] == '/yy/1'
+        assert catalog.get_template(str(path), 'missing') is None
+
+    def test_rendered_case_does_not_change_catalog(self, tmp_path):
+        path = tmp_path / 'cases.yml'
+        path.write_text("test_cases:\n  - case_name: a\n    request:\n      headers: {k: v}\n", encoding='utf-8')
+        catalog = CaseCatalog()
+        rendered = catalog.get_template(str(path), 'a').render({})
+        rendered['request']['headers']['k'] = 'changed'
+        assert catalog.get_case(str(path), 'a')['request']['headers'] == {'k': 'v'}
+
+    def test_one_stat_per_lookup(self, tmp_path, monkeypatch):
+        path = tmp_path / 'cases.yml'
+        path.write_text("test_cases:\n  - case_name: a\n    value: ${v}\n", encoding='utf-8')
+        catalog = CaseCatalog()
+        catalog.get_template(str(path), 'a')
+        calls = []
+        stat = os.stat
+        monkeypatch.setattr(os, 'stat', lambda *args, **kwargs: calls.append(args) or stat(*args, **kwargs))
+        catalog.get_template(str(path), 'a')
+        assert len(calls) == 1
+
+    def test_survives_clear(self, tmp_path):
+        path = tmp_path / 'cases.yml'
+        path.write_text("test_cases:\n  - case_name: a\n    value: ${v}\n", encoding='utf-8')
+        catalog = CaseCatalog()
+        catalog.get_template(str(path), 'a')
+        catalog.clear()
+        assert catalog.get_template(str(path), 'a').render({'v': 2}) == {'case_name': 'a', 'value': '2'}
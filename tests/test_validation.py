@@ -0,0 +1,177 @@
+import itertools
+import re
+
+import pytest
+from requests.models import Response
+
+from common.validation import (ValidationRule, compile_field, compile_validations, get_comparator,
+                               register_comparator, satisfying_value, _COMPARATORS)
+
+
+def _legacy_compare(actual, expected, comparator):
+    """编译验证计划之前 ApiResponse._compare_values 的实现，作为比较器的参照"""
+    try:
+        if actual is None:
+            return False
+        comparator = str(comparator).strip()
+        if comparator in ['==', '!=', '>', '<', '>=', '<=']:
+            try:
+                if isinstance(actual, (int, float)) or (
+                        isinstance(actual, str) and actual.replace('.', '', 1).isdigit()):
+                    if isinstance(expected, (int, float)) or (
+                            isinstance(expected, str) and expected.replace('.', '', 1).isdigit()):
+                        a, e = float(actual), float(expected)
+                        return {'==': abs(a - e) < 0.000001, '!=': abs(a - e) > 0.000001, '>': a > e,
+                                '<': a < e, '>=': a >= e, '<=': a <= e}[comparator]
+            except Exception:
+                pass
+        if comparator == '==':
+            return str(actual) == str(expected)
+        if comparator == '!=':
+            return str(actual) != str(expected)
+        if comparator in ('>', '<', '>=', '<='):
+            try:
+                a, e = float(actual), float(expected)
+            except Exception:
+                return False
+            return {'>': a > e, '<': a < e, '>=': a >= e, '<=': a <= e}[comparator]
+        if comparator in ['in', '包含']:
+            return str(expected) in str(actual)
+        if comparator in ['not in', '不包含']:
+            return str(expected) not in str(actual)
+        if comparator in ['regex', '正则匹配']:
+            return bool(re.search(str(expected), str(actual)))
+        if comparator in ['length', '长度']:
+            try:
+                return len(actual) == int(expected)
+            except Exception:
+                return False
+        if comparator in ['startswith', '以开头']:
+            return str(actual).startswith(str(expected))
+        if comparator in ['endswith', '以结尾']:
+            return str(actual).endswith(str(expected))
+        if comparator in ['type', '类型']:
+            return type(actual).__name__ == str(expected)
+        if comparator in ['exists', '存在']:
+            return actual is not None
+        if comparator in ['not_exists', '不存在']:
+            return actual is None
+        return False
+    except Exception:
+        return False
+
+
+_VALUES = [None, 0, 1, 200, -1, 3.5, True, False, '', '0', '1', '200', '200.0', '3.5', '-1', '1e3', '²',
+           'abc', 'a+', '[', 'str', 'int', [], [1, 2], {'a': 1}, {}]
+_NAMES = ['==', '!=', '>', '<', '>=', '<=', 'in', '包含', 'not in', '不包含', 'regex', '正则匹配',
+          'length', '长度', 'startswith', '以开头', 'endswith', '以结尾', 'type', '类型',
+          'exists', '存在', 'not_exists', '不存在', ' == ', 'unknown']
+
+
+def _rule_compare(actual, expected, comparator):
+    return ValidationRule(['$.field', comparator, expected]).compare(actual)
+
+
+class TestComparators:
+
+    @pytest.mark.parametrize('comparator', _NAMES)
+    def test_matches_legacy_compare(self, comparator):
+        for actual, expected in itertools.product(_VALUES, _VALUES):
+            # 与原实现唯一的差异，见 test_not_exists_passes_for_missing_field
+            if actual is None and str(comparator).strip() in ('not_exists', '不存在'):
+                continue
+            assert _rule_compare(actual, expected, comparator) == _legacy_compare(actual, expected, comparator), \
+                (actual, expected, comparator)
+
+    @pytest.mark.parametrize('comparator', ['not_exists', '不存在'])
+    def test_not_exists_passes_for_missing_field(self, comparator):
+        """有意的行为变化：原实现对 None 一律返回 False，not_exists 对任何取值都不会通过"""
+        assert _legacy_compare(None, '', comparator) is False
+        assert _rule_compare(None, '', comparator) is True
+        rule = ValidationRule(['$.data.deleted', comparator, ''])
+        assert rule.compare(rule.actual(_response(), {'data': {}})) is True
+        assert rule.compare(rule.actual(_response(), {'data': {'deleted': 0}})) is False
+        assert _rule_compare('value', '', comparator) is False
+
+    def test_register_comparator(self):
+        try:
+            @register_comparator('approx', '约等于', prepare=float, example=lambda expected: float(expected))
+            def approx(actual, expected):
+                return abs(float(actual) - expected) < 0.01
+
+            assert get_comparator('约等于') is get_comparator('approx')
+            assert _rule_compare('1.005', '1', 'approx') is True
+            assert _rule_compare('1.5', '1', '约等于') is False
+            assert satisfying_value('approx', '2') == (True, 2.0)
+        finally:
+            _COMPARATORS.pop('approx', None)
+            _COMPARATORS.pop('约等于', None)
+
+    @pytest.mark.parametrize('comparator, expected', [
+        ('==', 5), ('!=', 'a'), ('>', '3'), ('<', 2), ('>=', 1), ('<=', 1), ('in', 'x'), ('not in', 'x'),
+        ('startswith', 'ab'), ('endswith', 'yz'), ('length', 2), ('type', 'int'), ('exists', None)])
+    def test_satisfying_value_passes_comparator(self, comparator, expected):
+        ok, value = satisfying_value(comparator, expected)
+        assert ok
+        assert _rule_compare(value, expected, comparator)
+
+    @pytest.mark.parametrize('comparator, expected', [
+        ('regex', 'a+'), ('not_exists', None), ('>', 'abc'), ('type', 'NoneType'), ('unknown', 1)])
+    def test_satisfying_value_unsupported(self, comparator, expected):
+        assert satisfying_value(comparator, expected) == (False, None)
+
+
+def _response(url='http://host/path?q=1'):
+    response = Response()
+    response.status_code = 200
+    response.url = url
+    return response
+
+
+class TestCompileField:
+
+    DATA = {'code': 0, 'data': {'list': [{'id': 1}, {'id': 2}]}}
+
+    @pytest.mark.parametrize('field, expected', [
+        ('code', DATA),
+        ('$', DATA),
+        ('$.code', 0),
+        ('$.data.list[1].id', 2),
+        ('$.data.list.id', 1),
+        ('$.missing', None),
+        ('$.status_code', 200),
+        ('$.url', 'http://host/path?q=1'),
+    ])
+    def test_field_values(self, field, expected):
+        assert compile_field(field)(_response(), self.DATA) == expected
+
+    def test_url_is_string(self):
+        class Url:
+            def __str__(self):
+                return 'http://async/'
+
+        assert compile_field('$.url')(_response(Url()), None) == 'http://async/'
+
+
+class TestCompileValidations:
+
+    def test_cached_by_content(self):
+        validations = [['$.code', '==', 0], ['$.data', 'exists', '']]
+        plan = compile_validations(validations)
+        assert compile_validations([['$.code', '==', 0], ['$.data', 'exists', '']]) is plan
+        validations[0][2] = 1
+        changed = compile_validations(validations)
+        assert changed is not plan
+        assert changed.rules[0][0].expected == 1
+        assert plan.rules[0][0].expected == 0
+
+    def test_malformed_rules_kept_for_reporting(self):
+        plan = compile_validations([['$.code', '=='], 'text', ['$.code', '==', 0, '状态码']])
+        assert [rule is None for rule, _ in plan.rules] == [True, True, False]
+        assert plan.rules[2][0].message == '状态码'
+
+    def test_compile_errors_raised_at_run_time(self):
+        rule = ValidationRule(['$.data[0', '==', 1])
+        with pytest.raises(ValueError):
+            rule.actual(_response(), {})
+        assert ValidationRule(['$.code', 'regex', '[']).compare('a') is False
@@ -1,9 +1,10 @@
 import logging
 import os
 import csv
-import re
 from typing import Any, Dict, List
 
+from utils.template_utils import render, template_variables
+
 
 
 
@@ -55,7 +56,7 @@ class DataReplaceUtils:
     @staticmethod
     def replace_variables(data: Any, variables: Dict[str, Any]) -> Any:
         """
-        递归替换数据中的变量占位符 ${variable}
+        递归替换数据中的变量占位符 ${variable}，返回新的数据，不修改原数据
 
         Args:
             data: 原始数据
@@ -64,21 +65,7 @@ class DataReplaceUtils:
         Returns:
             Any: 替换后的数据
         """
-        if isinstance(data, str):
-            # 替换字符串中的 ${variable}
-            for key, value in variables.items():
-                placeholder = f"${{{key}}}"
-                if placeholder in data:
-                    data = data.replace(placeholder, str(value))
-            return data
-        elif isinstance(data, dict):
-            # 递归处理字典
-            return {k: DataReplaceUtils.replace_variables(v, variables) for k, v in data.items()}
-        elif isinstance(data, list):
-            # 递归处理列表
-            return [DataReplaceUtils.replace_variables(item, variables) for item in data]
-        else:
-            return data
+        return render(data, variables)
 
     @staticmethod
     def extract_variables(data: Any) -> List[str]:
@@ -91,22 +78,7 @@ class DataReplaceUtils:
         Returns:
             List[str]: 变量名列表
         """
-        variables = set()
-
-        def _extract(obj):
-            if isinstance(obj, str):
-                # 使用正则表达式匹配 ${variable} 格式
-                matches = re.findall(r'\$\{([^}]+)\}', obj)
-                variables.update(matches)
-            elif isinstance(obj, dict):
-                for value in obj.values():
-                    _extract(value)
-            elif isinstance(obj, list):
-                for item in obj:
-                    _extract(item)
-
-        _extract(data)
-        return list(variables)
+        return list(template_variables(data))
 
     @staticmethod
     def replace_from_csv(data: Any, csv_file_path: str, key_column: str, value_column: str) -> Any:
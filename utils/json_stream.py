@@ -0,0 +1,329 @@
+import codecs
+import json
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from utils import json_utils
+from utils.jsonpath_utils import INDEX, KEY, WILDCARD, compile_path
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+# 字符串内容（不含结尾引号），末尾单独的反斜杠留到下一块数据再处理
+_STRING_BODY = re.compile(r'(?:[^"\\]|\\.)*', re.S)
+# 数字、true/false/null
+_SCALAR = re.compile(r'[^,:\]}\s]*')
+# 完整位于缓冲区中的值直接用标准库（C 实现）解析
+_DECODER = json.JSONDecoder()
+_INCOMPLETE = object()
+# 标量之后允许出现的字符
+_DELIMITERS = frozenset(' \t\n\r,:]}')
+
+
+class PathNode:
+    """
+    路径前缀树节点
+
+    - keys: 作用于字典的键 -> 子节点（数字键同时登记在 indexes 中，与 CompiledPath 一致作用于列表时按下标访问）
+    - indexes: 作用于列表的非负下标 -> 子节点
+    - full: 需要该位置的完整值（路径在此结束，或包含通配）
+    - full_if_list: 该位置是列表时需要完整值（键作用于列表、负数下标）
+    - leaves: 在该节点及其子树中结束的路径数
+    """
+
+    __slots__ = ('keys', 'indexes', 'full', 'full_if_list', 'leaves')
+
+    def __init__(self):
+        self.keys: Dict[str, 'PathNode'] = {}
+        self.indexes: Dict[int, 'PathNode'] = {}
+        self.full = False
+        self.full_if_list = False
+        self.leaves = 0
+
+
+def build_path_tree(paths: Iterable[str]) -> Optional[PathNode]:
+    """
+    将多个路径合并为前缀树
+    :param paths: 路径（compile_path 语法，作用于响应体根节点）
+    :return: 有路径需要整个响应体时返回None
+    """
+    root = PathNode()
+    for path in paths:
+        steps = compile_path(path).steps
+        if not steps:
+            return None
+        node = root
+        node.leaves += 1
+        for kind, arg, as_index in steps:
+            if kind == WILDCARD:
+                node.full = True
+                break
+            if kind == INDEX and arg < 0:
+                node.full_if_list = True
+                break
+            if kind == KEY:
+                if as_index is None:
+                    node.full_if_list = True
+                child = node.keys.get(arg) or (node.indexes.get(as_index) if as_index is not None else None)
+                if child is None:
+                    child = PathNode()
+                node.keys[arg] = child
+                if as_index is not None:
+                    node.indexes.setdefault(as_index, child)
+            else:
+                child = node.indexes.get(arg)
+                if child is None:
+                    child = node.indexes[arg] = PathNode()
+            node = child
+            node.leaves += 1
+        else:
+            node.full = True
+    return root
+
+
+class JsonStreamParser:
+    """
+    增量 JSON 解析器：逐块读取，只构造路径前缀树需要的部分
+
+    按路径逐层定位：字典中只保留需要的键，列表中只保留需要的下标（其余位置为 None），不需要的值只扫描不解析；
+    需要完整值的位置（路径终点、通配、键作用于列表等）截取原文后一次性解析。
+    所有路径都确定后立即停止读取，剩余数据不再下载。
+    得到的部分文档上按原路径求值，结果与完整解析相同。
+    """
+
+    def __init__(self, chunks: Iterable[bytes], encoding: str = None):
+        """
+        :param chunks: 响应体数据块，如 response.iter_content(65536)
+        :param encoding: 响应编码，默认 UTF-8
+        """
+        encoding = (encoding or 'utf-8').lower().replace('_', '-')
+        if encoding in ('utf-8', 'utf8'):
+            encoding = 'utf-8-sig'
+        self._chunks: Iterator[bytes] = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder(encoding)('strict')
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+        # 截取原文时的起点及已从缓冲区移出的部分
+        self._mark: Optional[int] = None
+        self._saved: List[str] = []
+        self._pending = 0
+        # 读取的字符数
+        self.consumed = 0
+
+    # ------------------------------------------------------------ 缓冲区
+
+    def _fill(self) -> bool:
+        """读取下一块数据，已处理的部分移出缓冲区，没有更多数据时返回False"""
+        if self._eof:
+            return False
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self._eof = True
+            text = self._decoder.decode(b'', final=True)
+        else:
+            text = self._decoder.decode(chunk)
+        if self._mark is not None:
+            self._saved.append(self._buf[self._mark:self._pos])
+            self._mark = 0
+        self._buf = self._buf[self._pos:] + text
+        self.consumed += len(text)
+        self._pos = 0
+        return bool(text) or not self._eof
+
+    def _error(self, message: str) -> json.JSONDecodeError:
+        return json.JSONDecodeError(message, self._buf, self._pos)
+
+    def _peek(self) -> str:
+        """跳过空白，返回下一个字符，数据结束时返回空字符串"""
+        while True:
+            self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ''
+
+    # ------------------------------------------------------------ 扫描
+
+    def _scan_string(self):
+        """跳过字符串（当前位置为开始引号）"""
+        self._pos += 1
+        while True:
+            self._pos = _STRING_BODY.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf) and self._buf[self._pos] == '"':
+                self._pos += 1
+                return
+            if not self._fill():
+                raise self._error("字符串未结束")
+
+    def _scan_scalar(self):
+        """跳过数字或 true/false/null"""
+        scanned = 0
+        while True:
+            end = _SCALAR.match(self._buf, self._pos).end()
+            scanned += end - self._pos
+            self._pos = end
+            if self._pos < len(self._buf) or not self._fill():
+                break
+        if not scanned:
+            raise self._error("无法识别的值")
+
+    def _decode_buffered(self) -> Any:
+        """
+        当前值已完整位于缓冲区时直接解析并前移位置，否则返回 _INCOMPLETE
+        数字、true/false/null 后面没有分隔符时可能被截断（如 -2500. 后面还有数据），需要等待更多数据
+        """
+        try:
+            value, end = _DECODER.raw_decode(self._buf, self._pos)
+        except json.JSONDecodeError:
+            return _INCOMPLETE
+        if (self._buf[end - 1] not in '"}]' and not self._eof
+                and (end == len(self._buf) or self._buf[end] not in _DELIMITERS)):
+            return _INCOMPLETE
+        self._pos = end
+        return value
+
+    def _skip_value(self):
+        """跳过一个值：容器完整位于缓冲区时整体解析跳过，否则逐个元素跳过"""
+        char = self._peek()
+        if char == '"':
+            self._scan_string()
+        elif char in ('{', '['):
+            if self._decode_buffered() is _INCOMPLETE:
+                self._pos += 1
+                self._skip_rest()
+        elif char:
+            self._scan_scalar()
+        else:
+            raise self._error("数据不完整")
+
+    def _skip_rest(self):
+        """逐个元素跳过容器的剩余部分（包括结束括号）"""
+        while True:
+            char = self._peek()
+            if char in ('}', ']'):
+                self._pos += 1
+                return
+            if char in (',', ':'):
+                self._pos += 1
+                continue
+            self._skip_value()
+
+    def _read_value(self) -> Any:
+        """解析一个值，跨越多个数据块时截取原文后解析"""
+        self._peek()
+        value = self._decode_buffered()
+        if value is not _INCOMPLETE:
+            return value
+        self._mark = self._pos
+        try:
+            self._skip_value()
+            text = ''.join(self._saved) + self._buf[self._mark:self._pos]
+        finally:
+            self._mark = None
+            self._saved = []
+        return json_utils.loads(text)
+
+    # ------------------------------------------------------------ 按路径定位
+
+    def parse(self, tree: PathNode) -> Any:
+        """
+        按路径前缀树解析
+        :return: 只包含所需部分的文档
+        """
+        self._pending = tree.leaves
+        return self._walk(tree)
+
+    def _walk(self, node: PathNode) -> Any:
+        before = self._pending
+        char = self._peek()
+        if node.full or (char == '[' and node.full_if_list):
+            value = self._read_value()
+        elif char == '{' and node.keys:
+            value = self._walk_dict(node)
+        elif char == '[' and node.indexes:
+            value = self._walk_list(node)
+        else:
+            # 类型不匹配，路径在此不存在
+            self._skip_value()
+            value = None
+        # 该节点下的所有路径均已确定
+        self._pending = before - node.leaves
+        return value
+
+    def _expect(self, char: str):
+        if self._peek() != char:
+            raise self._error(f"应为 {char}")
+        self._pos += 1
+
+    def _read_key(self) -> str:
+        if self._peek() != '"':
+            raise self._error("应为字符串键")
+        return self._read_value()
+
+    def _walk_dict(self, node: PathNode) -> Dict[str, Any]:
+        self._pos += 1
+        result = {}
+        remaining = dict(node.keys)
+        while True:
+            char = self._peek()
+            if char == '}':
+                self._pos += 1
+                return result
+            if char == ',':
+                self._pos += 1
+                continue
+            key = self._read_key()
+            self._expect(':')
+            child = remaining.pop(key, None)
+            if child is None:
+                self._skip_value()
+                continue
+            result[key] = self._walk(child)
+            if not self._pending:
+                return result
+            if not remaining:
+                self._skip_rest()
+                return result
+
+    def _walk_list(self, node: PathNode) -> List[Any]:
+        self._pos += 1
+        result = []
+        remaining = dict(node.indexes)
+        while True:
+            char = self._peek()
+            if char == ']':
+                self._pos += 1
+                return result
+            if char == ',':
+                self._pos += 1
+                continue
+            child = remaining.pop(len(result), None)
+            if child is None:
+                self._skip_value()
+                result.append(None)
+                continue
+            result.append(self._walk(child))
+            if not self._pending:
+                return result
+            if not remaining:
+                self._skip_rest()
+                return result
+
+
+def parse_paths(chunks: Iterable[bytes], paths: Iterable[str], encoding: str = None) -> Any:
+    """
+    流式解析 JSON，只构造路径需要的部分
+    :param chunks: 数据块
+    :param paths: 路径（作用于根节点）
+    :param encoding: 编码
+    :return: 部分文档，有路径需要整个文档时返回完整解析结果，paths 为空时返回None
+    """
+    tree = build_path_tree(paths)
+    if tree is not None and not tree.leaves:
+        # 没有需要的路径，不读取响应体
+        return None
+    parser = JsonStreamParser(chunks, encoding)
+    if tree is None:
+        tree = PathNode()
+        tree.full = True
+        tree.leaves = 1
+    return parser.parse(tree)
@@ -0,0 +1,23 @@
+import json
+from typing import Any, Union
+
+# orjson 为可选依赖，安装后用于加速解析，未安装时使用标准库
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def loads(raw: Union[bytes, bytearray, str]) -> Any:
+    """
+    解析 JSON 文本
+    :param raw: UTF-8 字节串或字符串
+    :return: 解析结果，格式错误时抛出 json.JSONDecodeError
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            # orjson 不支持超过64位的整数、NaN 等，交给标准库判断
+            pass
+    return json.loads(raw)
@@ -0,0 +1,152 @@
+from functools import lru_cache
+from typing import Any, List, Tuple
+
+# 步骤类型
+KEY, INDEX, WILDCARD = 'key', 'index', 'wildcard'
+
+
+def parse_components(path: str) -> List[str]:
+    """解析 JSONPath 表达式为组件列表，如 data.items[0]['name'] -> ['data', 'items', '[0]', "['name']"]"""
+    components = []
+    i = 0
+    length = len(path)
+
+    while i < length:
+        char = path[i]
+
+        if char == '.':
+            i += 1
+            if i >= length:
+                break
+
+            # 检查下一个字符是否是 [
+            if path[i] == '[':
+                # 处理 .[ 的情况，跳过 . 直接处理 [
+                continue
+            else:
+                # 处理 .key 的情况
+                start = i
+                while i < length and path[i] not in ['[', '.']:
+                    i += 1
+                if start < i:
+                    components.append(path[start:i])
+
+        elif char == '[':
+            # 找到匹配的 ]
+            bracket_end = path.find(']', i)
+            if bracket_end == -1:
+                raise ValueError(f"Unclosed bracket in path: {path}")
+
+            components.append(path[i:bracket_end + 1])  # 包括方括号
+            i = bracket_end + 1
+
+        else:
+            # 处理开头的键（没有 . 前缀）
+            start = i
+            while i < length and path[i] not in ['[', '.']:
+                i += 1
+            if start < i:
+                components.append(path[start:i])
+
+    return components
+
+
+def _to_step(component: str) -> Tuple:
+    """将路径组件转换为带类型的步骤: (类型, 参数, 作为列表下标时的索引)"""
+    if component.startswith('[') and component.endswith(']'):
+        inner = component[1:-1]
+        # 带引号的键 ['key'], ["key"]
+        if len(inner) >= 2 and inner[0] == inner[-1] and inner[0] in ('"', "'"):
+            return KEY, inner[1:-1], None
+        if inner == '*':
+            return WILDCARD, None, None
+        # 数字索引 [0], [-1]
+        if inner.isdigit() or (inner.startswith('-') and inner[1:].isdigit()):
+            return INDEX, int(inner), None
+        # 不带引号的键 [key]
+        return KEY, inner, None
+    if component == '*':
+        return WILDCARD, None, None
+    # 普通键，作用于列表时数字键按下标访问
+    return KEY, component, int(component) if component.isdigit() else None
+
+
+class CompiledPath:
+    """
+    编译后的 JSONPath
+
+    路径只在编译时解析一次，求值时逐个执行带类型的步骤：
+    键（作用于列表时对列表中的字典元素取值）、下标、通配（展开列表/字典的值）。
+    """
+
+    __slots__ = ('path', 'steps')
+
+    def __init__(self, path: str, steps: Tuple[Tuple, ...]):
+        self.path = path
+        self.steps = steps
+
+    def evaluate(self, data: Any, first_match: bool = False) -> Any:
+        """
+        在数据上求值
+        :param data: 响应数据
+        :param first_match: 键作用于列表时只取第一个匹配项（用于验证），
+                            否则收集全部匹配项，只有一项时直接返回该项（用于提取）
+        :return: 未找到时返回None
+        """
+        current = data
+        for kind, arg, as_index in self.steps:
+            if current is None:
+                return None
+
+            if kind == KEY:
+                if isinstance(current, dict):
+                    current = current.get(arg)
+                elif isinstance(current, list):
+                    if as_index is not None:
+                        current = current[as_index] if as_index < len(current) else None
+                    elif first_match:
+                        current = next((item[arg] for item in current
+                                        if isinstance(item, dict) and arg in item), None)
+                    else:
+                        results = [item[arg] for item in current if isinstance(item, dict) and arg in item]
+                        if not results:
+                            return None
+                        current = results[0] if len(results) == 1 else results
+                else:
+                    return None
+
+            elif kind == INDEX:
+                if not isinstance(current, list):
+                    return None
+                index = arg + len(current) if arg < 0 else arg
+                if 0 <= index < len(current):
+                    current = current[index]
+                else:
+                    return None
+
+            else:
+                if isinstance(current, dict):
+                    current = list(current.values())
+                elif not isinstance(current, list):
+                    return None
+
+        return current
+
+    def __repr__(self):
+        return f"CompiledPath({self.path!r})"
+
+
+@lru_cache(maxsize=1024)
+def compile_path(path: str) -> CompiledPath:
+    """
+    编译 JSONPath 表达式（按路径字符串 LRU 缓存）
+    :param path: 路径，如 $.data[0].code、data.items[0]，开头的 $ 和 . 可省略
+    :return: 编译后的路径
+    """
+    normalized = path
+    if normalized.startswith('$'):
+        normalized = normalized[1:]
+    if normalized.startswith('.'):
+        normalized = normalized[1:]
+    steps = tuple(_to_step(component) for component in parse_components(normalized))
+    return CompiledPath(path, steps)
@@ -0,0 +1,231 @@
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Dict, FrozenSet, Hashable, Optional, Tuple
+
+# ${variable} 占位符
+PLACEHOLDER_PATTERN = re.compile(r'\$\{([^}]+)\}')
+
+# 节点类型
+_CONST, _STRING, _DICT, _LIST = range(4)
+
+
+class StringTemplate:
+    """编译后的字符串模板：字面量片段与变量槽交替排列"""
+
+    __slots__ = ('source', 'literals', 'names')
+
+    def __init__(self, source: str, literals: Tuple[str, ...], names: Tuple[str, ...]):
+        self.source = source
+        # len(literals) == len(names) + 1
+        self.literals = literals
+        self.names = names
+
+    def render(self, variables: Dict[str, Any],
+               on_missing: Optional[Callable[[str], None]] = None) -> str:
+        """
+        渲染字符串，未定义的变量保留原占位符
+        :param variables: 变量字典
+        :param on_missing: 遇到未定义变量时的回调
+        :return:
+        """
+        literals = self.literals
+        parts = [literals[0]]
+        for i, name in enumerate(self.names):
+            if name in variables:
+                parts.append(str(variables[name]))
+            else:
+                if on_missing is not None:
+                    on_missing(name)
+                parts.append(f"${{{name}}}")
+            parts.append(literals[i + 1])
+        return ''.join(parts)
+
+
+@lru_cache(maxsize=4096)
+def compile_string(text: str) -> Optional[StringTemplate]:
+    """
+    编译字符串模板（按字符串内容缓存）
+    :param text: 原始字符串
+    :return: 不包含占位符时返回None
+    """
+    if '${' not in text:
+        return None
+    literals = []
+    names = []
+    position = 0
+    for match in PLACEHOLDER_PATTERN.finditer(text):
+        literals.append(text[position:match.start()])
+        names.append(match.group(1))
+        position = match.end()
+    if not names:
+        return None
+    literals.append(text[position:])
+    return StringTemplate(text, tuple(literals), tuple(names))
+
+
+def render_string(text: Any, variables: Dict[str, Any],
+                  on_missing: Optional[Callable[[str], None]] = None) -> Any:
+    """替换单个字符串中的 ${variable} 占位符，非字符串原样返回"""
+    if not isinstance(text, str):
+        return text
+    template = compile_string(text)
+    if template is None:
+        return text
+    return template.render(variables, on_missing)
+
+
+def _compile(data: Any, names: set) -> tuple:
+    """递归编译数据结构，不含占位符的子树折叠为常量"""
+    if isinstance(data, str):
+        template = compile_string(data)
+        if template is None:
+            return _CONST, data
+        names.update(template.names)
+        return _STRING, template
+    if isinstance(data, dict):
+        items = tuple((key, _compile(value, names)) for key, value in data.items())
+        if all(node[0] == _CONST for _, node in items):
+            return _CONST, data
+        return _DICT, items
+    if isinstance(data, list):
+        nodes = tuple(_compile(item, names) for item in data)
+        if all(node[0] == _CONST for node in nodes):
+            return _CONST, data
+        return _LIST, nodes
+    return _CONST, data
+
+
+def _copy(data: Any) -> Any:
+    """复制字典/列表结构（字符串、数字等不可变值直接共享）"""
+    if isinstance(data, dict):
+        return {key: _copy(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [_copy(item) for item in data]
+    return data
+
+
+def _render(node: tuple, variables: Dict[str, Any], on_missing) -> Any:
+    kind, value = node
+    if kind == _CONST:
+        return _copy(value)
+    if kind == _STRING:
+        return value.render(variables, on_missing)
+    if kind == _DICT:
+        return {key: _render(child, variables, on_missing) for key, child in value}
+    return [_render(child, variables, on_missing) for child in value]
+
+
+class Template:
+    """
+    编译后的数据模板
+
+    占位符在编译时定位，渲染时只替换变量槽、复制不含占位符的字典/列表，不再扫描字符串，与变量字典的大小无关。
+    编译时引用原数据，原数据被修改后应重新编译；渲染结果是新的对象，不与原数据共享子结构，调用方可以修改。
+    """
+
+    __slots__ = ('_node', 'variables')
+
+    def __init__(self, data: Any):
+        names = set()
+        self._node = _compile(data, names)
+        # 模板中引用的全部变量名
+        self.variables: FrozenSet[str] = frozenset(names)
+
+    def render(self, variables: Dict[str, Any],
+               on_missing: Optional[Callable[[str], None]] = None) -> Any:
+        """
+        使用变量字典渲染模板
+        :param variables: 变量字典
+        :param on_missing: 遇到未定义变量时的回调
+        :return: 替换变量后的数据
+        """
+        return _render(self._node, variables, on_missing)
+
+
+def freeze(data: Any) -> Hashable:
+    """
+    将数据转换为可哈希的内容键（字典、列表递归转换，标量附带类型以区分 1/True/1.0）
+    :raise TypeError: 包含不可哈希的值
+    """
+    if isinstance(data, dict):
+        return dict, tuple((key, freeze(value)) for key, value in data.items())
+    if isinstance(data, (list, tuple)):
+        return type(data), tuple(freeze(item) for item in data)
+    hash(data)
+    return type(data), data
+
+
+class TemplateCache:
+    """
+    按内容缓存编译结果（有界 LRU）
+
+    以 freeze(data) 为键，编译时使用数据的副本，调用方之后修改原数据不会影响缓存的编译结果。
+    包含不可哈希值的数据不缓存，每次重新编译。
+    """
+
+    def __init__(self, maxsize: int = 1024, factory: Callable[[Any], Any] = None):
+        """
+        :param maxsize: 最多缓存的条目数
+        :param factory: 编译函数，默认编译为 Template
+        """
+        self.maxsize = maxsize
+        self.factory = factory or Template
+        self._cache: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, data: Any) -> Any:
+        """获取数据对应的编译结果，未缓存时编译"""
+        try:
+            key = freeze(data)
+        except TypeError:
+            return self.factory(data)
+        with self._lock:
+            compiled = self._cache.get(key)
+            if compiled is not None:
+                self._cache.move_to_end(key)
+                return compiled
+        compiled = self.factory(_copy(data))
+        with self._lock:
+            self._cache[key] = compiled
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return compiled
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+# render() 使用的模板缓存（按数据内容）
+template_cache = TemplateCache()
+
+
+def render(data: Any, variables: Dict[str, Any],
+           on_missing: Optional[Callable[[str], None]] = None) -> Any:
+    """
+    替换数据结构中的 ${variable} 占位符
+
+    按数据内容缓存编译后的模板，内容相同的数据只编译一次；调用方之后修改原数据时按新内容重新编译。
+    返回新的字典/列表，不与原数据共享子结构。
+    用例目录中的用例使用 case_catalog.get_template 获取按文件版本缓存的模板，省去按内容查找缓存的开销。
+    :param data: 原始数据（字符串/字典/列表）
+    :param variables: 变量字典
+    :param on_missing: 遇到未定义变量时的回调
+    :return: 替换变量后的数据
+    """
+    if isinstance(data, str):
+        return render_string(data, variables, on_missing)
+    if not isinstance(data, (dict, list)):
+        return data
+    return template_cache.get(data).render(variables, on_missing)
+
+
+def template_variables(data: Any) -> FrozenSet[str]:
+    """数据中 ${...} 占位符引用的全部变量名"""
+    if isinstance(data, str):
+        template = compile_string(data)
+        return frozenset(template.names) if template else frozenset()
+    return Template(data).variables
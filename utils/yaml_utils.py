@@ -1,11 +1,135 @@
 import json
 import os.path
-from typing import Dict, Any
-import re
+import threading
+from typing import Dict, Any, Optional, Tuple
 import yaml
 
+from common.config import config
 from common.log import test_logger
 from common.os_path import get_object_path
+from utils.template_utils import Template, render
+
+
+def resolve_case_path(file_path: str, default_file: str = 'case_data') -> str:
+    """
+    解析用例文件路径
+    :param file_path: 文件路径（支持相对/绝对）
+    :param default_file: yaml文件默认存放路径
+    :return: 绝对路径
+    """
+    if os.path.isabs(file_path):
+        return file_path
+    return os.path.join(get_object_path(), default_file, file_path)
+
+
+class CaseCatalog:
+    """
+    用例目录 - 进程级缓存
+
+    每个用例文件只解析一次，一次遍历完成重名检查并建立 用例名->用例 索引，
+    文件的 mtime 或大小变化时才重新加载。返回的用例为共享对象，调用方不应修改。
+    用例的编译模板按 (文件, 用例名, mtime, 大小) 缓存，文件重新加载后重新编译。
+    """
+
+    def __init__(self):
+        # 绝对路径 -> (mtime_ns, size, 用例索引, 重名列表)
+        self._entries: Dict[str, Tuple[int, int, Optional[Dict[str, Any]], list]] = {}
+        # (绝对路径, 用例名) -> (mtime_ns, size, 模板)
+        self._templates: Dict[Tuple[str, str], Tuple[int, int, Template]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self, path: str) -> Tuple[Optional[Dict[str, Any]], list]:
+        """读取并索引用例文件，返回 (用例索引, 重名列表)"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = yaml.safe_load(f) or {}
+        test_cases = data.get('test_cases') if isinstance(data, dict) else None
+        if not isinstance(test_cases, list):
+            return None, []
+
+        index = {}
+        duplicates = []
+        for case in test_cases:
+            name = case.get('case_name')
+            if name in index:
+                duplicates.append(name)
+            else:
+                index[name] = case
+        return index, duplicates
+
+    def _resolve(self, path: str) -> Tuple[int, int, Optional[Dict[str, Any]], list]:
+        """获取文件的缓存条目，文件变化时重新加载（调用方持有锁）"""
+        stat = os.stat(path)
+        entry = self._entries.get(path)
+        if entry and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        index, duplicates = self._load(path)
+        entry = (stat.st_mtime_ns, stat.st_size, index, duplicates)
+        self._entries[path] = entry
+        return entry
+
+    def get_entry(self, file_path: str) -> Tuple[Optional[Dict[str, Any]], list]:
+        """
+        获取用例文件的索引
+        :param file_path: 路径（支持全局/局部）
+        :return: (用例索引, 重名列表)，文件缺少 test_cases 列表时索引为None
+        """
+        path = resolve_case_path(file_path)
+        with self._lock:
+            entry = self._resolve(path)
+        return entry[2], entry[3]
+
+    def get_case(self, file_path: str, case_name: str) -> Optional[Dict[str, Any]]:
+        """按用例名获取用例，文件无效、用例名重复或未找到时返回None"""
+        index, duplicates = self.get_entry(file_path)
+        if index is None or duplicates:
+            return None
+        return index.get(case_name)
+
+    def get_template(self, file_path: str, case_name: str) -> Optional[Template]:
+        """
+        获取用例的编译模板，渲染结果为新的对象，可以修改
+        :param file_path: 路径（支持全局/局部）
+        :param case_name: 用例名
+        :return: 文件无效、用例名重复或未找到时返回None
+        """
+        path = resolve_case_path(file_path)
+        key = (path, case_name)
+        # 用例与其所在文件的版本在同一次加锁中取得，模板按该版本缓存
+        with self._lock:
+            mtime, size, index, duplicates = self._resolve(path)
+            if index is None or duplicates or case_name not in index:
+                return None
+            cached = self._templates.get(key)
+            if cached and cached[0] == mtime and cached[1] == size:
+                return cached[2]
+            case = index[case_name]
+        template = Template(case)
+        with self._lock:
+            # 编译期间文件被重新加载或缓存被清空时不保存（模板仍对应取得时的用例）
+            entry = self._entries.get(path)
+            if entry and entry[:2] == (mtime, size):
+                self._templates[key] = (mtime, size, template)
+        return template
+
+    def stats(self) -> Dict[str, int]:
+        """缓存命中统计"""
+        return {'hits': self.hits, 'misses': self.misses, 'files': len(self._entries)}
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._templates.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# 全局用例目录实例
+case_catalog = CaseCatalog()
 
 
 class YamlUtils:
@@ -22,10 +146,7 @@ class YamlUtils:
         :return:
         """
 
-        if os.path.isabs(file_path):
-            path = file_path
-        else:
-            path = os.path.join(get_object_path(), default_file, file_path)
+        path = resolve_case_path(file_path, default_file)
         if not os.path.isabs(path):
             raise FileNotFoundError(f"YAML文件不存在: {path}")
 
@@ -54,31 +175,10 @@ class YamlUtils:
         Returns:
             替换变量后的数据
         """
-        # 处理字典类型
-        if isinstance(data, dict):
-            return {key: self.replace_yaml(value, replacements) for key, value in data.items()}
-
-        # 处理列表类型
-        elif isinstance(data, list):
-            return [self.replace_yaml(item, replacements) for item in data]
-
-        # 处理字符串类型 - 进行变量替换
-        elif isinstance(data, str):
-            pattern = r'\$\{(\w+)\}'
-
-            def replace_match(match):
-                var_name = match.group(1)
-                if var_name in replacements:
-                    return str(replacements[var_name])
-                else:
-                    print(f"警告: 未定义的变量 ${{{var_name}}}")
-                    return match.group(0)
+        def warn_missing(var_name):
+            self.logger.warning(f"未定义的变量 ${{{var_name}}}")
 
-            return re.sub(pattern, replace_match, data)
-
-        # 其他类型直接返回
-        else:
-            return data
+        return render(data, replacements, on_missing=warn_missing)
 
     def get_yaml_case(self, file_path, case_name: str):
         """
@@ -87,25 +187,25 @@ class YamlUtils:
         :param case_name: 用例名
         :return: 没找到返回None
         """
-        yml_data = self.read_yaml(file_path)
-        test_cases = yml_data.get('test_cases')
-        if not isinstance(test_cases, list):
+        try:
+            index, duplicates = case_catalog.get_entry(file_path)
+        except yaml.YAMLError as e:
+            self.logger.error(f"YAML 解析错误: {e}")
+            raise
+        if index is None:
             self.logger.warning(f"YAML 文件缺少 'test_cases' 列表: {file_path}")
             return None
-        cases = yml_data.get('test_cases')
 
         # 一个yaml文件中禁止有重复的用例名
-        case_names = [case.get('case_name') for case in cases]
-        duplicates = [name for name in case_names if case_names.count(name) > 1]
         if duplicates:
             self.logger.error(f"用例名重复: {duplicates}, 文件: {file_path}")
             return None
 
         # 提取用例
-        for case in cases:
-            if case.get('case_name') == case_name:
-                self.logger.debug(f'提取用例成功:{case_name}')
-                return case
+        case = index.get(case_name)
+        if case is not None:
+            self.logger.debug(f'提取用例成功:{case_name}')
+            return case
         self.logger.warning(f"未找到对应用例：{case_name} - 在文件 {file_path} 中")
         return None
 
@@ -144,18 +244,15 @@ class YamlUtils:
 
     def read_config(self, one_node, two_node=None):
         """
-        读取config.yml文件
+        读取config.yml文件（进程内只解析一次，返回只读数据）
         :param one_node: 第一节点名
         :param two_node: 第二节点名
         :return:
         """
-        file_path = os.path.join(get_object_path(), 'config.yml')
-        with open(file_path, encoding='utf-8') as f:
-            value = yaml.load(stream=f, Loader=yaml.FullLoader)
-            if two_node == None:
-                return value[one_node]
-            else:
-                return value[one_node][two_node]
+        if two_node == None:
+            return config.data[one_node]
+        else:
+            return config.data[one_node][two_node]
 
     def clean_extract(self):
         """